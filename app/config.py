@@ -1,7 +1,7 @@
 import os
 from dataclasses import dataclass, asdict
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 from dotenv import load_dotenv, set_key
 
@@ -74,6 +74,36 @@ class AppUrls:
             return None
 
 
+@dataclass(frozen=True)
+class AppSpec:
+    """需要安装到云机上的应用"""
+    name: str
+    url: str
+    md5: str
+    # 包名，用于匹配已安装应用列表，未知时为空
+    package: str = ""
+
+    @staticmethod
+    def md5_from_url(url: str) -> str:
+        """安装包以 md5 命名（.../<md5>.apk）"""
+        return url.rsplit("/", 1)[-1].replace(".apk", "")
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'AppSpec':
+        url = data["url"]
+        return cls(name=data["name"], url=url, md5=data.get("md5") or cls.md5_from_url(url),
+                   package=data.get("package", ""))
+
+
+# 默认应用清单：(名称, APP_URLS 字段, PACKAGE_NAMES 键)，按提交顺序排列
+DEFAULT_APP_MANIFEST = [
+    ("Clash", "clash", "clash"),
+    ("Script", "script", "primary"),
+    ("Chrome", "chrome", "chrome"),
+    ("Script2", "script2", "secondary"),
+]
+
+
 @dataclass
 class TimeoutConfig:
     """超时配置（单位：分钟）"""
@@ -81,6 +111,250 @@ class TimeoutConfig:
     check_task_timeout: int
 
 
+@dataclass
+class HttpClientConfig:
+    """VMOS云端HTTP客户端连接池配置（超时单位：秒）"""
+    limit: int
+    limit_per_host: int
+    keepalive_timeout: float
+    dns_cache_ttl: int
+    total_timeout: float
+    connect_timeout: float
+    read_timeout: float
+
+    @classmethod
+    def from_env(cls) -> 'HttpClientConfig':
+        return cls(
+            limit=int(os.getenv("VMOS_HTTP_LIMIT", "100")),
+            limit_per_host=int(os.getenv("VMOS_HTTP_LIMIT_PER_HOST", "50")),
+            keepalive_timeout=float(os.getenv("VMOS_HTTP_KEEPALIVE_TIMEOUT", "30")),
+            dns_cache_ttl=int(os.getenv("VMOS_HTTP_DNS_CACHE_TTL", "300")),
+            total_timeout=float(os.getenv("VMOS_HTTP_TOTAL_TIMEOUT", "30")),
+            connect_timeout=float(os.getenv("VMOS_HTTP_CONNECT_TIMEOUT", "10")),
+            read_timeout=float(os.getenv("VMOS_HTTP_READ_TIMEOUT", "20"))
+        )
+
+
+@dataclass
+class RateLimitConfig:
+    """VMOS请求限流配置：每个接口的令牌桶速率（次/秒）与AIMD并发窗口"""
+    default_rate: float
+    burst_seconds: float
+    endpoint_rates: Dict[str, float]
+    initial_concurrency: int
+    min_concurrency: int
+    max_concurrency: int
+    decrease_factor: float
+    latency_spike_factor: float
+
+    @classmethod
+    def from_env(cls) -> 'RateLimitConfig':
+        return cls(
+            default_rate=float(os.getenv("VMOS_RATE_LIMIT_DEFAULT", "20")),
+            burst_seconds=float(os.getenv("VMOS_RATE_LIMIT_BURST_SECONDS", "2")),
+            endpoint_rates=json.loads(os.getenv("VMOS_RATE_LIMIT_ENDPOINTS", "{}")),
+            initial_concurrency=int(os.getenv("VMOS_CONCURRENCY_INITIAL", "16")),
+            min_concurrency=int(os.getenv("VMOS_CONCURRENCY_MIN", "2")),
+            max_concurrency=int(os.getenv("VMOS_CONCURRENCY_MAX", "64")),
+            decrease_factor=float(os.getenv("VMOS_CONCURRENCY_DECREASE_FACTOR", "0.7")),
+            latency_spike_factor=float(os.getenv("VMOS_LATENCY_SPIKE_FACTOR", "3"))
+        )
+
+
+@dataclass
+class ResilienceConfig:
+    """VMOS调用重试与熔断配置（单位：秒）"""
+    max_attempts: int
+    base_delay: float
+    max_delay: float
+    failure_threshold: int
+    reset_seconds: float
+    # 单次逻辑调用（含限流排队、重试与退避）的时间预算，0表示不限制
+    call_budget: float
+
+    @classmethod
+    def from_env(cls) -> 'ResilienceConfig':
+        return cls(
+            max_attempts=int(os.getenv("VMOS_RETRY_MAX_ATTEMPTS", "3")),
+            base_delay=float(os.getenv("VMOS_RETRY_BASE_DELAY", "0.5")),
+            max_delay=float(os.getenv("VMOS_RETRY_MAX_DELAY", "8")),
+            failure_threshold=int(os.getenv("VMOS_BREAKER_FAILURE_THRESHOLD", "10")),
+            reset_seconds=float(os.getenv("VMOS_BREAKER_RESET_SECONDS", "30")),
+            call_budget=float(os.getenv("VMOS_CALL_BUDGET_SECONDS", "60"))
+        )
+
+
+@dataclass
+class CacheConfig:
+    """只读VMOS查询缓存配置（TTL单位：秒）"""
+    max_entries: int
+    pad_info_ttl: float
+    pad_list_ttl: float
+
+    @classmethod
+    def from_env(cls) -> 'CacheConfig':
+        return cls(
+            max_entries=int(os.getenv("VMOS_CACHE_MAX_ENTRIES", "2048")),
+            pad_info_ttl=float(os.getenv("VMOS_CACHE_PAD_INFO_TTL", "600")),
+            pad_list_ttl=float(os.getenv("VMOS_CACHE_PAD_LIST_TTL", "30"))
+        )
+
+
+@dataclass
+class HedgeConfig:
+    """只读查询对冲请求配置：超过接口延迟分位数仍未返回时再发一次相同请求"""
+    enabled: bool
+    endpoints: List[str]
+    quantile: float
+    min_delay_ms: float
+    # 对冲请求占总请求的最大比例
+    max_ratio: float
+    min_samples: int
+
+    @classmethod
+    def from_env(cls) -> 'HedgeConfig':
+        endpoints = os.getenv(
+            "VMOS_HEDGE_ENDPOINTS",
+            "/vcpcloud/api/padApi/padTaskDetail,/vcpcloud/api/padApi/listInstalledApp"
+        )
+        return cls(
+            enabled=os.getenv("VMOS_HEDGE_ENABLED", "false").lower() == "true",
+            endpoints=[path.strip() for path in endpoints.split(",") if path.strip()],
+            quantile=float(os.getenv("VMOS_HEDGE_QUANTILE", "0.95")),
+            min_delay_ms=float(os.getenv("VMOS_HEDGE_MIN_DELAY_MS", "50")),
+            max_ratio=float(os.getenv("VMOS_HEDGE_MAX_RATIO", "0.05")),
+            min_samples=int(os.getenv("VMOS_HEDGE_MIN_SAMPLES", "20"))
+        )
+
+
+@dataclass
+class TaskPollerConfig:
+    """集中式任务状态轮询配置（间隔单位：秒）"""
+    batch_size: int
+    min_interval: float
+    max_interval: float
+    # 由 /callback 推送任务状态时，轮询只作为漏回调的兜底
+    callbacks_enabled: bool
+    safety_interval: float
+
+    @classmethod
+    def from_env(cls) -> 'TaskPollerConfig':
+        return cls(
+            batch_size=int(os.getenv("TASK_POLL_BATCH_SIZE", "100")),
+            min_interval=float(os.getenv("TASK_POLL_MIN_INTERVAL", "1")),
+            max_interval=float(os.getenv("TASK_POLL_MAX_INTERVAL", "15")),
+            callbacks_enabled=os.getenv("TASK_CALLBACKS_ENABLED", "true").lower() == "true",
+            safety_interval=float(os.getenv("TASK_POLL_SAFETY_INTERVAL", "30"))
+        )
+
+
+@dataclass
+class DeviceSchedulerConfig:
+    """云机变更操作调度配置：每种操作的在途上限与优先级间隔（秒）"""
+    default_limit: int
+    limits: Dict[str, int]
+    # 优先级每高一级，相当于多排队这么多秒
+    priority_step: float
+
+    @classmethod
+    def from_env(cls) -> 'DeviceSchedulerConfig':
+        limits = {"replace": 8, "reboot": 8, "install": 32, "root": 16}
+        limits.update(json.loads(os.getenv("DEVICE_OP_LIMITS", "{}")))
+        return cls(
+            default_limit=int(os.getenv("DEVICE_OP_DEFAULT_LIMIT", "16")),
+            limits=limits,
+            priority_step=float(os.getenv("DEVICE_OP_PRIORITY_STEP_SECONDS", "30"))
+        )
+
+
+@dataclass
+class PadActorConfig:
+    """按云机的事件处理器配置"""
+    mailbox_size: int
+    # 处理器空闲多久（秒）后退出
+    idle_seconds: float
+
+    @classmethod
+    def from_env(cls) -> 'PadActorConfig':
+        return cls(
+            mailbox_size=int(os.getenv("PAD_ACTOR_MAILBOX_SIZE", "100")),
+            idle_seconds=float(os.getenv("PAD_ACTOR_IDLE_SECONDS", "300"))
+        )
+
+
+@dataclass
+class StatusBufferConfig:
+    """云机状态写缓冲配置"""
+    enabled: bool
+    # 定时批量写入的间隔（秒）
+    flush_interval: float
+    # 待写云机达到多少台时立即写入
+    max_pads: int
+
+    @classmethod
+    def from_env(cls) -> 'StatusBufferConfig':
+        return cls(
+            enabled=os.getenv("STATUS_BUFFER_ENABLED", "true").lower() == "true",
+            flush_interval=float(os.getenv("STATUS_FLUSH_INTERVAL_SECONDS", "1")),
+            max_pads=int(os.getenv("STATUS_FLUSH_MAX_PADS", "200"))
+        )
+
+
+@dataclass
+class LeaderElectionConfig:
+    """多 worker 主节点选举配置（Postgres advisory lock）"""
+    enabled: bool
+    # advisory lock 的键，同一数据库上的不同部署需使用不同的键
+    lock_key: int
+    # 非主节点尝试获取锁的间隔（秒）
+    retry_seconds: float
+    # 主节点检查锁连接是否存活的间隔（秒）
+    check_seconds: float
+    # 非主节点向主节点转交回调使用的 NOTIFY 通道
+    channel: str
+
+    @classmethod
+    def from_env(cls) -> 'LeaderElectionConfig':
+        return cls(
+            enabled=os.getenv("LEADER_ELECTION_ENABLED", "true").lower() == "true",
+            lock_key=int(os.getenv("LEADER_LOCK_KEY", "724501")),
+            retry_seconds=float(os.getenv("LEADER_RETRY_SECONDS", "5")),
+            check_seconds=float(os.getenv("LEADER_CHECK_SECONDS", "5")),
+            channel=os.getenv("LEADER_CHANNEL", "vmos_orchestration")
+        )
+
+
+@dataclass
+class ShardingConfig:
+    """多 worker 按云机分片配置（一致性哈希 + Postgres advisory lock）"""
+    enabled: bool
+    # worker 标识，为空时使用 主机名:进程号
+    worker_id: str
+    # 云机 advisory lock 键的命名空间（与云机编号一起哈希成 64 位键），同一数据库上的不同部署需使用不同的值
+    lock_namespace: int
+    # 心跳与重新分片的间隔（秒）
+    heartbeat_seconds: float
+    # 超过多久（秒）没有心跳的 worker 视为已退出
+    member_ttl_seconds: float
+    # 每个 worker 在哈希环上的虚拟节点数
+    virtual_nodes: int
+    # 转交回调使用的 NOTIFY 通道前缀
+    channel: str
+
+    @classmethod
+    def from_env(cls) -> 'ShardingConfig':
+        return cls(
+            # 默认不分片，由主节点负责全部云机；多 worker 大规模部署时再开启
+            enabled=os.getenv("SHARDING_ENABLED", "false").lower() == "true",
+            worker_id=os.getenv("SHARD_WORKER_ID", ""),
+            lock_namespace=int(os.getenv("SHARD_LOCK_NAMESPACE", "724501")),
+            heartbeat_seconds=float(os.getenv("SHARD_HEARTBEAT_SECONDS", "5")),
+            member_ttl_seconds=float(os.getenv("SHARD_MEMBER_TTL_SECONDS", "20")),
+            virtual_nodes=int(os.getenv("SHARD_VIRTUAL_NODES", "64")),
+            channel=os.getenv("SHARD_CHANNEL", "vmos_shard")
+        )
+
+
 class ConfigManager:
     """配置管理器 - 负责环境变量的持久化"""
 
@@ -210,12 +484,60 @@ class Config:
     # Application URLs
     APP_URLS = AppUrls.from_env()
 
+    # 应用清单（JSON 列表：name、url，可选 md5、package），未设置时由 APP_URLS 和 PACKAGE_NAMES 生成
+    APP_MANIFEST: List[Dict[str, Any]] = json.loads(os.getenv("APP_MANIFEST", "[]"))
+
     # Timeout Configuration
     TIMEOUTS = TimeoutConfig(
         global_timeout=int(os.getenv("GLOBAL_TIMEOUT_MINUTES", "12")),
         check_task_timeout=int(os.getenv("CHECK_TASK_TIMEOUT_MINUTES", "5"))
     )
 
+    # VMOS云端接口地址（可指向本地替身服务 tests/vmos_emulator.py）
+    VMOS_BASE_URL: str = os.getenv("VMOS_BASE_URL", "https://api.vmoscloud.com").rstrip("/")
+
+    # VMOS HTTP Client Configuration
+    HTTP_CLIENT = HttpClientConfig.from_env()
+
+    # 多云机请求合并窗口（毫秒，0表示关闭）与单批最大云机数
+    COALESCE_WINDOW_MS: int = int(os.getenv("VMOS_COALESCE_WINDOW_MS", "50"))
+    COALESCE_MAX_BATCH_SIZE: int = int(os.getenv("VMOS_COALESCE_MAX_BATCH_SIZE", "100"))
+
+    # VMOS Rate Limit Configuration
+    RATE_LIMIT = RateLimitConfig.from_env()
+
+    # VMOS Retry / Circuit Breaker Configuration
+    RESILIENCE = ResilienceConfig.from_env()
+
+    # VMOS Read Cache Configuration
+    CACHE = CacheConfig.from_env()
+
+    # VMOS Hedged Request Configuration
+    HEDGE = HedgeConfig.from_env()
+
+    # Task Status Poller Configuration
+    TASK_POLLER = TaskPollerConfig.from_env()
+
+    # Device Operation Scheduler Configuration
+    DEVICE_SCHEDULER = DeviceSchedulerConfig.from_env()
+
+    # Per-Pad Actor Configuration
+    PAD_ACTOR = PadActorConfig.from_env()
+
+    # Status Write-Behind Buffer Configuration
+    STATUS_BUFFER = StatusBufferConfig.from_env()
+
+    # Leader Election Configuration
+    LEADER_ELECTION = LeaderElectionConfig.from_env()
+
+    # Pad Sharding Configuration
+    SHARDING = ShardingConfig.from_env()
+
+    # VMOS流量录制/回放（gzip JSONL 轨迹文件，回放时不访问云端）
+    VMOS_TRACE_RECORD_FILE: str = os.getenv("VMOS_TRACE_RECORD_FILE", "")
+    VMOS_TRACE_REPLAY_FILE: str = os.getenv("VMOS_TRACE_REPLAY_FILE", "")
+    VMOS_TRACE_REPLAY_SPEED: float = float(os.getenv("VMOS_TRACE_REPLAY_SPEED", "1.0"))
+
     @classmethod
     def get_package_name(cls, package_type: str = "primary") -> str:
         """Get package name by type"""
@@ -228,6 +550,18 @@ class Config:
             return getattr(cls.APP_URLS, app_name, "")
         return ""
 
+    @classmethod
+    def get_app_manifest(cls) -> List[AppSpec]:
+        """当前应用清单（每次调用时生成，跟随配置热更新）"""
+        if cls.APP_MANIFEST:
+            return [AppSpec.from_dict(item) for item in cls.APP_MANIFEST]
+        manifest = []
+        for name, url_field, package_key in DEFAULT_APP_MANIFEST:
+            url = cls.get_app_url(url_field)
+            manifest.append(AppSpec(name=name, url=url, md5=AppSpec.md5_from_url(url),
+                                    package=cls.PACKAGE_NAMES.get(package_key, "")))
+        return manifest
+
     @classmethod
     def is_debug_mode(cls) -> bool:
         """Check if debug mode is enabled"""
@@ -0,0 +1,59 @@
+import datetime
+import json
+from typing import Dict, List, Optional, cast
+
+from sqlalchemy import ColumnElement, select, delete
+
+from app.services.database import SessionLocal, PipelineState, Status
+from app.services.logger import task_logger
+
+
+async def save_pipeline_state(pad_code: str,
+                              stage: str,
+                              task_ids: Optional[Dict[str, int]] = None,
+                              deadline_at: Optional[float] = None,
+                              temple_id: Optional[int] = None) -> None:
+    """保存云机流水线检查点（每台云机一行，同阶段重复进入时累加尝试次数）"""
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(PipelineState).filter(cast(ColumnElement[bool], PipelineState.pad_code == pad_code)))
+        state = result.scalars().first()
+
+        # 记录当前代理国家，恢复时沿用
+        status_result = await db.execute(
+            select(Status.code).filter(cast(ColumnElement[bool], Status.pad_code == pad_code)))
+        country_code = status_result.scalars().first()
+
+        if state is None:
+            state = PipelineState(pad_code=pad_code, stage=stage, attempts=1)
+            db.add(state)
+        elif state.stage == stage:
+            state.attempts += 1
+        else:
+            state.stage = stage
+            state.attempts = 1
+
+        state.task_ids = json.dumps(task_ids) if task_ids is not None else None
+        state.deadline_at = deadline_at
+        if temple_id is not None:
+            state.temple_id = temple_id
+        if country_code is not None:
+            state.country_code = country_code
+        state.updated_at = datetime.datetime.now()
+
+        await db.commit()
+        task_logger.debug(f"{pad_code}: 流水线检查点 -> {stage}")
+
+
+async def get_pipeline_states() -> List[PipelineState]:
+    """获取全部云机流水线检查点"""
+    async with SessionLocal() as db:
+        result = await db.execute(select(PipelineState))
+        return list(result.scalars().all())
+
+
+async def remove_pipeline_state(pad_code: str) -> None:
+    """删除云机流水线检查点"""
+    async with SessionLocal() as db:
+        await db.execute(delete(PipelineState).filter(cast(ColumnElement[bool], PipelineState.pad_code == pad_code)))
+        await db.commit()
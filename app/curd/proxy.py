@@ -7,6 +7,8 @@ from app.curd.status import get_proxy_status
 from app.dependencies.utils import get_cloud_phone_info
 from app.models.proxy import ProxyResponse
 from app.services.database import SessionLocal, ProxyCollection
+from app.services.logger import task_logger
+from app.services.resilience import VmosApiError
 
 
 async def update_proxies(pade_code: str):
@@ -31,6 +33,8 @@ async def update_proxies(pade_code: str):
             await db.refresh(proxy)
         except IntegrityError:
             await db.rollback()
+        except VmosApiError as e:
+            task_logger.error(f"{pade_code}: 获取云机信息失败，未记录代理 - {e}")
 
 
 
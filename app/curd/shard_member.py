@@ -0,0 +1,57 @@
+import time
+from typing import List, Optional, cast
+
+from sqlalchemy import ColumnElement, select, delete, text
+
+from app.services.database import SessionLocal, ShardMember
+
+
+async def heartbeat_shard_member(worker_id: str, backend_pid: Optional[int] = None) -> None:
+    """登记 worker 并刷新心跳（同时记录持锁连接的后端进程ID）"""
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(ShardMember).filter(cast(ColumnElement[bool], ShardMember.worker_id == worker_id)))
+        member = result.scalars().first()
+        if member is None:
+            member = ShardMember(worker_id=worker_id)
+            db.add(member)
+        member.heartbeat_at = time.time()
+        member.backend_pid = backend_pid
+        await db.commit()
+
+
+async def get_live_shard_members(ttl_seconds: float) -> List[str]:
+    """获取心跳未过期的 worker"""
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(ShardMember.worker_id).filter(
+                cast(ColumnElement[bool], ShardMember.heartbeat_at >= time.time() - ttl_seconds)))
+        return list(result.scalars().all())
+
+
+async def prune_shard_members(ttl_seconds: float) -> int:
+    """删除心跳已过期的 worker 记录（已退出或崩溃的进程），返回删除的行数"""
+    async with SessionLocal() as db:
+        result = await db.execute(delete(ShardMember).filter(
+            cast(ColumnElement[bool], ShardMember.heartbeat_at < time.time() - ttl_seconds)))
+        await db.commit()
+        return result.rowcount
+
+
+async def remove_shard_member(worker_id: str) -> None:
+    """worker 退出时注销"""
+    async with SessionLocal() as db:
+        await db.execute(delete(ShardMember).filter(cast(ColumnElement[bool], ShardMember.worker_id == worker_id)))
+        await db.commit()
+
+
+async def get_lock_holder(key: int, ttl_seconds: float) -> Optional[str]:
+    """查找持有该 advisory lock（64 位键）的存活 worker"""
+    async with SessionLocal() as db:
+        result = await db.execute(
+            text("SELECT m.worker_id FROM pg_locks l JOIN shard_member m ON m.backend_pid = l.pid "
+                 "WHERE l.locktype = 'advisory' AND l.granted AND l.objsubid = 1 "
+                 "AND l.classid = :high AND l.objid = :low AND m.heartbeat_at >= :since"),
+            # pg_locks 中 64 位键拆成高低两段 oid（无符号）
+            {"high": (key >> 32) & 0xFFFFFFFF, "low": key & 0xFFFFFFFF, "since": time.time() - ttl_seconds})
+        return result.scalars().first()
@@ -1,13 +1,14 @@
 from typing import cast
 
 from fastapi import HTTPException
-from sqlalchemy import ColumnElement
+from sqlalchemy import ColumnElement, select, update
 from sqlalchemy.exc import IntegrityError
 
 from app.models.proxy import ProxyResponse
 from app.models.status import StatusResponse
 from app.services.database import SessionLocal, Status
 from app.services.logger import task_logger
+from app.services.status_buffer import status_buffer, PendingStatus
 
 
 async def add_cloud_status(pad_code: str, temple_id: int, current_status: str = "新机中"):
@@ -47,6 +48,7 @@ async def remove_cloud_status(pad_code: str):
             raise HTTPException(status_code=404, detail="云机不存在")
         await db.execute(delete(Status).filter(cast(ColumnElement[bool], Status.pad_code == pad_code)))
         await db.commit()
+        status_buffer.discard(pad_code)
         task_logger.success(f"云机数据 {pad_code} : 删除成功")
 
 
@@ -61,84 +63,92 @@ async def update_cloud_status(pad_code: str,
                               num_of_error: int = None,
                               num_other_error: int = None
                               ) -> StatusResponse:
-    """更新云机状态"""
-    async with SessionLocal() as db:
-        try:
-            from sqlalchemy import select
-            stmt = select(Status).filter(cast(ColumnElement[bool], Status.pad_code == pad_code))
-            result = await db.execute(stmt)
-            db_status = result.scalars().first()
-            if db_status is None:
-                raise HTTPException(status_code=404, detail="云机状态不存在")
-
-            # 记录更新前的状态用于比较
-            old_status = db_status.current_status
-            status_changed = False
-
-            if current_status is not None and db_status.current_status != current_status:
-                db_status.current_status = current_status
-                status_changed = True
-                task_logger.info(f"{pad_code}: 状态更新 {old_status} -> {current_status}")
-
-            if number_of_run is not None:
-                old_run = db_status.number_of_run
-                db_status.number_of_run += number_of_run
-                task_logger.debug(f"{pad_code}: 运行次数更新 {old_run} -> {db_status.number_of_run}")
-
-            if phone_number_counts is not None:
-                old_phone = db_status.phone_number_counts
-                db_status.phone_number_counts += phone_number_counts
-                task_logger.debug(f"{pad_code}: 手机号数量更新 {old_phone} -> {db_status.phone_number_counts}")
-
-            if temple_id is not None:
-                db_status.temple_id = temple_id
-                task_logger.debug(f"{pad_code}: 模板ID更新为 {temple_id}")
-
-            if secondary_email_num is not None:
-                old_secondary = db_status.secondary_email_num
-                db_status.secondary_email_num += secondary_email_num
-                task_logger.debug(f"{pad_code}: 辅助邮箱数量更新 {old_secondary} -> {db_status.secondary_email_num}")
-
-            if forward_num is not None:
-                old_forward = db_status.forward_num
-                db_status.forward_num += forward_num
-                task_logger.debug(f"{pad_code}: 转发邮箱数量更新 {old_forward} -> {db_status.forward_num}")
-
-
-            if num_of_success is not None:
-                old_num_success = db_status.num_of_success
-                db_status.num_of_success += num_of_success
-                task_logger.debug(f"{pad_code}: 注册成功数量更新 {old_num_success} -> {db_status.num_of_success}")
-
-            if num_of_error is not None:
-                old_num_error = db_status.num_of_error
-                db_status.num_of_error += num_of_error
-                task_logger.debug(f"{pad_code}: 注册失败数量更新 {old_num_error} -> {db_status.num_of_error}")
-
-            if num_other_error is not None:
-                old_num_other_error = db_status.num_other_error
-                db_status.num_other_error += num_other_error
-                task_logger.debug(f"{pad_code}: 其他错误数量更新 {old_num_other_error} -> {db_status.num_other_error}")
-
+    """更新云机状态
+
+    计数字段在数据库中原子累加（SET x = x + :n），状态和计数在一条 UPDATE ... RETURNING 中完成，
+    并发更新不会丢失增量；子查询 FOR UPDATE 锁定该行并取得更新前的状态，用于判断状态是否变化。
+    该云机在写缓冲中的待写更新一并写入（本次给出的状态优先）。
+    """
+    pending = await status_buffer.take(pad_code)
+    if pending is not None:
+        current_status = current_status if current_status is not None else pending.current_status
+        temple_id = temple_id if temple_id is not None else pending.temple_id
+    increments = {
+        "number_of_run": number_of_run,
+        "phone_number_counts": phone_number_counts,
+        "secondary_email_num": secondary_email_num,
+        "forward_num": forward_num,
+        "num_of_success": num_of_success,
+        "num_of_error": num_of_error,
+        "num_other_error": num_other_error,
+    }
+    increments = {field: value for field, value in increments.items() if value is not None}
+    if pending is not None:
+        for field, value in pending.counters.items():
+            increments[field] = increments.get(field, 0) + value
+    # 直接使用表（Core）而不是 ORM 实体，不经过会话的对象同步和标识映射
+    table = Status.__table__
+    values = {field: table.c[field] + value for field, value in increments.items()}
+    if current_status is not None:
+        values["current_status"] = current_status
+    if temple_id is not None:
+        values["temple_id"] = temple_id
+
+    previous = (select(table.c.id, table.c.current_status.label("old_status"))
+                .where(table.c.pad_code == pad_code)
+                .with_for_update()
+                .subquery())
+    stmt = (update(table)
+            .where(table.c.id == previous.c.id)
+            .values(values or {"current_status": table.c.current_status})
+            .returning(previous.c.old_status, *table.c))
+
+    try:
+        async with SessionLocal() as db:
+            row = (await db.execute(stmt)).mappings().first()
             await db.commit()
-            await db.refresh(db_status)
-
-            # 延迟导入避免循环依赖
-            from app.services.websocket_manager import ws_manager
-
-            # 如果状态发生变化或有重要更新，通知WebSocket客户端
-            if status_changed or number_of_run or phone_number_counts or secondary_email_num or forward_num or num_of_success or num_of_error or temple_id or forward_num:
-                if status_changed:
-                    # 状态变化时发送单个状态更新
-                    await ws_manager.notify_status_change(pad_code, current_status)
-                else:
-                    # 数据更新时发送完整状态更新
-                    await ws_manager.send_status_update()
-
-            return db_status
-        except IntegrityError:
-            await db.rollback()
-            raise HTTPException(status_code=400, detail="云机状态已存在")
+    except Exception:
+        if pending is not None:
+            status_buffer.restore(pad_code, pending)
+        raise
+    if row is None:
+        raise HTTPException(status_code=404, detail="云机状态不存在")
+
+    old_status = row["old_status"]
+    status_changed = current_status is not None and old_status != current_status
+    if status_changed:
+        task_logger.info(f"{pad_code}: 状态更新 {old_status} -> {current_status}")
+    if temple_id is not None:
+        task_logger.debug(f"{pad_code}: 模板ID更新为 {temple_id}")
+    if increments:
+        task_logger.debug(f"{pad_code}: 计数更新 " + ", ".join(
+            f"{field} +{value} -> {row[field]}" for field, value in increments.items()))
+
+    # 延迟导入避免循环依赖
+    from app.services.websocket_manager import ws_manager
+
+    # 如果状态发生变化或有重要更新，通知WebSocket客户端
+    if status_changed:
+        # 状态变化时发送单个状态更新
+        await ws_manager.notify_status_change(pad_code, current_status)
+    elif any(increments.values()) or temple_id:
+        # 数据更新时发送完整状态更新
+        await ws_manager.send_status_update()
+
+    return StatusResponse.model_validate(dict(row))
+
+
+async def queue_cloud_status(pad_code: str,
+                             current_status: str = None,
+                             temple_id: int = None,
+                             **counters: int) -> None:
+    """登记云机状态更新，由写缓冲合并后批量写入（参数同 update_cloud_status，不返回更新后的状态）"""
+    if not status_buffer.enabled:
+        await update_cloud_status(pad_code, current_status=current_status, temple_id=temple_id, **counters)
+        return
+    status_buffer.submit(pad_code, PendingStatus(current_status=current_status, temple_id=temple_id,
+                                                 counters={name: value for name, value in counters.items()
+                                                           if value is not None}))
 
 
 async def set_proxy_status(pad_code: str, proxy_response: ProxyResponse, number_of_run: int = None) -> StatusResponse:
@@ -3,9 +3,36 @@ import datetime
 import hashlib
 import hmac
 import json
+import time
+from functools import lru_cache
 from typing import Any
 
-import aiohttp
+from app.config import config
+from app.services.hedging import vmos_hedger
+from app.services.http_client import vmos_client
+from app.services.rate_limiter import vmos_limiter
+from app.services.resilience import vmos_resilience, await_within_deadline, READ_ONLY_ENDPOINTS
+from app.services.single_flight import vmos_single_flight, canonical_key
+from app.services.vmos_metrics import vmos_metrics
+from app.services.vmos_trace import vmos_recorder, vmos_replayer
+
+SERVICE = "armcloud-paas"  # 服务名
+ALGORITHM = "HMAC-SHA256"
+
+
+@lru_cache(maxsize=4)
+def get_signing_key(sk: str, short_x_date: str) -> bytes:
+    """派生签名密钥
+
+    密钥只依赖 sk 和日期（例如："20240101"），每天变化一次，
+    因此按 short_x_date 缓存，避免每次请求都做三次 HMAC 派生。
+    """
+    # 第一次hmacSHA256
+    first_hmac_result = hmac.new(sk.encode(), short_x_date.encode(), hashlib.sha256).digest()
+    # 第二次hmacSHA256
+    second_hmac_result = hmac.new(first_hmac_result, SERVICE.encode(), hashlib.sha256).digest()
+    # 第三次hmacSHA256
+    return hmac.new(second_hmac_result, b'request', hashlib.sha256).digest()
 
 
 class VmosUtil(object):
@@ -20,12 +47,12 @@ class VmosUtil(object):
         self._content_type = "application/json;charset=UTF-8"
         self._signed_headers = "content-type;host;x-content-sha256;x-date"
         self._host = "api.vmoscloud.com"
+        # 请求体只序列化一次，签名哈希与实际发送使用同一份字节
+        self._body: bytes = json.dumps(self._data, separators=(',', ':'), ensure_ascii=False).encode()
 
     def _get_signature(self):
-        json_string: Any = json.dumps(self._data, separators=(',', ':'), ensure_ascii=False)
         # 计算SHA-256哈希值
-        hash_object = hashlib.sha256(json_string.encode())
-        x_content_sha256 = hash_object.hexdigest()
+        x_content_sha256 = hashlib.sha256(self._body).hexdigest()
 
         # 使用f-string构建canonicalStringBuilder
         canonical_string_builder: Any = (
@@ -35,42 +62,23 @@ class VmosUtil(object):
             f"signedHeaders:{self._signed_headers}\n"
             f"x-content-sha256:{x_content_sha256}"
         )
-        # 假设这些变量已经被赋值
-        # short_x_date = datetime.datetime.now().strftime("%Y%m%d")  # 短请求时间，例如："20240101"
         short_x_date = self._x_date[:8]  # 短请求时间，例如："20240101"
-        service = "armcloud-paas"  # 服务名
 
         # 构建credentialScope
-        credential_scope = "{}/{}/request".format(short_x_date, service)
-
-        # 假设这些变量已经被赋值
-        algorithm = "HMAC-SHA256"
+        credential_scope = "{}/{}/request".format(short_x_date, SERVICE)
 
         # 计算canonicalStringBuilder的SHA-256哈希值
         hash_sha256 = hashlib.sha256(canonical_string_builder.encode()).hexdigest()
         # 构建StringToSign
         string_to_sign = (
-                algorithm + '\n' +
+                ALGORITHM + '\n' +
                 self._x_date + '\n' +
                 credential_scope + '\n' +
                 hash_sha256
         )
 
-        # 假设这些变量已经被赋值
-        service = "armcloud-paas"  # 服务名
-
-        # 第一次hmacSHA256
-        first_hmac: Any = hmac.new(self._sk.encode(), digestmod=hashlib.sha256)
-        first_hmac.update(short_x_date.encode())
-        first_hmac_result = first_hmac.digest()
-
-        # 第二次hmacSHA256
-        second_hmac: Any = hmac.new(first_hmac_result, digestmod=hashlib.sha256)
-        second_hmac.update(service.encode())
-        second_hmac_result = second_hmac.digest()
-
-        # 第三次hmacSHA256
-        signing_key = hmac.new(second_hmac_result, b'request', digestmod=hashlib.sha256).digest()
+        # 签名密钥按天缓存
+        signing_key = get_signing_key(self._sk, short_x_date)
 
         # 使用signing_key和string_to_sign计算HMAC-SHA256
         signature_bytes: Any = hmac.new(signing_key, string_to_sign.encode(), hashlib.sha256).digest()
@@ -81,15 +89,62 @@ class VmosUtil(object):
         return signature
 
     async def send(self):
-        signature = self._get_signature()
-        url = f"https://api.vmoscloud.com{self._url}"
-        payload = json.dumps(self._data, ensure_ascii=False)
-        headers = {
-            'content-type': "application/json;charset=UTF-8",
-            'x-date': self._x_date,
-            'x-host': "api.vmoscloud.com",
-            'authorization': f"HMAC-SHA256 Credential={self._ak}, SignedHeaders=content-type;host;x-content-sha256;x-date, Signature={signature}"
-        }
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, data=payload) as response:
-                return await response.json()
+        if vmos_replayer.active:
+            return await vmos_replayer.respond(self._url, self._data)
+        if not vmos_recorder.active:
+            return await self._send()
+        start = time.monotonic()
+        try:
+            result = await self._send()
+        except Exception as e:
+            vmos_recorder.record_call(self._url, self._data, start, error=e)
+            raise
+        vmos_recorder.record_call(self._url, self._data, start, response=result)
+        return result
+
+    async def _send(self):
+        if self._url in READ_ONLY_ENDPOINTS:
+            # 并发的相同只读查询共享一次调用
+            return await await_within_deadline(
+                self._url, vmos_single_flight.do(canonical_key(self._url, self._data), self._send_resilient))
+        return await self._send_resilient()
+
+    async def _send_resilient(self):
+        return await vmos_resilience.execute(self._url, self._send_hedged)
+
+    async def _send_hedged(self):
+        # 慢请求超过接口p95时对冲（仅对配置的只读接口生效）
+        return await vmos_hedger.run(self._url, self._send_once)
+
+    async def _send_once(self):
+        async with vmos_limiter.slot(self._url) as slot:
+            # 限流排队后再签名，避免 x-date 过期
+            self._x_date = datetime.datetime.now().strftime("%Y%m%dT%H%M%SZ")
+            signature = self._get_signature()
+            url = f"{config.VMOS_BASE_URL}{self._url}"
+            headers = {
+                'content-type': "application/json;charset=UTF-8",
+                'x-date': self._x_date,
+                'x-host': "api.vmoscloud.com",
+                'authorization': f"HMAC-SHA256 Credential={self._ak}, SignedHeaders=content-type;host;x-content-sha256;x-date, Signature={signature}"
+            }
+            start = time.monotonic()
+            try:
+                result = await vmos_client.post_json(url, headers=headers, data=self._body)
+            except Exception as e:
+                vmos_metrics.record_call(self._url, time.monotonic() - start, type(e).__name__,
+                                         self._pad_codes(), error=True)
+                raise
+            code = result.get("code") if isinstance(result, dict) else None
+            vmos_metrics.record_call(self._url, time.monotonic() - start, code,
+                                     self._pad_codes(), error=code != 200)
+            if code != 200:
+                slot.mark_failed()
+            return result
+
+    def _pad_codes(self) -> list[str]:
+        if self._data.get("padCodes"):
+            return self._data["padCodes"]
+        if self._data.get("padCode"):
+            return [self._data["padCode"]]
+        return []
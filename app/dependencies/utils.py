@@ -2,20 +2,55 @@ from dataclasses import dataclass
 from enum import Enum
 from typing import Optional
 
-from loguru import logger
-
+from app.config import config
 from app.dependencies.auth import VmosUtil
+from app.services.device_scheduler import device_scheduler
+from app.services.installed_apps import installed_apps
+from app.services.pipeline_checkpoint import checkpoint, STAGE_REPLACE
+from app.services.request_coalescer import pad_coalescer
+from app.services.resilience import READ_ONLY_ENDPOINTS, await_within_deadline
+from app.services.single_flight import vmos_single_flight, canonical_key
+from app.services.vmos_cache import vmos_cache
+from app.services.vmos_metrics import pipeline_stage
+
+
+async def send_pad_request(url: str, params: dict, pad_code_list: list[str]):
+    """发送带 padCodes 的请求，单台云机的请求交给合并层批量发送"""
+    if len(pad_code_list) == 1:
+        pad_code = pad_code_list[0]
+        if url in READ_ONLY_ENDPOINTS:
+            # 同一云机的相同只读查询在合并前先去重
+            return await await_within_deadline(url, vmos_single_flight.do(
+                canonical_key(url, params, pad_code), lambda: pad_coalescer.submit(url, params, pad_code)))
+        # 变更操作由合并层按批次经调度器限流排队，合并不受在途上限影响
+        return await pad_coalescer.submit(url, params, pad_code)
+    return await device_scheduler.run(url, VmosUtil(url, {**params, "padCodes": pad_code_list}).send)
 
 
 async def replace_pad(pad_code: list[str], template_id: int) -> dict[str, str]:
     pad_infos_url = '/vcpcloud/api/padApi/replacePad'
 
     replace_pad_body = {
-        "realPhoneTemplateId": template_id,
-        "padCodes": pad_code
+        "realPhoneTemplateId": template_id
     }
 
-    return await VmosUtil(pad_infos_url, replace_pad_body).send()
+    # 一键新机后云机信息（安卓版本等）可能变化，已安装应用清空。
+    # 发送前后各失效一次：发送期间开始的查询可能读到新机前的数据，其结果不会写入缓存
+    vmos_cache.invalidate_pads(pad_code)
+    installed_apps.forget(pad_code)
+    try:
+        with pipeline_stage("recycle"):
+            result = await send_pad_request(pad_infos_url, replace_pad_body, pad_code)
+    finally:
+        vmos_cache.invalidate_pads(pad_code)
+        installed_apps.forget(pad_code)
+
+    # 新一轮流水线从一键新机开始，记录任务ID以便重启后恢复
+    for item in (result.get("data") if isinstance(result, dict) else None) or []:
+        if isinstance(item, dict) and item.get("taskId"):
+            await checkpoint(item["padCode"], STAGE_REPLACE, task_ids={"replace": item["taskId"]},
+                             temple_id=template_id, timeout_seconds=config.get_timeout("global") * 60)
+    return result
 
 
 async def update_language(language: str, country, pad_code_list: list[str]) -> dict[str, str]:
@@ -23,11 +58,10 @@ async def update_language(language: str, country, pad_code_list: list[str]) -> d
 
     set_lang_body = {
         "language": language,
-        "country": country,
-        "padCodes": pad_code_list
+        "country": country
     }
 
-    return await VmosUtil(change_lang_url, set_lang_body).send()
+    return await send_pad_request(change_lang_url, set_lang_body, pad_code_list)
 
 
 async def install_app(pad_code_list: list[str], app_url: str, md5: str) -> dict[str, str]:
@@ -40,7 +74,7 @@ async def install_app(pad_code_list: list[str], app_url: str, md5: str) -> dict[
         "md5": md5
     }
 
-    return await VmosUtil(install_app_url, body).send()
+    return await device_scheduler.run(install_app_url, VmosUtil(install_app_url, body).send)
 
 
 async def start_app(pad_code_list: list, pkg_name: str) -> list:
@@ -51,7 +85,7 @@ async def start_app(pad_code_list: list, pkg_name: str) -> list:
         "pkgName": pkg_name
     }
 
-    return await VmosUtil(start_app_url, body).send()
+    return await device_scheduler.run(start_app_url, VmosUtil(start_app_url, body).send)
 
 
 class ActionType(Enum):
@@ -95,7 +129,7 @@ async def click(pad_code_list: list[str], positions: list,
         "positions": positions
     }
 
-    return await VmosUtil(click_url, body).send()
+    return await device_scheduler.run(click_url, VmosUtil(click_url, body).send)
 
 
 async def replacement(pad_code: str) -> dict[str, str]:
@@ -105,18 +139,17 @@ async def replacement(pad_code: str) -> dict[str, str]:
         "padCode": pad_code
     }
 
-    return await VmosUtil(replace_ment_url, body).send()
+    return await device_scheduler.run(replace_ment_url, VmosUtil(replace_ment_url, body).send)
 
 
 async def update_time_zone(pad_code_list: list[str], time_zone: str) -> dict[str, str]:
     update_timezone_url = "/vcpcloud/api/padApi/updateTimeZone"
 
     body = {
-        "timeZone": time_zone,
-        "padCodes": pad_code_list
+        "timeZone": time_zone
     }
 
-    return await VmosUtil(update_timezone_url, body).send()
+    return await send_pad_request(update_timezone_url, body, pad_code_list)
 
 
 async def gps_in_ject_info(pad_code_list: list[str], longitude: float, latitude: float) -> dict[str, str]:
@@ -124,11 +157,10 @@ async def gps_in_ject_info(pad_code_list: list[str], longitude: float, latitude:
 
     body = {
         "longitude": longitude,
-        "latitude": latitude,
-        "padCodes": pad_code_list
+        "latitude": latitude
     }
 
-    return await VmosUtil(set_local_url, body).send()
+    return await send_pad_request(set_local_url, body, pad_code_list)
 
 
 async def get_cloud_file_task_info(tasks_list: list[str]):
@@ -142,31 +174,24 @@ async def get_cloud_file_task_info(tasks_list: list[str]):
 
 async def get_app_install_info(pad_code_list: list[str]) -> dict[str, str]:
     url = "/vcpcloud/api/padApi/listInstalledApp"
-    body = {
-        "padCodes": pad_code_list
-    }
 
-    return await VmosUtil(url, body).send()
+    return await send_pad_request(url, {}, pad_code_list)
 
 
 async def open_root(pad_code_list: list[str], pkg_name: str) -> dict[str, str]:
     root_url = "/vcpcloud/api/padApi/switchRoot"
     body = {
-        "padCodes": pad_code_list,
         "packageName": pkg_name,
         "rootStatus": 1,
         "globalRoot": False
     }
-    return await VmosUtil(root_url, body).send()
+    return await send_pad_request(root_url, body, pad_code_list)
 
 
 async def reboot(pad_code_list: list[str]):
     reboot_url = "/vcpcloud/api/padApi/restart"
-    body = {
-        "padCodes": pad_code_list
-    }
 
-    return await VmosUtil(reboot_url, body).send()
+    return await send_pad_request(reboot_url, {}, pad_code_list)
 
 
 async def get_cloud_phone_info(pad_code: str):
@@ -175,55 +200,10 @@ async def get_cloud_phone_info(pad_code: str):
         "padCode": pad_code
     }
 
-    return await VmosUtil(url, body).send()
+    return await vmos_cache.read_through(url, body, ttl=config.CACHE.pad_info_ttl,
+                                         fetch=VmosUtil(url, body).send, pad_codes=[pad_code])
 
 async def get_pad_code_list() -> dict[str, str]:
     list_url = "/vcpcloud/api/padApi/userPadList"
-    return await VmosUtil(list_url).send()
-
-async def check_padTaskDetail(tasks_list: list[str]) -> int:
-    try:
-        result = await get_cloud_file_task_info(tasks_list)
-        task_status = result["data"][0]["taskStatus"]
-        padCode = result["data"][0]["padCode"]
-        errorMsg = result["data"][0]["errorMsg"]
-        match task_status:
-            case -1:
-                if errorMsg:
-                    logger.error(f"{task_status}: {padCode}：{errorMsg}")
-                return -1
-
-            case -2:
-                if errorMsg:
-                    logger.warning(f"{task_status}： {padCode}：{errorMsg}")
-                return -1
-
-            case -3:
-                if errorMsg:
-                    logger.warning(f"{task_status}: {padCode}：{errorMsg}")
-                return -1
-
-            case -4:
-                if errorMsg:
-                    logger.warning(f"{task_status}: {padCode}：{errorMsg}")
-                return -1
-
-            case 1:
-                if errorMsg:
-                    logger.info(f"{task_status}: {padCode}：{errorMsg}")
-                return 0
-
-            case 2:
-                if errorMsg:
-                    logger.info(f"{task_status}: {padCode}：{errorMsg}")
-                return 0
-
-            case 3:
-                if errorMsg:
-                    logger.success(f"{task_status}: {padCode}：{errorMsg}")
-                return 1
-
-        return 0
-
-    except IndexError:
-        return 0
+    return await vmos_cache.read_through(list_url, {}, ttl=config.CACHE.pad_list_ttl,
+                                         fetch=VmosUtil(list_url).send)
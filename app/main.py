@@ -1,7 +1,8 @@
+import asyncio
 import logging
 import random
 from contextlib import asynccontextmanager
-from typing import Any
+from typing import Any, List
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -16,9 +17,17 @@ from app.routers import accounts, proxy, server, status, auth, statistics, proxy
 from app.routers import pad_code as pad_code_router
 from app.routers import config as config_router
 from app.routers import websocket as websocket_router
+from app.routers import vmos as vmos_router
 from app.services.database import engine, Base
+from app.services.device_scheduler import operation_priority, PRIORITY_ROUTINE
+from app.services.http_client import vmos_client
+from app.services.leader import leader_elector
+from app.services.pipeline_resume import resume_pipelines
+from app.services.sharding import pad_shards
+from app.services.status_buffer import status_buffer
 # 导入日志配置
 from app.services.logger import get_logger, task_logger
+from app.services.vmos_trace import vmos_recorder, vmos_replayer
 
 # 获取主应用logger
 logger = get_logger("main")
@@ -42,6 +51,47 @@ class InterceptHandler(logging.Handler):
         logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
 
 
+async def _init_pad(pad_code: str, progress: list) -> None:
+    """初始化单台云机：写入状态、分配代理并一键新机（progress 为 [已完成数, 总数]）"""
+    try:
+        template_id = random.choice(config.TEMPLE_IDS)
+        await add_cloud_status(pad_code, template_id)
+
+        default_proxy: Any = manager.get_proxy_countries()
+        selected_proxy = random.choice(default_proxy)
+        await set_proxy_status(pad_code, selected_proxy, number_of_run=1)
+
+        if not config.DEBUG:
+            result = await replace_pad([pad_code], template_id=template_id)
+            task_logger.info(f"云机启动完成: {pad_code}, 模板: {template_id}, 结果: {result.get('msg', '未知')}")
+        else:
+            task_logger.info(f"调试模式 - 云机模拟启动: {pad_code}, 模板: {template_id}")
+
+        progress[0] += 1
+        logger.info(f"云机初始化进度: {progress[0]}/{progress[1]} ({pad_code})")
+
+    except Exception as e:
+        logger.error(f"初始化云机 {pad_code} 失败: {e}")
+
+
+async def _orchestrate(pad_codes: List[str]) -> None:
+    """接管云机：恢复流水线并初始化其余云机"""
+    # 从检查点恢复未完成的流水线，恢复失败或已超时的云机照常一键新机
+    resumed = set()
+    if not config.DEBUG:
+        resumed = await resume_pipelines(server.task_manager, pad_codes)
+        logger.info(f"从检查点恢复 {len(resumed)} 台云机")
+
+    # 初始化云机状态
+    pending_pads = [pad_code for pad_code in pad_codes if pad_code not in resumed]
+    logger.info(f"开始初始化 {len(pending_pads)} 台云机")
+
+    # 各云机并发初始化，一键新机由调度器按例行优先级限流，不挤占回收操作
+    progress = [0, len(pending_pads)]
+    with operation_priority(PRIORITY_ROUTINE):
+        await asyncio.gather(*(_init_pad(pad_code, progress) for pad_code in pending_pads))
+
+
 # noinspection PyShadowingNames
 @asynccontextmanager
 async def startup_event(app: FastAPI):
@@ -62,6 +112,15 @@ async def startup_event(app: FastAPI):
         load_proxy_countries()
         logger.info("代理国家列表加载完成")
 
+        # 创建VMOS共享HTTP连接池
+        await vmos_client.start()
+
+        # VMOS流量回放优先于录制
+        if config.VMOS_TRACE_REPLAY_FILE:
+            vmos_replayer.load(config.VMOS_TRACE_REPLAY_FILE, config.VMOS_TRACE_REPLAY_SPEED)
+        elif config.VMOS_TRACE_RECORD_FILE:
+            vmos_recorder.start(config.VMOS_TRACE_RECORD_FILE)
+
         # 挂载静态文件和路由
         app.mount("/static", StaticFiles(directory="static"), name="static")
         app.include_router(auth.router, prefix="/auth", tags=["认证"])
@@ -69,6 +128,7 @@ async def startup_event(app: FastAPI):
         app.include_router(proxy_collection.router, prefix="", tags=["代理集合"])
         app.include_router(websocket_router.router, tags=["WebSocket"])
         app.include_router(config_router.router, prefix="/api", tags=["配置管理"])
+        app.include_router(vmos_router.router, prefix="/api", tags=["VMOS客户端"])
         app.include_router(pad_code_router.router, prefix="", tags=["设备代码管理"])
         app.include_router(accounts.router, prefix="")
         app.include_router(proxy.router, prefix="")
@@ -82,29 +142,18 @@ async def startup_event(app: FastAPI):
             await conn.run_sync(Base.metadata.create_all)
         logger.info("数据库表创建/检查完成")
 
-        # 初始化云机状态
-        logger.info(f"开始初始化 {len(config.PAD_CODES)} 台云机")
-
-        for i, pad_code in enumerate(config.PAD_CODES):
-            try:
-                template_id = random.choice(config.TEMPLE_IDS)
-                await add_cloud_status(pad_code, template_id)
-
-                default_proxy: Any = manager.get_proxy_countries()
-                selected_proxy = random.choice(default_proxy)
-                await set_proxy_status(pad_code, selected_proxy, number_of_run=1)
-
-                if not config.DEBUG:
-                    result = await replace_pad([pad_code], template_id=template_id)
-                    task_logger.info(f"云机启动完成: {pad_code}, 模板: {template_id}, 结果: {result.get('msg', '未知')}")
-                else:
-                    task_logger.info(f"调试模式 - 云机模拟启动: {pad_code}, 模板: {template_id}")
+        # 云机状态写缓冲，定时批量写入
+        status_buffer.start()
 
-                logger.info(f"云机初始化进度: {i+1}/{len(config.PAD_CODES)} ({pad_code})")
+        # 云机由主节点负责，启用分片时按一致性哈希分到各 worker，worker 加入或退出时自动重新分配
+        pad_shards.on_acquired(_orchestrate)
+        pad_shards.on_released(server.task_manager.release_pads)
+        await pad_shards.start()
+        logger.info(f"当前 worker 负责 {len(pad_shards.owned)}/{len(config.PAD_CODES)} 台云机")
 
-            except Exception as e:
-                logger.error(f"初始化云机 {pad_code} 失败: {e}")
-                continue
+        # 回放录制的回调，驱动后续流水线（只在主节点启动一次，其他 worker 负责的云机由 /callback 转交）
+        if vmos_replayer.active and leader_elector.is_leader:
+            vmos_replayer.start_callbacks(server.callback)
 
         logger.success("=== 应用启动完成 ===")
 
@@ -117,9 +166,14 @@ async def startup_event(app: FastAPI):
     # 应用关闭时的清理工作
     logger.info("=== 应用开始关闭 ===")
 
+    owned = sorted(pad_shards.owned)
+
+    # 先停止本 worker 负责云机的流水线和事件处理器，之后不再产生新的状态更新
+    await server.task_manager.release_pads(owned)
+
     try:
-        # 清理云机状态
-        for pad_code in config.PAD_CODES:
+        # 清理本 worker 负责的云机状态（接管的 worker 会从检查点重建）
+        for pad_code in owned:
             try:
                 await remove_cloud_status(pad_code)
             except Exception as e:
@@ -130,6 +184,19 @@ async def startup_event(app: FastAPI):
     except Exception as e:
         logger.error(f"应用关闭时出错: {e}")
 
+    # 退出分片并释放云机锁和主节点锁，其他 worker 接管
+    await pad_shards.stop()
+
+    # 停止轨迹录制/回放
+    await vmos_replayer.stop()
+    vmos_recorder.stop()
+
+    # 最后停止写缓冲，把剩余的状态和计数全部写入数据库
+    await status_buffer.stop()
+
+    # 关闭VMOS共享HTTP连接池
+    await vmos_client.close()
+
     logger.info("=== 应用关闭完成 ===")
 
 
@@ -7,9 +7,10 @@ from sqlalchemy import ColumnElement
 from sqlalchemy.exc import IntegrityError
 
 from app.curd.proxy import update_proxies
-from app.curd.status import update_cloud_status
+from app.curd.status import queue_cloud_status
 from app.models.accounts import AccountResponse, AccountCreate, AccountUpdate, ForwardRequest, SecondaryEmail
 from app.services.database import SessionLocal, Account
+from app.services.vmos_metrics import vmos_metrics
 
 router = APIRouter()
 
@@ -35,7 +36,8 @@ async def create_account(account: AccountCreate) -> AccountResponse:
             if account.pad_code is not None:
                 logger.success(f"{account.pad_code}: 账号上传成功")
                 await update_proxies(pade_code=account.pad_code)
-                await update_cloud_status(pad_code=account.pad_code, num_of_success=1)
+                await queue_cloud_status(pad_code=account.pad_code, num_of_success=1)
+                vmos_metrics.record_account_success(account.pad_code)
             return db_account
         except IntegrityError:
             await db.rollback()
@@ -112,7 +114,7 @@ async def update_forward(forward: ForwardRequest) -> AccountResponse:
         account.status = 0
         await db.commit()
         await db.refresh(account)
-        await update_cloud_status(pad_code=forward.pad_code, forward_num=1)
+        await queue_cloud_status(pad_code=forward.pad_code, forward_num=1)
         return account
 
 
@@ -131,7 +133,7 @@ async def update_secondary_mail(secondary_mail: SecondaryEmail) -> AccountRespon
         account.status = 0
         await db.commit()
         await db.refresh(account)
-        await update_cloud_status(pad_code=secondary_mail.pad_code, secondary_email_num=1)
+        await queue_cloud_status(pad_code=secondary_mail.pad_code, secondary_email_num=1)
         return account
 
 
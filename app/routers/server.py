@@ -7,12 +7,19 @@ from fastapi.responses import FileResponse
 from starlette.responses import HTMLResponse
 
 from app.config import config
+from app.curd.pipeline_state import remove_pipeline_state
 from app.curd.status import update_cloud_status, set_proxy_status, remove_cloud_status
 from app.dependencies.countries import manager
 from app.dependencies.utils import replace_pad
 from app.models.accounts import AndroidPadCodeRequest
 from app.services.check_task import TaskManager
+from app.services.leader import leader_elector
 from app.services.logger import task_logger, get_logger
+from app.services.pad_actor import pad_actors
+from app.services.sharding import pad_shards
+from app.services.task_poller import task_status_poller
+from app.services.timer_wheel import device_timers
+from app.services.vmos_trace import vmos_recorder
 from app.services.task_status import (
     reboot_task_status, replace_pad_stak_status,
     app_install_task_status, app_start_task_status,
@@ -70,12 +77,28 @@ async def config_page():
 
 @router.post("/status")
 async def status(android_code: AndroidPadCodeRequest):
+    if not pad_shards.owns(android_code.pad_code):
+        # 云机由其他 worker 负责
+        if not await pad_shards.forward(android_code.pad_code, "status", android_code.model_dump()):
+            return {"message": "暂无 worker 负责该云机，请稍后重试", "error": True}
+        return {"message": "已转交负责该云机的 worker 处理"}
+    return await _handle_status(android_code)
+
+
+async def _handle_status(android_code: AndroidPadCodeRequest):
+    # 设备上报与该云机的回调、超时按到达顺序处理
+    return await pad_actors.ask(android_code.pad_code, "status", lambda: _handle_device_report(android_code))
+
+
+async def _handle_device_report(android_code: AndroidPadCodeRequest):
     pad_code = android_code.pad_code
     match android_code.type:
         case 0:
-            await update_cloud_status(pad_code, num_other_error=1)
+            counters = {"num_other_error": 1}
         case 1:
-            await update_cloud_status(pad_code=pad_code, num_of_error=1)
+            counters = {"num_of_error": 1}
+        case _:
+            counters = {}
     try:
         if pad_code in config.PAD_CODES:
             # 取消超时任务
@@ -86,12 +109,16 @@ async def status(android_code: AndroidPadCodeRequest):
             default_proxy: Any = manager.get_proxy_countries()
             selected_proxy = random.choice(default_proxy)
 
-            await set_proxy_status(pad_code, selected_proxy, number_of_run=1)
+            # 上报计数、运行次数和状态在同一条语句中直接写入（一并带上写缓冲中该云机的待写更新），
+            # 不会被之后的批量写入覆盖
             await update_cloud_status(
                 pad_code,
                 temple_id=template_id,
-                current_status="一键新机中"
+                current_status="一键新机中",
+                number_of_run=1,
+                **counters
             )
+            await set_proxy_status(pad_code, selected_proxy)
 
             task_logger.success(f"{pad_code}: 模板: {template_id}, 代理: {selected_proxy.country}")
             # 执行一键新机
@@ -103,6 +130,7 @@ async def status(android_code: AndroidPadCodeRequest):
             return {"message": "一键新机启动成功", "template_id": template_id, "country": selected_proxy.country}
         else:
             await remove_cloud_status(pad_code=pad_code)
+            await remove_pipeline_state(pad_code)
             return {"message": "其他机器成功"}
 
     except Exception as e:
@@ -118,6 +146,30 @@ async def proxy_collection_page():
     return HTMLResponse(content=content)
 
 
+@router.get("/actors")
+async def get_actors():
+    """云机事件处理器状态（处理器数量、信箱深度、各类事件的排队与处理耗时）"""
+    return pad_actors.get_stats()
+
+
+@router.get("/leader")
+async def get_leader():
+    """本 worker 的主节点选举状态"""
+    return leader_elector.get_stats()
+
+
+@router.get("/shards")
+async def get_shards():
+    """本 worker 的云机分片状态（存活 worker、负责的云机、接管/交出次数）"""
+    return pad_shards.get_stats()
+
+
+@router.get("/timers")
+async def get_timers(limit: int = 50):
+    """云机定时器状态及即将到期的定时器"""
+    return {"stats": device_timers.get_stats(), "upcoming": device_timers.upcoming(limit)}
+
+
 @router.get("/ipinfo")
 async def get_client_ip(request: Request):
     # 获取客户端IP地址
@@ -127,12 +179,40 @@ async def get_client_ip(request: Request):
 @router.post("/callback", response_model=str)
 async def callback(data: dict) -> str:
     """云机任务状态回调接口"""
+    pad_code = data.get("padCode")
+    if pad_code and not pad_shards.owns(pad_code):
+        # 等待该任务结果的流水线在负责该云机的 worker 上
+        if not await pad_shards.forward(pad_code, "callback", data):
+            return "error: pad owner unavailable"
+        return "ok"
+    return await _handle_callback(data)
+
+
+async def _handle_callback(data: dict) -> str:
     task_business_type = data.get("taskBusinessType")
     pad_code = data.get("padCode", "未知设备")
     task_id = data.get("taskId", "未知任务")
+    vmos_recorder.record_callback(data)
+    # 唤醒等待该任务的流水线（1003/1000/1124/1007 等带 taskId 的回调）
+    task_status_poller.resolve_from_callback(data)
 
     callback_logger.info(f"收到回调: 设备={pad_code}, 类型={task_business_type}, 任务ID={task_id}")
 
+    try:
+        int(task_business_type)
+    except (TypeError, ValueError) as e:
+        callback_logger.error(f"回调数据格式错误: {e}, 数据: {data}")
+        return "error: invalid task_business_type"
+
+    # 同一云机的回调按到达顺序处理，立即应答云端
+    await pad_actors.tell(pad_code, f"callback:{task_business_type}", lambda: _dispatch_callback(data))
+    return "ok"
+
+
+async def _dispatch_callback(data: dict) -> str:
+    task_business_type = data.get("taskBusinessType")
+    pad_code = data.get("padCode", "未知设备")
+
     try:
         match int(task_business_type):
             case 1000:  # 重启任务
@@ -195,4 +275,8 @@ async def callback(data: dict) -> str:
         return "error: invalid task_business_type"
     except Exception as e:
         callback_logger.error(f"处理回调时出错: {e}, 数据: {data}")
-        return "error: callback processing failed"
\ No newline at end of file
+        return "error: callback processing failed"
+
+
+pad_shards.register_forward("callback", _handle_callback)
+pad_shards.register_forward("status", lambda data: _handle_status(AndroidPadCodeRequest(**data)))
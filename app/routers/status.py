@@ -8,6 +8,7 @@ from app.curd.status import update_cloud_status
 from app.dependencies.countries import manager, load_proxy_countries
 from app.models.status import StatusResponse, StatusRequest, GetOneCloudStatus, AddStatusRequest
 from app.services.database import SessionLocal, Status
+from app.services.status_buffer import status_buffer
 
 router = APIRouter()
 
@@ -21,6 +22,12 @@ async def update_status_server(status_request: StatusRequest) -> StatusResponse:
     return status_response
 
 
+@router.get("/status_buffer")
+async def get_status_buffer_stats():
+    """云机状态写缓冲统计（待写云机数、批量写入次数、合并比例）"""
+    return status_buffer.get_stats()
+
+
 @router.get("/cloud_status", response_model=List[StatusResponse])
 async def get_status_server() -> List[StatusResponse]:
     async with SessionLocal() as db:
@@ -0,0 +1,116 @@
+import asyncio
+from typing import Any, Callable, Dict
+
+from fastapi import APIRouter
+
+from app.services.device_scheduler import device_scheduler
+from app.services.hedging import vmos_hedger
+from app.services.http_client import vmos_client
+from app.services.install_pipeline import install_engine
+from app.services.installed_apps import installed_apps
+from app.services.logger import get_logger
+from app.services.rate_limiter import vmos_limiter
+from app.services.request_coalescer import pad_coalescer
+from app.services.resilience import vmos_resilience
+from app.services.single_flight import vmos_single_flight
+from app.services.task_poller import task_status_poller
+from app.services.vmos_cache import vmos_cache
+from app.services.vmos_metrics import vmos_metrics
+from app.services.vmos_trace import vmos_recorder, vmos_replayer
+
+router = APIRouter()
+logger = get_logger("vmos_router")
+
+
+def _stats_response(name: str, get_stats: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    try:
+        return {
+            "status": "success",
+            "data": get_stats(),
+            "timestamp": asyncio.get_event_loop().time()
+        }
+    except Exception as e:
+        logger.error(f"获取{name}统计信息失败: {e}")
+        return {
+            "status": "error",
+            "message": str(e),
+            "timestamp": asyncio.get_event_loop().time()
+        }
+
+
+@router.get("/vmos/pool-stats")
+async def get_pool_stats():
+    """获取VMOS HTTP连接池统计信息"""
+    return _stats_response("连接池", vmos_client.get_pool_stats)
+
+
+@router.get("/vmos/coalescer-stats")
+async def get_coalescer_stats():
+    """获取多云机请求合并统计信息"""
+    return _stats_response("请求合并", pad_coalescer.get_stats)
+
+
+@router.get("/vmos/limiter-stats")
+async def get_limiter_stats():
+    """获取VMOS请求限流状态（并发窗口、队列深度、各接口令牌桶）"""
+    return _stats_response("限流", vmos_limiter.get_stats)
+
+
+@router.get("/vmos/resilience-stats")
+async def get_resilience_stats():
+    """获取VMOS调用重试与熔断状态"""
+    return _stats_response("容错", vmos_resilience.get_stats)
+
+
+@router.get("/vmos/metrics")
+async def get_vmos_metrics():
+    """获取VMOS调用统计：接口延迟直方图、错误与响应码、按阶段/云机的调用次数及每账号调用数"""
+    return _stats_response("调用", vmos_metrics.get_stats)
+
+
+@router.get("/vmos/cache-stats")
+async def get_cache_stats():
+    """获取只读查询缓存命中率"""
+    return _stats_response("缓存", vmos_cache.get_stats)
+
+
+@router.get("/vmos/single-flight-stats")
+async def get_single_flight_stats():
+    """获取相同在途请求去重统计"""
+    return _stats_response("去重", vmos_single_flight.get_stats)
+
+
+@router.get("/vmos/hedge-stats")
+async def get_hedge_stats():
+    """获取只读查询对冲请求统计（对冲次数、对冲胜出次数、预算拒绝次数）"""
+    return _stats_response("对冲", vmos_hedger.get_stats)
+
+
+@router.get("/vmos/task-poller-stats")
+async def get_task_poller_stats():
+    """获取全局任务状态轮询统计（跟踪任务数、批次大小、唤醒次数）"""
+    return _stats_response("任务轮询", task_status_poller.get_stats)
+
+
+@router.get("/vmos/trace-stats")
+async def get_trace_stats():
+    """获取VMOS流量录制/回放状态"""
+    return _stats_response("轨迹", lambda: {"recorder": vmos_recorder.get_stats(), "replayer": vmos_replayer.get_stats()})
+
+
+@router.get("/vmos/pipeline-stats")
+async def get_pipeline_stats():
+    """获取安装流水线状态机统计（各状态进入次数、超时、重试耗尽、耗时分布）"""
+    return _stats_response("流水线", install_engine.get_stats)
+
+
+@router.get("/vmos/scheduler-stats")
+async def get_scheduler_stats():
+    """获取云机变更操作调度统计（各类操作在途数、排队数、排队耗时）"""
+    return _stats_response("调度", device_scheduler.get_stats)
+
+
+@router.get("/vmos/installed-apps-stats")
+async def get_installed_apps_stats():
+    """获取各云机已安装应用缓存（版本、来源）及跳过的重复安装次数"""
+    return _stats_response("已安装应用", installed_apps.get_stats)
@@ -51,6 +51,34 @@ class Status(Base):
     num_other_error = Column(Integer, nullable=False, default=0)
 
 
+class PipelineState(Base):
+    """云机流水线检查点，服务重启后据此恢复进度"""
+    __tablename__ = "pipeline_state"
+    id = Column(Integer, primary_key=True, index=True)
+    pad_code = Column(String(100), nullable=False, unique=True)
+    stage = Column(String(50), nullable=False)
+    # JSON：任务类型 -> VMOS任务ID
+    task_ids = Column(Text, nullable=True)
+    # 流水线截止时间（Unix时间戳）
+    deadline_at = Column(Float, nullable=True)
+    attempts = Column(Integer, default=1, nullable=False)
+    temple_id = Column(Integer, nullable=True)
+    country_code = Column(String(100), nullable=True)
+    updated_at = Column(DateTime, default=datetime.datetime.now, nullable=False)
+
+
+class ShardMember(Base):
+    """参与云机分片的 worker 及其心跳"""
+    __tablename__ = "shard_member"
+    id = Column(Integer, primary_key=True, index=True)
+    worker_id = Column(String(200), nullable=False, unique=True)
+    # 最近一次心跳（Unix时间戳）
+    heartbeat_at = Column(Float, nullable=False)
+    # 持有云机 advisory lock 的数据库连接的后端进程ID，用于查找云机当前由哪个 worker 负责
+    backend_pid = Column(Integer, nullable=True)
+    started_at = Column(DateTime, default=datetime.datetime.now, nullable=False)
+
+
 class ProxyCollection(Base):
     __tablename__ = "proxy_collection"
     id = Column(Integer, primary_key=True, index=True)
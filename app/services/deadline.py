@@ -0,0 +1,55 @@
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Coroutine, Optional
+
+# 当前流水线的截止时间（time.monotonic() 绝对值），随 asyncio 任务上下文传递
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("vmos_deadline", default=None)
+
+
+def _tighter(seconds: float) -> float:
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    return deadline if current is None else min(current, deadline)
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """在此上下文内发出的VMOS调用最多还能用 seconds 秒（不会放宽外层截止时间）"""
+    token = _deadline.set(_tighter(seconds))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def set_deadline(seconds: float) -> None:
+    """设置当前任务的截止时间（只影响当前任务及其后创建的子任务）"""
+    _deadline.set(_tighter(seconds))
+
+
+def current_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+def remaining_budget() -> Optional[float]:
+    """剩余时间（秒），没有截止时间时返回 None"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def deadline_expired() -> bool:
+    remaining = remaining_budget()
+    return remaining is not None and remaining <= 0
+
+
+def create_detached_task(coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+    """创建不继承截止时间的任务
+
+    用于多个调用方共享的请求（合并批次、在途去重），避免第一个调用方的截止时间
+    截断其他调用方；各调用方仍按自己的截止时间等待结果。
+    """
+    context = contextvars.copy_context()
+    context.run(_deadline.set, None)
+    return asyncio.create_task(coro, context=context)
@@ -0,0 +1,156 @@
+import asyncio
+import heapq
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from app.config import config
+from app.services.deadline import remaining_budget
+from app.services.resilience import DeadlineExceededError
+from app.services.vmos_metrics import LatencyHistogram
+
+# 优先级（数值越小越先执行）
+PRIORITY_RECOVERY = 0  # 超时、失败后的回收
+PRIORITY_PIPELINE = 1  # 正常流水线
+PRIORITY_ROUTINE = 2  # 启动时批量初始化等例行操作
+
+# 会改变云机状态的接口 -> 操作类型（未在 DEVICE_OP_LIMITS 中配置上限的类型使用 DEVICE_OP_DEFAULT_LIMIT）
+DEVICE_OPERATIONS = {
+    "/vcpcloud/api/padApi/replacePad": "replace",
+    "/vcpcloud/api/padApi/replacement": "replace",
+    "/vcpcloud/api/padApi/restart": "reboot",
+    "/vcpcloud/api/padApi/uploadFileV3": "install",
+    "/vcpcloud/api/padApi/switchRoot": "root",
+    "/vcpcloud/api/padApi/startApp": "start",
+    "/vcpcloud/api/padApi/simulateTouch": "touch",
+}
+
+_current_priority: ContextVar[int] = ContextVar("device_operation_priority", default=PRIORITY_PIPELINE)
+
+
+@contextmanager
+def operation_priority(priority: int):
+    """在此上下文（及其中创建的任务）内发起的云机操作使用指定优先级"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> int:
+    """当前上下文中云机操作的优先级"""
+    return _current_priority.get()
+
+
+class _OperationQueue:
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.in_flight = 0
+        self.waiters: List[Tuple[float, int, asyncio.Future]] = []
+        self.admitted = 0
+        self.queued = 0
+        self.expired = 0
+        self.by_priority: Dict[int, int] = {}
+        self.wait_time = LatencyHistogram()
+
+    def to_dict(self) -> Dict[str, Any]:
+        wait_time = self.wait_time.to_dict()
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": sum(1 for _, _, future in self.waiters if not future.done()),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "deadline_expired": self.expired,
+            "by_priority": dict(self.by_priority),
+            "wait_p50_ms": wait_time["p50_ms"],
+            "wait_p99_ms": wait_time["p99_ms"]
+        }
+
+
+class DeviceOperationScheduler:
+    """云机变更操作（一键新机、重启、安装、root）的全局调度器
+
+    每种操作有独立的在途上限，超过上限的操作按优先级排队：排序键为入队时间加上
+    优先级 × priority_step 秒，回收操作排在例行操作前面，但例行操作等得足够久后也会轮到，不会饿死。
+    排队时间计入调用方的流水线截止时间。
+    """
+
+    def __init__(self):
+        scheduler_config = config.DEVICE_SCHEDULER
+        self._priority_step = scheduler_config.priority_step
+        self._queues: Dict[str, _OperationQueue] = {
+            op_type: _OperationQueue(scheduler_config.limits.get(op_type, scheduler_config.default_limit))
+            for op_type in DEVICE_OPERATIONS.values()
+        }
+        self._sequence = itertools.count()
+
+    async def run(self, path: str, send: Callable[[], Awaitable[Any]]) -> Any:
+        """按 path 对应的操作类型排队执行 send，非变更接口直接执行"""
+        op_type = DEVICE_OPERATIONS.get(path)
+        if op_type is None:
+            return await send()
+        queue = self._queues[op_type]
+        await self._acquire(path, queue)
+        try:
+            return await send()
+        finally:
+            self._release(queue)
+
+    async def _acquire(self, path: str, queue: _OperationQueue) -> None:
+        priority = _current_priority.get()
+        queue.by_priority[priority] = queue.by_priority.get(priority, 0) + 1
+        loop = asyncio.get_running_loop()
+        while queue.waiters and queue.waiters[0][2].done():
+            heapq.heappop(queue.waiters)
+        if queue.in_flight < queue.limit and not queue.waiters:
+            queue.in_flight += 1
+            queue.admitted += 1
+            queue.wait_time.observe(0)
+            return
+
+        started = loop.time()
+        future = loop.create_future()
+        heapq.heappush(queue.waiters, (started + priority * self._priority_step, next(self._sequence), future))
+        queue.queued += 1
+        try:
+            remaining = remaining_budget()
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceededError(path, "排队前流水线截止时间已过")
+            await asyncio.wait({future}, timeout=remaining)
+            if not future.done():
+                raise DeadlineExceededError(path, "排队等待时超出流水线截止时间")
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # 已分配到名额但调用方放弃，归还名额
+                self._release(queue)
+            else:
+                future.cancel()
+            if isinstance(e, DeadlineExceededError):
+                queue.expired += 1
+            raise
+        queue.admitted += 1
+        queue.wait_time.observe((loop.time() - started) * 1000)
+
+    @staticmethod
+    def _release(queue: _OperationQueue) -> None:
+        queue.in_flight -= 1
+        while queue.waiters and queue.in_flight < queue.limit:
+            _, _, future = heapq.heappop(queue.waiters)
+            if future.done():
+                # 已放弃排队的调用方
+                continue
+            queue.in_flight += 1
+            future.set_result(None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "priority_step_seconds": self._priority_step,
+            "operations": {op_type: queue.to_dict() for op_type, queue in self._queues.items()}
+        }
+
+
+# 全局云机操作调度器
+device_scheduler = DeviceOperationScheduler()
@@ -0,0 +1,123 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config import config
+from app.services.logger import get_logger
+from app.services.resilience import READ_ONLY_ENDPOINTS
+from app.services.vmos_metrics import vmos_metrics
+
+logger = get_logger("hedging")
+
+
+class _HedgeStats:
+    def __init__(self):
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+
+
+class RequestHedger:
+    """只读查询的对冲请求
+
+    请求超过接口观测到的延迟分位数（默认p95）仍未返回时，再发一次相同请求，
+    取先返回的结果并取消另一个。对冲预算按请求数累积（每个请求 max_ratio 个），
+    保证对冲请求不超过总请求的固定比例。只对只读接口生效。
+    """
+
+    def __init__(self):
+        hedge_config = config.HEDGE
+        self._enabled = hedge_config.enabled
+        self._endpoints = frozenset(hedge_config.endpoints) & READ_ONLY_ENDPOINTS
+        self._quantile = hedge_config.quantile
+        self._min_delay = hedge_config.min_delay_ms / 1000
+        self._max_ratio = hedge_config.max_ratio
+        self._min_samples = hedge_config.min_samples
+        # 预算上限，允许短时间内集中对冲
+        self._budget_cap = max(1.0, self._max_ratio * 100)
+        self._budget = 0.0
+        self._stats: Dict[str, _HedgeStats] = {}
+
+    def _hedge_delay(self, path: str) -> Optional[float]:
+        if not self._enabled or path not in self._endpoints:
+            return None
+        delay = vmos_metrics.get_endpoint_quantile(path, self._quantile, min_samples=self._min_samples)
+        if delay is None:
+            return None
+        return max(delay, self._min_delay)
+
+    def _take_budget(self) -> bool:
+        if self._budget >= 1:
+            self._budget -= 1
+            return True
+        return False
+
+    async def run(self, path: str, send_once: Callable[[], Awaitable[Any]]) -> Any:
+        """执行一次调用，必要时发出对冲请求"""
+        delay = self._hedge_delay(path)
+        if delay is None:
+            return await send_once()
+
+        stats = self._stats.setdefault(path, _HedgeStats())
+        stats.requests += 1
+        self._budget = min(self._budget_cap, self._budget + self._max_ratio)
+
+        primary = asyncio.create_task(send_once())
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+            if not self._take_budget():
+                stats.budget_denied += 1
+                return await primary
+
+            stats.hedged += 1
+            hedge = asyncio.create_task(send_once())
+            return await self._first_answer(primary, hedge, stats)
+        except BaseException:
+            if not primary.done():
+                primary.cancel()
+            raise
+
+    @staticmethod
+    async def _first_answer(primary: asyncio.Task, hedge: asyncio.Task, stats: _HedgeStats) -> Any:
+        """返回先成功的结果；先返回的失败时等待另一个"""
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            stats.hedge_wins += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        endpoints = {}
+        for path, stats in self._stats.items():
+            delay = self._hedge_delay(path)
+            endpoints[path] = {
+                "requests": stats.requests,
+                "hedged": stats.hedged,
+                "hedge_wins": stats.hedge_wins,
+                "budget_denied": stats.budget_denied,
+                "hedge_ratio": round(stats.hedged / stats.requests, 3) if stats.requests else 0,
+                "hedge_delay_ms": round(delay * 1000, 1) if delay is not None else None
+            }
+        return {
+            "enabled": self._enabled,
+            "quantile": self._quantile,
+            "max_ratio": self._max_ratio,
+            "budget": round(self._budget, 2),
+            "endpoints": endpoints
+        }
+
+
+# 全局对冲请求实例
+vmos_hedger = RequestHedger()
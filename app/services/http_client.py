@@ -0,0 +1,116 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from app.config import config
+from app.services.logger import get_logger
+
+logger = get_logger("http_client")
+
+
+class VmosHttpClient:
+    """VMOS云端API的进程级HTTP客户端
+
+    所有 VmosUtil 请求共用同一个 ClientSession 和 TCPConnector，
+    以复用 keep-alive 连接、缓存DNS，避免每次调用重新进行 TCP+TLS 握手。
+    生命周期由 FastAPI lifespan 管理：启动时 start()，关闭时 close()。
+    """
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        self._started_at: Optional[float] = None
+        self._total_requests = 0
+        self._failed_requests = 0
+        self._in_flight = 0
+
+    @property
+    def started(self) -> bool:
+        return self._session is not None and not self._session.closed
+
+    async def start(self) -> None:
+        """创建共享连接池"""
+        if self.started:
+            return
+
+        http_config = config.HTTP_CLIENT
+        self._connector = aiohttp.TCPConnector(
+            limit=http_config.limit,
+            limit_per_host=http_config.limit_per_host,
+            keepalive_timeout=http_config.keepalive_timeout,
+            ttl_dns_cache=http_config.dns_cache_ttl,
+            use_dns_cache=True
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=http_config.total_timeout,
+            connect=http_config.connect_timeout,
+            sock_read=http_config.read_timeout
+        )
+        self._session = aiohttp.ClientSession(connector=self._connector, timeout=timeout)
+        self._started_at = time.monotonic()
+        logger.info(f"VMOS HTTP连接池已创建: limit={http_config.limit}, "
+                    f"limit_per_host={http_config.limit_per_host}")
+
+    async def close(self) -> None:
+        """关闭共享连接池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("VMOS HTTP连接池已关闭")
+        self._session = None
+        self._connector = None
+        self._started_at = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # 未经 lifespan 启动（如脚本、调试）时按需创建
+        if not self.started:
+            await self.start()
+        return self._session
+
+    async def post_json(self, url: str, headers: Dict[str, str], data: Any) -> Any:
+        """发送POST请求并解析JSON响应"""
+        session = await self._get_session()
+        self._total_requests += 1
+        self._in_flight += 1
+        try:
+            async with session.post(url, headers=headers, data=data) as response:
+                return await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self._failed_requests += 1
+            raise
+        finally:
+            self._in_flight -= 1
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """获取连接池统计信息"""
+        http_config = config.HTTP_CLIENT
+        stats: Dict[str, Any] = {
+            "started": self.started,
+            "uptime_seconds": round(time.monotonic() - self._started_at, 1) if self._started_at else 0,
+            "limit": http_config.limit,
+            "limit_per_host": http_config.limit_per_host,
+            "keepalive_timeout": http_config.keepalive_timeout,
+            "dns_cache_ttl": http_config.dns_cache_ttl,
+            "total_requests": self._total_requests,
+            "failed_requests": self._failed_requests,
+            "in_flight": self._in_flight,
+            "acquired_connections": 0,
+            "idle_connections": 0
+        }
+
+        connector = self._connector
+        if connector is not None and not connector.closed:
+            # aiohttp 未公开连接池计数，读取内部结构时做容错
+            acquired = getattr(connector, "_acquired", None)
+            idle = getattr(connector, "_conns", None)
+            if acquired is not None:
+                stats["acquired_connections"] = len(acquired)
+            if idle is not None:
+                stats["idle_connections"] = sum(len(conns) for conns in idle.values())
+
+        return stats
+
+
+# 全局VMOS HTTP客户端实例
+vmos_client = VmosHttpClient()
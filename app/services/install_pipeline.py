@@ -0,0 +1,259 @@
+import asyncio
+import time
+from enum import IntEnum
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from app.config import config, AppSpec
+from app.curd.status import queue_cloud_status
+from app.dependencies.utils import install_app, get_app_install_info
+from app.services.installed_apps import installed_apps
+from app.services.pipeline_checkpoint import checkpoint, STAGE_INSTALL
+from app.services.pipeline_engine import PipelineEngine, PipelineRun, StateSpec
+from app.services.recycle import recycle_pad
+from app.services.resilience import VmosApiError
+from app.services.task_poller import task_status_poller
+from app.services.vmos_metrics import vmos_metrics
+
+
+class InstallTaskStatus(IntEnum):
+    ALL_FAILED = -1
+    SOME_FAILED = -2
+    CANCEL = -3
+    TIMEOUT = -4
+    PENDING = 1
+    RUNNING = 2
+    COMPLETED = 3
+
+
+def _install_status(task_status: Any) -> InstallTaskStatus:
+    """云端返回未知或缺失的状态时按等待中处理，继续轮询直到任务结束，不影响同时安装的其他应用"""
+    try:
+        return InstallTaskStatus(task_status)
+    except ValueError:
+        logger.warning(f"未知的安装任务状态: {task_status!r}，按等待中处理")
+        return InstallTaskStatus.PENDING
+
+
+# 状态名
+SUBMIT = "submit"  # 提交尚未安装的应用
+WAIT = "wait"  # 等待已提交的安装任务结束
+VERIFY = "verify"  # 通过已安装应用列表确认安装结果
+CONFIGURE = "configure"  # 设置root/语言/时区/GPS并启动应用
+DONE = "done"
+RECYCLE = "recycle"
+
+# 安装任务最多提交几轮（首次 + 失败重装）
+SUBMIT_ATTEMPTS = 3
+# 确认安装结果的轮询间隔（秒）和最多次数
+VERIFY_INTERVAL = 10
+VERIFY_ATTEMPTS = 40
+
+
+async def _submit_one(pad_code: str, spec: AppSpec) -> Any:
+    result: Any = await install_app(pad_code_list=[pad_code], app_url=spec.url, md5=spec.md5)
+    logger.info(f"{pad_code}: {spec.name} 安装结果: {result['msg']}")
+    return result["data"][0]["taskId"]
+
+
+async def _refresh_installed(run: PipelineRun) -> list:
+    """查询已安装应用列表并更新缓存"""
+    app_install_result: Any = await get_app_install_info([run.pad_code])
+    apps = app_install_result["data"][0]["apps"] or []
+    installed_apps.update_from_list(run.pad_code, apps, list(run.data["apps"].values()))
+    return apps
+
+
+async def _submit(run: PipelineRun) -> str:
+    """并发提交没有在途任务、也未安装成功的应用，各应用的提交结果互不影响"""
+    pending = run.data["pending"]
+    if run.attempts[SUBMIT] > 1:
+        # 重新提交前确认哪些应用其实已在云机上，只补缺少或版本过期的应用
+        await _refresh_installed(run)
+        present = [task_type for task_type in pending
+                   if installed_apps.is_present(run.pad_code, run.data["apps"][task_type])]
+        if present:
+            logger.info(f"{run.pad_code}: 已安装，跳过重新上传 {', '.join(present)}")
+            installed_apps.record_skipped(len(present))
+            for task_type in present:
+                pending.remove(task_type)
+        if not pending:
+            return VERIFY
+        logger.warning(f"{run.pad_code}: 重新上传 {', '.join(pending)}")
+        await queue_cloud_status(pad_code=run.pad_code, current_status=f"{'、'.join(pending)}重新安装")
+
+    started = time.monotonic()
+    submitting = list(pending)
+    results = await asyncio.gather(*(_submit_one(run.pad_code, run.data["apps"][task_type])
+                                     for task_type in submitting),
+                                   return_exceptions=True)
+    vmos_metrics.record_install_submit(run.pad_code, time.monotonic() - started)
+
+    failed = []
+    for task_type, result in zip(submitting, results):
+        if isinstance(result, BaseException):
+            logger.error(f"{run.pad_code}: {task_type} 提交安装失败: {result}")
+            failed.append(task_type)
+            continue
+        run.data["task_ids"][task_type] = result
+        pending.remove(task_type)
+
+    if len(failed) == len(submitting):
+        # 全部提交失败，由引擎按重试次数重新提交
+        raise VmosApiError("/vcpcloud/api/padApi/uploadFileV3", f"{'、'.join(failed)} 提交安装失败")
+
+    # 提交成功的应用先进入等待，失败的应用在确认阶段重新提交
+    await checkpoint(run.pad_code, STAGE_INSTALL, task_ids=run.data["task_ids"])
+    return WAIT
+
+
+async def _watch_install(pad_code: str, task_type: str, task_id: Any) -> bool:
+    """等待单个安装任务结束，返回是否安装成功"""
+    task_status_poller.watch(task_id)
+    task_status = None
+    try:
+        while True:
+            try:
+                detail = await task_status_poller.wait(task_id, known_status=task_status, max_wait=VERIFY_INTERVAL)
+            except VmosApiError as e:
+                logger.error(f"获取任务 {task_id} 状态失败: {e}")
+                continue
+            if detail.get("taskStatus") == task_status:
+                continue
+            task_status = detail.get("taskStatus")
+            error_message = detail.get("errorMsg")
+
+            match _install_status(task_status):
+                case InstallTaskStatus.PENDING:
+                    logger.info(f"{pad_code}: {task_type} 等待安装中")
+                    await queue_cloud_status(pad_code=pad_code, current_status=f"{task_type}等待安装中")
+
+                case InstallTaskStatus.RUNNING:
+                    logger.info(f"{pad_code}: {task_type} 安装中")
+                    await queue_cloud_status(pad_code=pad_code, current_status=f"{task_type}安装中")
+
+                case InstallTaskStatus.COMPLETED:
+                    logger.success(f"{pad_code}: {task_type} 安装完成")
+                    await queue_cloud_status(pad_code=pad_code, current_status=f"安装成功: {task_type}")
+                    return True
+
+                case InstallTaskStatus.SOME_FAILED:
+                    logger.warning(f"{pad_code}: {task_type} 下载失败，重试")
+                    await queue_cloud_status(pad_code=pad_code, current_status=f"{task_type}下载失败")
+                    return False
+
+                case InstallTaskStatus.ALL_FAILED:
+                    logger.error(f"{pad_code}: {task_type} 全部失败")
+                    if error_message:
+                        await queue_cloud_status(pad_code=pad_code, current_status=f"安装失败: {error_message}")
+                    return False
+
+                case InstallTaskStatus.TIMEOUT | InstallTaskStatus.CANCEL:
+                    logger.warning(f"{pad_code}: {task_type} 任务超时或取消")
+                    return False
+    finally:
+        task_status_poller.unwatch(task_id)
+
+
+async def _wait(run: PipelineRun) -> str:
+    """并发等待所有在途安装任务；任一等待出错时其余等待一并取消"""
+    task_ids: Dict[str, Any] = run.data["task_ids"]
+    installed = run.data["installed"]
+    async with asyncio.TaskGroup() as group:
+        watchers = {
+            task_type: group.create_task(_watch_install(run.pad_code, task_type, task_id))
+            for task_type, task_id in task_ids.items() if task_type not in installed
+        }
+
+    for task_type, watcher in watchers.items():
+        if watcher.result():
+            installed.add(task_type)
+            installed_apps.mark_installed(run.pad_code, run.data["apps"][task_type])
+        else:
+            # 失败的应用重新提交
+            del task_ids[task_type]
+            run.data["pending"].append(task_type)
+    return VERIFY
+
+
+async def _verify(run: PipelineRun) -> str:
+    if run.data["pending"]:
+        return SUBMIT
+
+    specs = list(run.data["apps"].values())
+    apps = await _refresh_installed(run)
+    if all(installed_apps.is_installed(run.pad_code, spec) for spec in specs):
+        logger.success(f"{run.pad_code}: 安装成功")
+        await queue_cloud_status(pad_code=run.pad_code, current_status="安装成功")
+        return CONFIGURE
+
+    if apps:
+        # 本轮任务已完成的应用可能还没出现在列表中，只重装确实缺少或版本过期的应用
+        missing = [spec.name for spec in installed_apps.missing(run.pad_code, specs)
+                   if spec.name not in run.data["installed"]]
+    else:
+        # 云机上没有任何应用，全部重新安装
+        missing = [spec.name for spec in specs]
+    if missing:
+        logger.warning(f"{run.pad_code}: 缺少 {', '.join(missing)}，重新上传")
+        await queue_cloud_status(pad_code=run.pad_code, current_status="上传失败，重新上传")
+        for task_type in missing:
+            run.data["task_ids"].pop(task_type, None)
+            run.data["installed"].discard(task_type)
+            run.data["pending"].append(task_type)
+        return SUBMIT
+
+    for app in apps:
+        if app.get("appState") != 0:
+            logger.info(f"{app.get('appName')} 状态: {app.get('appState')}")
+    await asyncio.sleep(VERIFY_INTERVAL)
+    return VERIFY
+
+
+async def _configure(run: PipelineRun) -> str:
+    await run.task_manager.configure_and_start(run.pad_code)
+    return DONE
+
+
+async def _done(run: PipelineRun) -> None:
+    # 主任务结束，保留全局超时等待设备上报结果
+    await run.task_manager.complete_main_task(run.pad_code)
+
+
+async def _recycle(run: PipelineRun) -> None:
+    await recycle_pad(run.pad_code, "安装超时，正在一键新机")
+    await run.task_manager.remove_task(run.pad_code)
+
+
+install_engine = PipelineEngine("install", {
+    SUBMIT: StateSpec(_submit, max_attempts=SUBMIT_ATTEMPTS, on_exhausted=RECYCLE, stage="install"),
+    WAIT: StateSpec(_wait, timeout=config.get_timeout("check_task") * 60, max_attempts=SUBMIT_ATTEMPTS + 1,
+                    on_timeout=RECYCLE, on_exhausted=RECYCLE, stage="install"),
+    VERIFY: StateSpec(_verify, max_attempts=VERIFY_ATTEMPTS, on_exhausted=RECYCLE, stage="install"),
+    CONFIGURE: StateSpec(_configure, max_attempts=2, on_exhausted=RECYCLE, stage="start"),
+    DONE: StateSpec(_done),
+    RECYCLE: StateSpec(_recycle, stage="recycle"),
+}, initial=SUBMIT)
+
+
+async def run_install_pipeline(pad_code: str, task_manager, task_ids: Optional[Dict[str, Any]] = None,
+                               start: Optional[str] = None) -> Optional[str]:
+    """运行安装流水线
+
+    task_ids 为已提交的安装任务（服务重启恢复时从检查点读取），缺少的应用会重新提交；
+    start 指定从哪个状态开始（默认按 task_ids 决定提交或等待）。
+    """
+    task_ids = dict(task_ids or {})
+    apps = {spec.name: spec for spec in config.get_app_manifest()}
+    run = PipelineRun(pad_code=pad_code, task_manager=task_manager, data={
+        "apps": apps,
+        "task_ids": {task_type: task_id for task_type, task_id in task_ids.items() if task_type in apps},
+        "pending": [task_type for task_type, spec in apps.items()
+                    if task_type not in task_ids and not installed_apps.is_installed(pad_code, spec)],
+        "installed": set()
+    })
+    installed_apps.record_skipped(len(apps) - len(run.data["task_ids"]) - len(run.data["pending"]))
+    if start is None:
+        start = SUBMIT if run.data["pending"] else WAIT
+    return await install_engine.run(run, start=start)
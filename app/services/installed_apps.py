@@ -0,0 +1,118 @@
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.config import AppSpec
+
+# 已安装应用列表中的 appState：0 表示安装完成
+APP_STATE_INSTALLED = 0
+
+
+@dataclass
+class _InstalledApp:
+    md5: Optional[str]
+    state: int
+    source: str
+    updated_at: float
+
+
+class InstalledAppCache:
+    """每台云机已安装应用的缓存
+
+    由 listInstalledApp 结果、安装回调和安装任务完成结果维护，一键新机时清空。
+    安装流水线据此只提交缺少或版本（md5）不一致的应用。
+    """
+
+    def __init__(self):
+        self._pads: Dict[str, Dict[str, _InstalledApp]] = {}
+        self._refreshes = 0
+        self._skipped = 0
+
+    @staticmethod
+    def _match(spec: AppSpec, app: Dict[str, Any]) -> bool:
+        """把已安装应用列表中的条目对应到清单中的应用（包名优先，其次 md5 和名称）"""
+        package = app.get("packageName") or app.get("pkgName")
+        if spec.package and package == spec.package:
+            return True
+        app_name = str(app.get("appName") or "")
+        return (app.get("md5") == spec.md5 or app_name == spec.md5
+                or app_name.lower() == spec.name.lower())
+
+    def _record(self, pad_code: str, spec: AppSpec, md5: Optional[str], state: int, source: str) -> None:
+        self._pads.setdefault(pad_code, {})[spec.name] = _InstalledApp(md5, state, source, time.time())
+
+    def mark_installed(self, pad_code: str, spec: AppSpec) -> None:
+        """本服务提交的安装任务已完成"""
+        self._record(pad_code, spec, spec.md5, APP_STATE_INSTALLED, "task")
+
+    def record_callback(self, data: Dict[str, Any], manifest: Iterable[AppSpec]) -> None:
+        """应用安装回调（1003）完成时记录"""
+        apps = data.get("apps") if isinstance(data.get("apps"), dict) else {}
+        pad_code = apps.get("padCode") or data.get("padCode")
+        if not pad_code or data.get("taskStatus") != 3:
+            return
+        for spec in manifest:
+            if self._match(spec, apps):
+                self._record(pad_code, spec, apps.get("md5") or spec.md5, APP_STATE_INSTALLED, "callback")
+                return
+
+    def update_from_list(self, pad_code: str, apps: List[Dict[str, Any]], manifest: List[AppSpec]) -> None:
+        """用 listInstalledApp 返回的应用列表重建该云机的缓存"""
+        self._refreshes += 1
+        previous = self._pads.get(pad_code, {})
+        current: Dict[str, _InstalledApp] = {}
+        for spec in manifest:
+            for app in apps:
+                if self._match(spec, app):
+                    # 列表里没有 md5 时沿用之前记录的版本
+                    known = previous.get(spec.name)
+                    md5 = app.get("md5") or (known.md5 if known else None)
+                    current[spec.name] = _InstalledApp(md5, app.get("appState", APP_STATE_INSTALLED),
+                                                       "list", time.time())
+                    break
+
+        # 无法逐个对应（列表没有包名等信息）时，数量齐全且全部安装完成视为都已安装
+        if len(current) < len(manifest) and len(apps) >= len(manifest) \
+                and all(app.get("appState") == APP_STATE_INSTALLED for app in apps):
+            for spec in manifest:
+                current.setdefault(spec.name, _InstalledApp(None, APP_STATE_INSTALLED, "list", time.time()))
+
+        self._pads[pad_code] = current
+
+    def is_installed(self, pad_code: str, spec: AppSpec) -> bool:
+        """已安装完成且版本与清单一致（版本未知时按一致处理）"""
+        app = self._pads.get(pad_code, {}).get(spec.name)
+        return app is not None and app.state == APP_STATE_INSTALLED and (app.md5 is None or app.md5 == spec.md5)
+
+    def is_present(self, pad_code: str, spec: AppSpec) -> bool:
+        """云机上存在该应用（可能仍在安装中）且版本一致"""
+        app = self._pads.get(pad_code, {}).get(spec.name)
+        return app is not None and (app.md5 is None or app.md5 == spec.md5)
+
+    def missing(self, pad_code: str, manifest: Iterable[AppSpec]) -> List[AppSpec]:
+        """需要（重新）提交安装的应用：不存在或版本过期"""
+        return [spec for spec in manifest if not self.is_present(pad_code, spec)]
+
+    def record_skipped(self, count: int) -> None:
+        self._skipped += count
+
+    def forget(self, pad_codes: Iterable[str]) -> None:
+        """一键新机后云机上的应用全部清空"""
+        for pad_code in pad_codes:
+            self._pads.pop(pad_code, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pads": len(self._pads),
+            "refreshes": self._refreshes,
+            "skipped_installs": self._skipped,
+            "apps": {
+                pad_code: {name: {"md5": app.md5, "state": app.state, "source": app.source}
+                           for name, app in apps.items()}
+                for pad_code, apps in self._pads.items()
+            }
+        }
+
+
+# 全局已安装应用缓存
+installed_apps = InstalledAppCache()
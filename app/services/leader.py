@@ -0,0 +1,210 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from app.config import config
+from app.services.database import engine
+from app.services.deadline import create_detached_task
+from app.services.logger import get_logger
+
+logger = get_logger("leader")
+
+ForwardHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class LeaderElector:
+    """基于 Postgres 会话级 advisory lock 的主节点选举
+
+    多个 worker 进程都对外提供 HTTP，同一时刻只有持有锁的 worker 是主节点。
+    未启用云机分片时由主节点负责全部云机的编排（启动回收、轮询、超时），非主节点收到的回调和
+    设备上报通过 NOTIFY 转交给主节点；启用分片后云机按分片编排，主节点只负责集群级的单例工作。
+    锁绑定在一条专用数据库连接上，主节点进程退出或连接断开时 Postgres 自动释放，
+    其他 worker 在下一次重试时接管，并从流水线检查点恢复。
+    """
+
+    def __init__(self):
+        election_config = config.LEADER_ELECTION
+        self.enabled = election_config.enabled
+        self._lock_key = election_config.lock_key
+        self._retry_seconds = election_config.retry_seconds
+        self._check_seconds = election_config.check_seconds
+        self._channel = election_config.channel
+        self._conn: Any = None
+        self._is_leader = False
+        self._loop_task: Optional[asyncio.Task] = None
+        self._leader_task: Optional[asyncio.Task] = None
+        self._on_elected: List[Callable[[], Awaitable[Any]]] = []
+        self._on_demoted: List[Callable[[], Awaitable[Any]]] = []
+        self._handlers: Dict[str, ForwardHandler] = {}
+        self._elected_at: Optional[float] = None
+        self._elections = 0
+        self._demotions = 0
+        self._forwarded = 0
+        self._received = 0
+
+    @property
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    def on_elected(self, callback: Callable[[], Awaitable[Any]]) -> None:
+        """成为主节点后执行（启动回收、恢复流水线等）"""
+        self._on_elected.append(callback)
+
+    def on_demoted(self, callback: Callable[[], Awaitable[Any]]) -> None:
+        """失去主节点身份后执行（停止本进程的编排任务）"""
+        self._on_demoted.append(callback)
+
+    def register_forward(self, kind: str, handler: ForwardHandler) -> None:
+        """注册主节点处理转交消息的函数"""
+        self._handlers[kind] = handler
+
+    async def start(self) -> bool:
+        """启动选举；本进程立即成为主节点时等待编排初始化完成，返回是否为主节点"""
+        if not self.enabled:
+            # 单进程部署：本进程即主节点
+            self._is_leader = True
+            self._elected_at = time.time()
+            await self._run_elected()
+            return True
+
+        if await self._try_acquire():
+            await self._elect()
+            await asyncio.shield(self._leader_task)
+        else:
+            logger.info(f"worker {os.getpid()}: 主节点已存在，仅提供 HTTP 服务")
+        self._loop_task = create_detached_task(self._loop())
+        return self._is_leader
+
+    async def stop(self) -> None:
+        """停止选举并释放锁"""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+        if self._leader_task is not None and not self._leader_task.done():
+            self._leader_task.cancel()
+        await self._release()
+        self._is_leader = False
+
+    async def forward(self, kind: str, data: Dict[str, Any]) -> None:
+        """把消息交给主节点处理（本进程是主节点时直接处理）"""
+        if self._is_leader:
+            await self._handlers[kind](data)
+            return
+        payload = json.dumps({"kind": kind, "data": data}, ensure_ascii=False)
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                               {"channel": self._channel, "payload": payload})
+            await conn.commit()
+        self._forwarded += 1
+
+    async def _try_acquire(self) -> bool:
+        conn = None
+        try:
+            conn = await engine.connect()
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            result = await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self._lock_key})
+            if not result.scalar():
+                await conn.close()
+                return False
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.add_listener(self._channel, self._on_notify)
+            self._conn = conn
+            return True
+        except Exception as e:
+            logger.warning(f"获取主节点锁失败: {e}")
+            if conn is not None:
+                await self._discard(conn)
+            return False
+
+    async def _release(self) -> None:
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            await self._discard(conn)
+
+    @staticmethod
+    async def _discard(conn) -> None:
+        """断开连接而不是归还连接池，确保会话级锁随之释放"""
+        try:
+            await conn.invalidate()
+            await conn.close()
+        except Exception as e:
+            logger.debug(f"关闭主节点锁连接出错: {e}")
+
+    async def _elect(self) -> None:
+        self._is_leader = True
+        self._elected_at = time.time()
+        self._elections += 1
+        logger.success(f"worker {os.getpid()}: 成为主节点，接管云机编排")
+        self._leader_task = create_detached_task(self._run_elected())
+
+    async def _run_elected(self) -> None:
+        for callback in self._on_elected:
+            try:
+                await callback()
+            except Exception as e:
+                logger.error(f"主节点初始化出错: {e}")
+
+    async def _demote(self) -> None:
+        self._is_leader = False
+        self._demotions += 1
+        logger.error(f"worker {os.getpid()}: 主节点锁连接断开，停止云机编排")
+        if self._leader_task is not None and not self._leader_task.done():
+            self._leader_task.cancel()
+        await self._release()
+        for callback in self._on_demoted:
+            try:
+                await callback()
+            except Exception as e:
+                logger.error(f"停止云机编排出错: {e}")
+
+    async def _loop(self) -> None:
+        while True:
+            if self._is_leader:
+                await asyncio.sleep(self._check_seconds)
+                try:
+                    await self._conn.execute(text("SELECT 1"))
+                except Exception as e:
+                    logger.warning(f"主节点锁连接检查失败: {e}")
+                    await self._demote()
+            else:
+                await asyncio.sleep(self._retry_seconds)
+                if await self._try_acquire():
+                    await self._elect()
+
+    def _on_notify(self, _conn, _pid, _channel, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            handler = self._handlers[message["kind"]]
+        except (ValueError, KeyError) as e:
+            logger.error(f"无法处理转交消息: {e!r}, 内容: {payload[:200]}")
+            return
+        self._received += 1
+        create_detached_task(self._handle_forwarded(message["kind"], handler, message["data"]))
+
+    @staticmethod
+    async def _handle_forwarded(kind: str, handler: ForwardHandler, data: Dict[str, Any]) -> None:
+        try:
+            await handler(data)
+        except Exception as e:
+            logger.error(f"处理转交消息 {kind} 出错: {e!r}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "pid": os.getpid(),
+            "is_leader": self._is_leader,
+            "elected_at": self._elected_at if self._is_leader else None,
+            "elections": self._elections,
+            "demotions": self._demotions,
+            "forwarded": self._forwarded,
+            "received": self._received
+        }
+
+
+# 全局主节点选举
+leader_elector = LeaderElector()
@@ -0,0 +1,210 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from app.config import config
+from app.services.deadline import create_detached_task
+from app.services.logger import get_logger
+from app.services.vmos_metrics import LatencyHistogram
+
+logger = get_logger("pad_actor")
+
+EventHandler = Callable[[], Awaitable[Any]]
+
+
+@dataclass
+class _Event:
+    kind: str
+    handler: EventHandler
+    enqueued_at: float
+    reply: Optional[asyncio.Future] = None
+
+
+class _KindMetrics:
+    def __init__(self):
+        self.processed = 0
+        self.errors = 0
+        self.queue_wait = LatencyHistogram()
+        self.processing = LatencyHistogram()
+
+    def to_dict(self) -> Dict[str, Any]:
+        queue_wait = self.queue_wait.to_dict()
+        processing = self.processing.to_dict()
+        return {
+            "processed": self.processed,
+            "errors": self.errors,
+            "queue_wait_p50_ms": queue_wait["p50_ms"],
+            "queue_wait_p99_ms": queue_wait["p99_ms"],
+            "processing_p50_ms": processing["p50_ms"],
+            "processing_p99_ms": processing["p99_ms"],
+            "processing_max_ms": processing["max_ms"]
+        }
+
+
+class PadActor:
+    """单台云机的事件处理器：信箱中的事件（回调、轮询结果、设备上报、超时）按到达顺序逐个处理"""
+
+    def __init__(self, system: 'PadActorSystem', pad_code: str, mailbox_size: int):
+        self.pad_code = pad_code
+        self._system = system
+        self.mailbox: asyncio.Queue = asyncio.Queue(maxsize=mailbox_size)
+        self.processed = 0
+        self.max_depth = 0
+        self.current: Optional[str] = None
+        # 处理函数中派生的长时间任务（如重启后启动应用），不阻塞信箱
+        self.children: Set[asyncio.Task] = set()
+        # 信箱处理不继承发送方的流水线截止时间
+        self.worker = create_detached_task(self._run())
+
+    async def put(self, event: _Event) -> None:
+        await self.mailbox.put(event)
+        self.max_depth = max(self.max_depth, self.mailbox.qsize())
+
+    async def _run(self) -> None:
+        try:
+            await self._process()
+        finally:
+            self._system.retire(self)
+
+    async def _process(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                event: _Event = await asyncio.wait_for(self.mailbox.get(), self._system.idle_seconds)
+            except asyncio.TimeoutError:
+                if self.mailbox.empty() and not self.children:
+                    # 空闲退出，之后的事件会创建新的处理器
+                    return
+                continue
+
+            started = loop.time()
+            metrics = self._system.kind_metrics(event.kind)
+            metrics.queue_wait.observe((started - event.enqueued_at) * 1000)
+            self.current = event.kind
+            try:
+                result = await event.handler()
+                if event.reply is not None and not event.reply.done():
+                    event.reply.set_result(result)
+            except (Exception, asyncio.CancelledError) as e:
+                if isinstance(e, asyncio.CancelledError) and asyncio.current_task().cancelling():
+                    # 处理器本身被取消（服务关闭或云机交给其他 worker）
+                    if event.reply is not None and not event.reply.done():
+                        event.reply.cancel()
+                    raise
+                metrics.errors += 1
+                logger.error(f"{self.pad_code}: 处理事件 {event.kind} 出错: {e!r}")
+                if event.reply is not None and not event.reply.done():
+                    event.reply.set_exception(e)
+            finally:
+                self.current = None
+                self.processed += 1
+                metrics.processed += 1
+                metrics.processing.observe((loop.time() - started) * 1000)
+                self.mailbox.task_done()
+
+    def drain(self) -> int:
+        """丢弃信箱中尚未处理的事件，返回丢弃的数量"""
+        dropped = 0
+        while not self.mailbox.empty():
+            event: _Event = self.mailbox.get_nowait()
+            self.mailbox.task_done()
+            if event.reply is not None and not event.reply.done():
+                event.reply.cancel()
+            dropped += 1
+        return dropped
+
+    def spawn(self, coro: Awaitable[Any]) -> asyncio.Task:
+        task = asyncio.ensure_future(coro)
+        self.children.add(task)
+        task.add_done_callback(self.children.discard)
+        return task
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "depth": self.mailbox.qsize(),
+            "max_depth": self.max_depth,
+            "processed": self.processed,
+            "current": self.current,
+            "children": len(self.children)
+        }
+
+
+class PadActorSystem:
+    """按云机划分的事件处理器集合
+
+    同一台云机的事件串行处理，不同云机之间互不阻塞，不需要全局锁。
+    处理器按需创建，空闲 idle_seconds 后退出。
+    """
+
+    def __init__(self):
+        actor_config = config.PAD_ACTOR
+        self._mailbox_size = actor_config.mailbox_size
+        self.idle_seconds = actor_config.idle_seconds
+        self._actors: Dict[str, PadActor] = {}
+        self._kinds: Dict[str, _KindMetrics] = {}
+        self._created = 0
+        self._retired = 0
+
+    def _actor(self, pad_code: str) -> PadActor:
+        actor = self._actors.get(pad_code)
+        if actor is None:
+            actor = self._actors[pad_code] = PadActor(self, pad_code, self._mailbox_size)
+            self._created += 1
+        return actor
+
+    def retire(self, actor: PadActor) -> None:
+        if self._actors.get(actor.pad_code) is actor:
+            del self._actors[actor.pad_code]
+            self._retired += 1
+
+    def kind_metrics(self, kind: str) -> _KindMetrics:
+        metrics = self._kinds.get(kind)
+        if metrics is None:
+            metrics = self._kinds[kind] = _KindMetrics()
+        return metrics
+
+    async def tell(self, pad_code: str, kind: str, handler: EventHandler) -> None:
+        """投递事件，不等待处理结果（信箱满时等待空位）"""
+        await self._actor(pad_code).put(_Event(kind, handler, asyncio.get_running_loop().time()))
+
+    async def ask(self, pad_code: str, kind: str, handler: EventHandler) -> Any:
+        """投递事件并等待处理结果"""
+        loop = asyncio.get_running_loop()
+        reply = loop.create_future()
+        await self._actor(pad_code).put(_Event(kind, handler, loop.time(), reply))
+        return await reply
+
+    async def stop(self, pad_code: str) -> int:
+        """停止云机的处理器：丢弃未处理的事件，取消正在处理的事件和派生任务，返回丢弃的事件数"""
+        actor = self._actors.pop(pad_code, None)
+        if actor is None:
+            return 0
+        self._retired += 1
+        dropped = actor.drain()
+        tasks = [*actor.children, actor.worker]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return dropped
+
+    def spawn(self, pad_code: str, coro: Awaitable[Any]) -> asyncio.Task:
+        """在云机处理器下派生长时间任务，处理器在任务结束前不会退出"""
+        return self._actor(pad_code).spawn(coro)
+
+    def get_stats(self) -> Dict[str, Any]:
+        depths = [actor.mailbox.qsize() for actor in self._actors.values()]
+        return {
+            "actors": len(self._actors),
+            "created": self._created,
+            "retired": self._retired,
+            "mailbox_size": self._mailbox_size,
+            "queued_events": sum(depths),
+            "max_depth": max(depths, default=0),
+            "kinds": {kind: metrics.to_dict() for kind, metrics in self._kinds.items()},
+            "busy": {pad_code: actor.to_dict() for pad_code, actor in self._actors.items()
+                     if actor.current is not None or actor.mailbox.qsize()}
+        }
+
+
+# 全局云机事件处理器
+pad_actors = PadActorSystem()
@@ -0,0 +1,32 @@
+import time
+from typing import Dict, Optional
+
+from app.config import config
+from app.curd.pipeline_state import save_pipeline_state
+from app.services.deadline import remaining_budget
+from app.services.logger import get_logger
+
+logger = get_logger("pipeline_checkpoint")
+
+# 流水线阶段（阶段边界写入检查点）
+STAGE_REPLACE = "replace"  # 一键新机已提交，等待 1124 回调
+STAGE_INSTALL = "install"  # 应用安装任务已提交，等待安装完成
+STAGE_CONFIGURE = "configure"  # 安装完成，设置 root/语言/时区/GPS 并启动应用
+STAGE_RUNNING = "running"  # 应用已启动，等待设备通过 /status 上报结果
+
+
+async def checkpoint(pad_code: str, stage: str, task_ids: Optional[Dict[str, int]] = None,
+                     temple_id: Optional[int] = None, timeout_seconds: Optional[float] = None) -> None:
+    """记录云机进入某个阶段
+
+    截止时间默认取当前流水线剩余时间，没有时按全局超时计算；开始新一轮（一键新机）时传入 timeout_seconds。
+    检查点写入失败只记录日志，不影响流水线本身。
+    """
+    remaining = timeout_seconds if timeout_seconds is not None else remaining_budget()
+    if remaining is None:
+        remaining = config.get_timeout("global") * 60
+    try:
+        await save_pipeline_state(pad_code, stage, task_ids=task_ids,
+                                  deadline_at=time.time() + max(remaining, 0), temple_id=temple_id)
+    except Exception as e:
+        logger.warning(f"{pad_code}: 保存流水线检查点失败 ({stage}): {e}")
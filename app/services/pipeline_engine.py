@@ -0,0 +1,184 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.services.deadline import deadline_scope
+from app.services.logger import get_logger
+from app.services.vmos_metrics import LatencyHistogram, set_pipeline_stage
+
+logger = get_logger("pipeline_engine")
+
+
+@dataclass
+class PipelineRun:
+    """一次流水线运行的上下文，状态处理函数之间通过 data 传递数据"""
+    pad_code: str
+    task_manager: Any
+    data: Dict[str, Any] = field(default_factory=dict)
+    attempts: Dict[str, int] = field(default_factory=dict)
+    state: Optional[str] = None
+
+
+# 状态处理函数：返回下一个状态名，返回 None 表示流水线结束
+StateHandler = Callable[[PipelineRun], Awaitable[Optional[str]]]
+# 钩子：(事件, 运行上下文, 状态, 本状态耗时秒数)，事件为 enter / exit / timeout / error / exhausted
+PipelineHook = Callable[[str, PipelineRun, str, float], None]
+
+
+@dataclass
+class StateSpec:
+    """状态定义
+
+    timeout: 单次进入该状态的最长时间（秒），超时后转到 on_timeout，同时收紧其中云端调用的截止时间；
+    max_attempts: 该状态在一次运行中最多进入几次（含异常重试），用完后转到 on_exhausted；
+    stage: VMOS 调用指标归属的流水线阶段。
+    """
+    handler: StateHandler
+    timeout: Optional[float] = None
+    max_attempts: int = 1
+    on_timeout: Optional[str] = None
+    on_exhausted: Optional[str] = None
+    stage: Optional[str] = None
+
+
+class _StateMetrics:
+    def __init__(self):
+        self.entered = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.exhausted = 0
+        self.duration = LatencyHistogram()
+
+    def to_dict(self) -> Dict[str, Any]:
+        duration = self.duration.to_dict()
+        return {
+            "entered": self.entered,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "exhausted": self.exhausted,
+            "avg_ms": duration["avg_ms"],
+            "p95_ms": duration["p95_ms"],
+            "max_ms": duration["max_ms"]
+        }
+
+
+class PipelineEngine:
+    """表驱动的云机流水线状态机
+
+    状态、转移、超时和重试次数都在状态表中声明，引擎负责按表推进、统计每个状态的耗时与结果，
+    并在每次转移时调用钩子。处理函数内部的并发子任务使用 asyncio.TaskGroup，
+    运行被取消或出错时子任务一并结束，不会留下孤儿任务。
+    """
+
+    def __init__(self, name: str, states: Dict[str, StateSpec], initial: str):
+        for state_name, spec in states.items():
+            for target in (spec.on_timeout, spec.on_exhausted):
+                if target is not None and target not in states:
+                    raise ValueError(f"{name}: 状态 {state_name} 的转移目标 {target} 未定义")
+        if initial not in states:
+            raise ValueError(f"{name}: 初始状态 {initial} 未定义")
+        self.name = name
+        self.states = states
+        self.initial = initial
+        self._hooks: List[PipelineHook] = []
+        self._metrics: Dict[str, _StateMetrics] = {state_name: _StateMetrics() for state_name in states}
+        self._active: Dict[str, str] = {}
+        self._runs = 0
+        self._completed = 0
+        self._cancelled = 0
+
+    def add_hook(self, hook: PipelineHook) -> None:
+        self._hooks.append(hook)
+
+    def _emit(self, event: str, run: PipelineRun, state: str, elapsed: float = 0.0) -> None:
+        for hook in self._hooks:
+            try:
+                hook(event, run, state, elapsed)
+            except Exception as e:
+                logger.warning(f"{self.name}: 钩子执行失败 ({event} {state}): {e}")
+
+    async def run(self, run: PipelineRun, start: Optional[str] = None) -> Optional[str]:
+        """从 start（默认初始状态）开始运行，返回最后执行的状态"""
+        self._runs += 1
+        state: Optional[str] = start or self.initial
+        last = state
+        try:
+            while state is not None:
+                if state not in self.states:
+                    raise ValueError(f"{self.name}: 未定义的状态 {state}")
+                last = state
+                state = await self._step(run, state)
+            self._completed += 1
+            return last
+        except asyncio.CancelledError:
+            self._cancelled += 1
+            logger.info(f"{run.pad_code}: {self.name} 流水线在 {last} 状态被取消")
+            raise
+        finally:
+            self._active.pop(run.pad_code, None)
+
+    async def _step(self, run: PipelineRun, state: str) -> Optional[str]:
+        spec = self.states[state]
+        metrics = self._metrics[state]
+        attempts = run.attempts.get(state, 0) + 1
+        if attempts > spec.max_attempts:
+            metrics.exhausted += 1
+            self._emit("exhausted", run, state)
+            logger.warning(f"{run.pad_code}: {self.name} 状态 {state} 已达到最大次数 {spec.max_attempts}，"
+                           f"转到 {spec.on_exhausted}")
+            return spec.on_exhausted
+        run.attempts[state] = attempts
+        run.state = state
+        self._active[run.pad_code] = state
+        metrics.entered += 1
+        if spec.stage:
+            set_pipeline_stage(spec.stage)
+        self._emit("enter", run, state)
+
+        started = time.monotonic()
+        state_timeout: Optional[asyncio.Timeout] = None
+        try:
+            if spec.timeout is None:
+                next_state = await spec.handler(run)
+            else:
+                with deadline_scope(spec.timeout):
+                    async with asyncio.timeout(spec.timeout) as state_timeout:
+                        next_state = await spec.handler(run)
+        except Exception as e:
+            elapsed = time.monotonic() - started
+            if state_timeout is not None and state_timeout.expired():
+                metrics.timeouts += 1
+                metrics.duration.observe(elapsed * 1000)
+                self._emit("timeout", run, state, elapsed)
+                logger.warning(f"{run.pad_code}: {self.name} 状态 {state} 超时（{spec.timeout}秒），"
+                               f"转到 {spec.on_timeout}")
+                return spec.on_timeout
+            # 处理函数内部抛出的超时（如单次云端调用超时）与其他异常一样按次数重试
+            metrics.errors += 1
+            metrics.duration.observe(elapsed * 1000)
+            self._emit("error", run, state, elapsed)
+            logger.error(f"{run.pad_code}: {self.name} 状态 {state} 出错，重试: {e}")
+            # 异常时重新进入同一状态，由 max_attempts 限制次数
+            return state
+
+        elapsed = time.monotonic() - started
+        metrics.duration.observe(elapsed * 1000)
+        self._emit("exit", run, state, elapsed)
+        return next_state
+
+    def get_stats(self) -> Dict[str, Any]:
+        states = {}
+        for state_name, metrics in self._metrics.items():
+            states[state_name] = {
+                **metrics.to_dict(),
+                "active": sum(1 for active in self._active.values() if active == state_name)
+            }
+        return {
+            "name": self.name,
+            "runs": self._runs,
+            "completed": self._completed,
+            "cancelled": self._cancelled,
+            "active": dict(self._active),
+            "states": states
+        }
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, Iterable, Optional, Set
+
+from app.config import config
+from app.curd.pipeline_state import get_pipeline_states
+from app.curd.status import add_cloud_status, set_proxy_status
+from app.dependencies.countries import manager
+from app.services.database import PipelineState
+from app.services.install_pipeline import run_install_pipeline, CONFIGURE
+from app.services.logger import get_logger
+from app.services.pad_actor import pad_actors
+from app.services.pipeline_checkpoint import STAGE_REPLACE, STAGE_INSTALL, STAGE_CONFIGURE, STAGE_RUNNING
+from app.services.task_poller import task_status_poller
+from app.services.task_status import replace_pad_stak_status
+
+logger = get_logger("pipeline_resume")
+
+# 恢复出来的后台等待任务，保持引用避免被回收
+_background: Set[asyncio.Task] = set()
+
+STAGE_NAMES = {
+    STAGE_REPLACE: "一键新机",
+    STAGE_INSTALL: "安装应用",
+    STAGE_CONFIGURE: "设置环境",
+    STAGE_RUNNING: "脚本运行",
+}
+
+
+async def _restore_cloud_status(state: PipelineState) -> None:
+    """重建云机状态行（关闭时已删除），沿用检查点中的模板和代理国家"""
+    template_id = state.temple_id or random.choice(config.TEMPLE_IDS)
+    await add_cloud_status(state.pad_code, template_id,
+                           current_status=f"服务重启，从{STAGE_NAMES[state.stage]}阶段恢复")
+
+    proxies: Any = manager.get_proxy_countries()
+    matched = [proxy for proxy in proxies if proxy.code == state.country_code]
+    await set_proxy_status(state.pad_code, matched[0] if matched else random.choice(proxies))
+
+
+async def _await_replace(pad_code: str, task_id: int, remaining: float, task_manager) -> None:
+    """等待一键新机任务结束，作为轮询结果投递到云机信箱，按回调同样的逻辑进入下一阶段"""
+    detail = await task_status_poller.wait_outcome(task_id, remaining)
+    task_status = detail.get("taskStatus")
+    if task_status is None or task_status in (1, 2):
+        # 截止时间内仍未完成，按失败处理重新一键新机
+        task_status = -1
+
+    async def handle() -> None:
+        # 与回调按顺序处理，回调先到并已开始安装时不重复处理
+        if await task_manager.has_task(pad_code):
+            return
+        await replace_pad_stak_status({"padCode": pad_code, "taskId": task_id, "taskStatus": task_status},
+                                      task_manager)
+
+    await pad_actors.tell(pad_code, "poll:1124", handle)
+
+
+async def _resume_replace(state: PipelineState, task_ids: Dict[str, int], remaining: float, task_manager) -> None:
+    task = asyncio.create_task(_await_replace(state.pad_code, task_ids["replace"], remaining, task_manager))
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def _resume_install(state: PipelineState, task_ids: Dict[str, int], remaining: float, task_manager) -> None:
+    await task_manager.start_task_with_timeout(
+        state.pad_code, run_install_pipeline(state.pad_code, task_manager, task_ids=task_ids),
+        timeout_seconds=int(remaining)
+    )
+
+
+async def _resume_configure(state: PipelineState, task_ids: Dict[str, int], remaining: float, task_manager) -> None:
+    await task_manager.start_task_with_timeout(
+        state.pad_code, run_install_pipeline(state.pad_code, task_manager, task_ids=task_ids, start=CONFIGURE),
+        timeout_seconds=int(remaining)
+    )
+
+
+async def _resume_running(state: PipelineState, task_ids: Dict[str, int], remaining: float, task_manager) -> None:
+    # 脚本在云机上继续运行，只需重新挂上全局超时
+    await task_manager.add_timeout_task(state.pad_code, int(remaining))
+
+
+RESUMERS = {
+    STAGE_REPLACE: _resume_replace,
+    STAGE_INSTALL: _resume_install,
+    STAGE_CONFIGURE: _resume_configure,
+    STAGE_RUNNING: _resume_running,
+}
+
+
+async def resume_pipelines(task_manager, pad_codes: Optional[Iterable[str]] = None) -> Set[str]:
+    """按检查点恢复云机流水线（默认全部云机），返回已恢复的云机（其余云机照常一键新机）"""
+    pad_codes = set(config.PAD_CODES if pad_codes is None else pad_codes)
+    resumed: Set[str] = set()
+    try:
+        states = await get_pipeline_states()
+    except Exception as e:
+        logger.error(f"读取流水线检查点失败: {e}")
+        return resumed
+
+    now = time.time()
+    for state in states:
+        if state.pad_code not in pad_codes or state.stage not in RESUMERS:
+            continue
+        remaining = (state.deadline_at or 0) - now
+        if remaining <= 0:
+            logger.info(f"{state.pad_code}: 检查点已超过截止时间（{state.stage}），重新一键新机")
+            continue
+        try:
+            task_ids = json.loads(state.task_ids) if state.task_ids else {}
+            await _restore_cloud_status(state)
+            await RESUMERS[state.stage](state, task_ids, remaining, task_manager)
+            resumed.add(state.pad_code)
+            logger.info(f"{state.pad_code}: 从检查点恢复 {state.stage}（第 {state.attempts} 次），"
+                        f"剩余 {int(remaining)} 秒")
+        except Exception as e:
+            logger.error(f"{state.pad_code}: 恢复流水线失败，将重新一键新机: {e}")
+
+    return resumed
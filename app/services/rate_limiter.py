@@ -0,0 +1,207 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+
+from app.config import config
+from app.services.logger import get_logger
+
+logger = get_logger("rate_limiter")
+
+
+class TokenBucket:
+    """令牌桶：按固定速率补充令牌，允许一定突发"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._waiting = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        """获取一个令牌，不足时等待"""
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            self._waiting += 1
+            try:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+            finally:
+                self._waiting -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "tokens": round(self._tokens, 2),
+            "waiting": self._waiting
+        }
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD并发窗口
+
+    响应正常时窗口每轮加一（每次成功 +1/limit），
+    出错或延迟超过基线的 latency_spike_factor 倍时窗口按 decrease_factor 缩小，
+    同一轮内（一个基线延迟内）只缩小一次，避免并发失败把窗口瞬间压到最小。
+    """
+
+    def __init__(self, initial: int, min_limit: int, max_limit: int,
+                 decrease_factor: float, latency_spike_factor: float):
+        self._limit = float(initial)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._decrease_factor = decrease_factor
+        self._latency_spike_factor = latency_spike_factor
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._latency_ewma: Optional[float] = None
+        self._last_decrease_at = 0.0
+        self._increases = 0
+        self._decreases = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    async def acquire(self) -> None:
+        """获取一个并发槽位，窗口已满时排队"""
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已分配到槽位但调用方被取消，归还槽位
+                self._in_flight -= 1
+                self._wake_waiters()
+            else:
+                try:
+                    self._waiters.remove(future)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self, latency: float, success: bool, adjust: bool = True) -> None:
+        """归还槽位并根据结果调整窗口"""
+        self._in_flight -= 1
+        if not adjust:
+            self._wake_waiters()
+            return
+
+        is_spike = (self._latency_ewma is not None and
+                    latency > self._latency_ewma * self._latency_spike_factor)
+        if not success or is_spike:
+            now = time.monotonic()
+            if now - self._last_decrease_at >= (self._latency_ewma or 0):
+                self._limit = max(self._min_limit, self._limit * self._decrease_factor)
+                self._last_decrease_at = now
+                self._decreases += 1
+                logger.debug(f"并发窗口缩小至 {self.limit} (成功: {success}, 延迟: {latency:.2f}s)")
+        else:
+            self._limit = min(self._max_limit, self._limit + 1 / self._limit)
+            self._increases += 1
+
+        # 延迟基线只用成功响应更新，持续变慢时基线随之上移
+        if success:
+            if self._latency_ewma is None:
+                self._latency_ewma = latency
+            else:
+                self._latency_ewma = 0.9 * self._latency_ewma + 0.1 * latency
+
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            future = self._waiters.popleft()
+            if not future.done():
+                self._in_flight += 1
+                future.set_result(None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "min_limit": self._min_limit,
+            "max_limit": self._max_limit,
+            "in_flight": self._in_flight,
+            "queue_depth": len(self._waiters),
+            "latency_ewma_ms": round(self._latency_ewma * 1000, 1) if self._latency_ewma is not None else None,
+            "increases": self._increases,
+            "decreases": self._decreases
+        }
+
+
+class _SlotTicket:
+    def __init__(self):
+        self.failed = False
+
+    def mark_failed(self) -> None:
+        self.failed = True
+
+
+class VmosRateLimiter:
+    """VMOS客户端限流器：每个接口一个令牌桶 + 全局AIMD并发窗口"""
+
+    def __init__(self):
+        rate_config = config.RATE_LIMIT
+        self._default_rate = rate_config.default_rate
+        self._burst_seconds = rate_config.burst_seconds
+        self._endpoint_rates = rate_config.endpoint_rates
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._concurrency = AdaptiveConcurrencyLimiter(
+            initial=rate_config.initial_concurrency,
+            min_limit=rate_config.min_concurrency,
+            max_limit=rate_config.max_concurrency,
+            decrease_factor=rate_config.decrease_factor,
+            latency_spike_factor=rate_config.latency_spike_factor
+        )
+
+    def _get_bucket(self, path: str) -> TokenBucket:
+        bucket = self._buckets.get(path)
+        if bucket is None:
+            rate = self._endpoint_rates.get(path, self._default_rate)
+            bucket = TokenBucket(rate=rate, capacity=max(1.0, rate * self._burst_seconds))
+            self._buckets[path] = bucket
+        return bucket
+
+    @asynccontextmanager
+    async def slot(self, path: str):
+        """限流上下文，调用方通过 mark_failed() 报告业务失败"""
+        await self._get_bucket(path).acquire()
+        await self._concurrency.acquire()
+        ticket = _SlotTicket()
+        start = time.monotonic()
+        try:
+            yield ticket
+        except asyncio.CancelledError:
+            # 调用方取消不代表服务端异常，不调整窗口
+            self._concurrency.release(time.monotonic() - start, success=True, adjust=False)
+            raise
+        except Exception:
+            self._concurrency.release(time.monotonic() - start, success=False)
+            raise
+        self._concurrency.release(time.monotonic() - start, success=not ticket.failed)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self._concurrency.get_stats(),
+            "endpoints": {path: bucket.get_stats() for path, bucket in self._buckets.items()}
+        }
+
+
+# 全局VMOS限流器实例
+vmos_limiter = VmosRateLimiter()
@@ -0,0 +1,31 @@
+import random
+from typing import Any
+
+from app.config import config
+from app.curd.status import update_cloud_status, set_proxy_status
+from app.dependencies.countries import manager
+from app.dependencies.utils import replace_pad
+from app.services.device_scheduler import operation_priority, PRIORITY_RECOVERY
+from app.services.logger import task_logger
+from app.services.vmos_metrics import pipeline_stage
+
+
+async def recycle_pad(pad_code: str, current_status: str, new_proxy: bool = False) -> int:
+    """随机选择模板重新一键新机，返回使用的模板
+
+    超时、安装失败、启动失败等各处的回收流程统一走这里，一键新机按回收优先级排队；
+    new_proxy 为 True 时同时更换代理国家。
+    """
+    with pipeline_stage("recycle"), operation_priority(PRIORITY_RECOVERY):
+        template_id = random.choice(config.TEMPLE_IDS)
+        if new_proxy:
+            # 运行次数随代理更新一起累加，这一轮只计一次
+            default_proxy: Any = manager.get_proxy_countries()
+            await set_proxy_status(pad_code, random.choice(default_proxy), number_of_run=1)
+            await update_cloud_status(pad_code, temple_id=template_id, current_status=current_status)
+        else:
+            await update_cloud_status(pad_code, number_of_run=1, temple_id=template_id,
+                                      current_status=current_status)
+        await replace_pad([pad_code], template_id=template_id)
+        task_logger.info(f"{pad_code}: {current_status}，模板: {template_id}")
+        return template_id
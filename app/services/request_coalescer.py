@@ -0,0 +1,129 @@
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import config
+from app.dependencies.auth import VmosUtil
+from app.services.deadline import create_detached_task
+from app.services.device_scheduler import device_scheduler, current_priority, operation_priority
+from app.services.logger import get_logger
+from app.services.resilience import await_within_deadline
+
+logger = get_logger("coalescer")
+
+
+@dataclass
+class _PendingBatch:
+    """同一接口、同一参数下等待合并发送的云机"""
+    url: str
+    params: Dict[str, Any]
+    # 批次中最高的操作优先级（数值最小），批次按它在调度器中排队
+    priority: int
+    waiters: Dict[str, List[asyncio.Future]] = field(default_factory=dict)
+    flush_handle: Optional[asyncio.TimerHandle] = None
+
+
+def _split_response(response: Any, pad_code: str) -> Any:
+    """从多云机响应中取出单台云机的结果，保持原响应结构"""
+    if not isinstance(response, dict) or not isinstance(response.get("data"), list):
+        return response
+    pad_data = [item for item in response["data"]
+                if isinstance(item, dict) and item.get("padCode") == pad_code]
+    return {**response, "data": pad_data}
+
+
+class PadRequestCoalescer:
+    """多云机接口的请求合并层
+
+    在短时间窗口内收集相同操作、相同参数（同模板、同时区、同包名等）的单台云机请求，
+    合并成一次 padCodes 批量请求发送，再把每台云机的结果分发给各自等待的协程。
+    变更操作以批次为单位经云机操作调度器限流，一个批次占一个在途名额。
+    """
+
+    def __init__(self, window_ms: int = None, max_batch_size: int = None):
+        self._window_ms = window_ms if window_ms is not None else config.COALESCE_WINDOW_MS
+        self._max_batch_size = max_batch_size or config.COALESCE_MAX_BATCH_SIZE
+        self._pending: Dict[Tuple[str, str], _PendingBatch] = {}
+        self._submitted = 0
+        self._batches = 0
+        self._failed_batches = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._window_ms > 0
+
+    async def submit(self, url: str, params: Dict[str, Any], pad_code: str) -> Any:
+        """提交单台云机请求，返回只包含该云机数据的响应"""
+        if not self.enabled:
+            return await device_scheduler.run(url, VmosUtil(url, {**params, "padCodes": [pad_code]}).send)
+
+        key = (url, json.dumps(params, sort_keys=True, ensure_ascii=False))
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = _PendingBatch(url=url, params=params, priority=current_priority())
+            self._pending[key] = batch
+            loop = asyncio.get_running_loop()
+            batch.flush_handle = loop.call_later(self._window_ms / 1000, self._flush, key)
+
+        batch.priority = min(batch.priority, current_priority())
+        future = asyncio.get_running_loop().create_future()
+        batch.waiters.setdefault(pad_code, []).append(future)
+        self._submitted += 1
+
+        if len(batch.waiters) >= self._max_batch_size:
+            self._flush(key)
+
+        return await await_within_deadline(url, future)
+
+    def _flush(self, key: Tuple[str, str]) -> None:
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        if batch.flush_handle is not None:
+            batch.flush_handle.cancel()
+        # 批次由多台云机共享，不受单个调用方截止时间约束
+        create_detached_task(self._send_batch(batch))
+
+    async def _send_batch(self, batch: _PendingBatch) -> None:
+        pad_codes = list(batch.waiters.keys())
+        self._batches += 1
+        try:
+            with operation_priority(batch.priority):
+                response = await device_scheduler.run(
+                    batch.url, VmosUtil(batch.url, {**batch.params, "padCodes": pad_codes}).send)
+        except BaseException as e:
+            self._failed_batches += 1
+            for futures in batch.waiters.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+
+        if len(pad_codes) > 1:
+            logger.debug(f"合并请求 {batch.url}: {len(pad_codes)} 台云机")
+
+        for pad_code, futures in batch.waiters.items():
+            pad_response = _split_response(response, pad_code)
+            for future in futures:
+                if not future.done():
+                    future.set_result(pad_response)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取合并统计信息"""
+        return {
+            "enabled": self.enabled,
+            "window_ms": self._window_ms,
+            "max_batch_size": self._max_batch_size,
+            "submitted_requests": self._submitted,
+            "sent_batches": self._batches,
+            "failed_batches": self._failed_batches,
+            "pending_batches": len(self._pending),
+            "coalesce_ratio": round(self._submitted / self._batches, 2) if self._batches else 0
+        }
+
+
+# 全局请求合并器实例
+pad_coalescer = PadRequestCoalescer()
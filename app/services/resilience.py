@@ -0,0 +1,293 @@
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import aiohttp
+
+from app.config import config
+from app.services.deadline import current_deadline, remaining_budget
+from app.services.logger import get_logger
+
+logger = get_logger("resilience")
+
+
+class VmosApiError(Exception):
+    """VMOS云端接口调用失败（重试耗尽后抛出）"""
+
+    def __init__(self, path: str, message: str):
+        super().__init__(f"{path}: {message}")
+        self.path = path
+
+
+class CircuitOpenError(VmosApiError):
+    """熔断器打开，云端接口暂不可用"""
+
+
+class DeadlineExceededError(VmosApiError):
+    """流水线截止时间或单次调用预算已用完"""
+
+
+class VmosResponseError(VmosApiError):
+    """云端返回服务端错误码或无法识别的响应（重试耗尽后抛出）"""
+
+    def __init__(self, path: str, message: str, result: Any):
+        super().__init__(path, message)
+        self.result = result
+
+
+async def await_within_deadline(path: str, awaitable: Awaitable[Any]) -> Any:
+    """按当前截止时间等待共享请求的结果，超时只取消本调用方的等待"""
+    remaining = remaining_budget()
+    if remaining is None:
+        return await awaitable
+    if remaining <= 0:
+        raise DeadlineExceededError(path, "流水线截止时间已过")
+    try:
+        return await asyncio.wait_for(awaitable, remaining)
+    except asyncio.TimeoutError as e:
+        if remaining_budget() <= 0:
+            raise DeadlineExceededError(path, "等待结果时超出流水线截止时间") from e
+        raise
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """单个接口的重试策略"""
+    max_attempts: int
+    base_delay: float
+    max_delay: float
+    # 幂等接口可在任何瞬时错误后重试；非幂等接口只在请求确定未发出（连接失败）时重试
+    idempotent: bool
+
+
+# 只读查询接口：可安全重试、去重与对冲
+READ_ONLY_ENDPOINTS = frozenset({
+    "/vcpcloud/api/padApi/padTaskDetail",
+    "/vcpcloud/api/padApi/listInstalledApp",
+    "/vcpcloud/api/padApi/padInfo",
+    "/vcpcloud/api/padApi/userPadList",
+})
+
+
+def _default_policies() -> Dict[str, RetryPolicy]:
+    resilience_config = config.RESILIENCE
+    attempts = resilience_config.max_attempts
+    base = resilience_config.base_delay
+    cap = resilience_config.max_delay
+
+    read = RetryPolicy(max_attempts=attempts + 1, base_delay=base, max_delay=cap, idempotent=True)
+    idempotent_write = RetryPolicy(max_attempts=attempts, base_delay=base, max_delay=cap, idempotent=True)
+    mutation = RetryPolicy(max_attempts=attempts, base_delay=base, max_delay=cap, idempotent=False)
+
+    policies = {path: read for path in READ_ONLY_ENDPOINTS}
+    policies.update({
+        # 设置类操作，重复执行结果相同
+        "/vcpcloud/api/padApi/updateLanguage": idempotent_write,
+        "/vcpcloud/api/padApi/updateTimeZone": idempotent_write,
+        "/vcpcloud/api/padApi/gpsInjectInfo": idempotent_write,
+        "/vcpcloud/api/padApi/switchRoot": idempotent_write,
+        # 会产生新任务的操作
+        "/vcpcloud/api/padApi/replacePad": mutation,
+        "/vcpcloud/api/padApi/uploadFileV3": mutation,
+        "/vcpcloud/api/padApi/startApp": mutation,
+        "/vcpcloud/api/padApi/simulateTouch": mutation,
+        "/vcpcloud/api/padApi/restart": mutation,
+        "/vcpcloud/api/padApi/replacement": mutation,
+    })
+    return policies
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """云端熔断器
+
+    连续 failure_threshold 次瞬时失败后打开，reset_seconds 内所有调用快速失败；
+    之后进入半开状态，只放行一个探测请求，成功则关闭，失败则重新打开。
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self._failure_threshold = failure_threshold
+        self._reset_seconds = reset_seconds
+        self._state = CircuitState.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._open_count = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state == CircuitState.OPEN and time.monotonic() - self._opened_at >= self._reset_seconds:
+            self._state = CircuitState.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def before_call(self, path: str) -> None:
+        state = self.state
+        if state == CircuitState.OPEN:
+            self._rejected += 1
+            raise CircuitOpenError(path, "熔断器已打开，云端接口暂不可用")
+        if state == CircuitState.HALF_OPEN:
+            if self._probe_in_flight:
+                self._rejected += 1
+                raise CircuitOpenError(path, "熔断器半开，等待探测请求结果")
+            self._probe_in_flight = True
+
+    def abandon_probe(self) -> None:
+        """探测请求被取消或异常退出时释放探测名额"""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        if self._state != CircuitState.CLOSED:
+            logger.info("云端接口恢复，熔断器关闭")
+        self._state = CircuitState.CLOSED
+        self._consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._consecutive_failures += 1
+        if self._state == CircuitState.HALF_OPEN or self._consecutive_failures >= self._failure_threshold:
+            if self._state != CircuitState.OPEN:
+                self._open_count += 1
+                logger.warning(f"云端接口连续失败 {self._consecutive_failures} 次，熔断器打开 "
+                               f"{self._reset_seconds} 秒")
+            self._state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self._consecutive_failures,
+            "failure_threshold": self._failure_threshold,
+            "reset_seconds": self._reset_seconds,
+            "open_count": self._open_count,
+            "rejected_calls": self._rejected
+        }
+
+
+def _is_malformed(result: Any) -> bool:
+    """响应不是合法的VMOS结构，或为服务端错误码"""
+    if not isinstance(result, dict) or "code" not in result:
+        return True
+    code = result.get("code")
+    return isinstance(code, int) and code >= 500
+
+
+class VmosResilience:
+    """VMOS调用的重试、退避与熔断策略"""
+
+    def __init__(self):
+        resilience_config = config.RESILIENCE
+        self._policies = _default_policies()
+        self._default_policy = RetryPolicy(
+            max_attempts=resilience_config.max_attempts,
+            base_delay=resilience_config.base_delay,
+            max_delay=resilience_config.max_delay,
+            idempotent=False
+        )
+        self._breaker = CircuitBreaker(
+            failure_threshold=resilience_config.failure_threshold,
+            reset_seconds=resilience_config.reset_seconds
+        )
+        self._call_budget = resilience_config.call_budget
+        self._retries: Dict[str, int] = {}
+        self._exhausted: Dict[str, int] = {}
+        self._deadline_exceeded: Dict[str, int] = {}
+
+    def get_policy(self, path: str) -> RetryPolicy:
+        return self._policies.get(path, self._default_policy)
+
+    @staticmethod
+    def _backoff(policy: RetryPolicy, attempt: int) -> float:
+        # 全抖动指数退避
+        return random.uniform(0, min(policy.max_delay, policy.base_delay * (2 ** attempt)))
+
+    def _call_deadline(self) -> Optional[float]:
+        """本次调用的截止时间：流水线剩余时间与单次调用预算取较小值"""
+        deadline = current_deadline()
+        if self._call_budget > 0:
+            budget_deadline = time.monotonic() + self._call_budget
+            deadline = budget_deadline if deadline is None else min(deadline, budget_deadline)
+        return deadline
+
+    def _deadline_error(self, path: str, message: str) -> DeadlineExceededError:
+        self._deadline_exceeded[path] = self._deadline_exceeded.get(path, 0) + 1
+        return DeadlineExceededError(path, message)
+
+    async def execute(self, path: str, send_once: Callable[[], Awaitable[Any]]) -> Any:
+        """按接口策略执行一次VMOS调用，重试与排队都受截止时间约束"""
+        policy = self.get_policy(path)
+        deadline = self._call_deadline()
+        result: Any = None
+
+        for attempt in range(policy.max_attempts):
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise self._deadline_error(path, "调用时间预算已用完")
+            self._breaker.before_call(path)
+            try:
+                if remaining is None:
+                    result = await send_once()
+                else:
+                    result = await asyncio.wait_for(send_once(), remaining)
+            except aiohttp.ClientConnectorError as e:
+                # 连接未建立，请求一定没有发出，任何接口都可重试
+                self._breaker.record_failure()
+                error = e
+            except (aiohttp.ClientError, asyncio.TimeoutError, json.JSONDecodeError) as e:
+                if isinstance(e, asyncio.TimeoutError) and deadline is not None and time.monotonic() >= deadline:
+                    # 预算耗尽不一定是服务端故障，不计入熔断
+                    self._breaker.abandon_probe()
+                    raise self._deadline_error(path, "超出截止时间，调用已取消") from e
+                self._breaker.record_failure()
+                if not policy.idempotent:
+                    raise VmosApiError(path, f"{type(e).__name__}: {e}") from e
+                error = e
+            except BaseException:
+                self._breaker.abandon_probe()
+                raise
+            else:
+                if not _is_malformed(result):
+                    self._breaker.record_success()
+                    return result
+                self._breaker.record_failure()
+                if not policy.idempotent:
+                    raise VmosResponseError(path, f"响应异常，非幂等接口不重试: {result}", result)
+                error = None
+
+            delay = self._backoff(policy, attempt)
+            out_of_budget = deadline is not None and time.monotonic() + delay >= deadline
+            if attempt + 1 >= policy.max_attempts or out_of_budget:
+                self._exhausted[path] = self._exhausted.get(path, 0) + 1
+                if error is not None:
+                    raise VmosApiError(path, f"调用 {attempt + 1} 次后仍失败: {error!r}") from error
+                raise VmosResponseError(path, f"调用 {attempt + 1} 次后响应仍异常: {result}", result)
+
+            self._retries[path] = self._retries.get(path, 0) + 1
+            logger.debug(f"{path}: 第 {attempt + 1} 次调用失败，{delay:.2f} 秒后重试")
+            await asyncio.sleep(delay)
+
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "circuit_breaker": self._breaker.get_stats(),
+            "retries": dict(self._retries),
+            "exhausted": dict(self._exhausted),
+            "deadline_exceeded": dict(self._deadline_exceeded),
+            "call_budget_seconds": self._call_budget
+        }
+
+
+# 全局VMOS容错策略实例
+vmos_resilience = VmosResilience()
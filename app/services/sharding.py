@@ -0,0 +1,344 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import os
+import socket
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import text
+
+from app.config import config
+from app.curd.shard_member import heartbeat_shard_member, get_live_shard_members, remove_shard_member, \
+    get_lock_holder, prune_shard_members
+from app.services.database import engine
+from app.services.deadline import create_detached_task
+from app.services.leader import leader_elector
+from app.services.logger import get_logger
+
+logger = get_logger("sharding")
+
+# 交接间隙等待新的负责 worker 取得云机锁的查询间隔（秒）
+FORWARD_RETRY_SECONDS = 0.5
+
+PadsCallback = Callable[[List[str]], Awaitable[Any]]
+ForwardHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+def _lock_key(namespace: int, pad_code: str) -> int:
+    """云机 advisory lock 的 64 位键（bigint），不同云机几乎不会落到同一把锁上"""
+    return int.from_bytes(hashlib.md5(f"{namespace}:{pad_code}".encode()).digest()[:8], "big", signed=True)
+
+
+class HashRing:
+    """一致性哈希环：worker 加入或退出时，只有相邻区间的云机更换归属"""
+
+    def __init__(self, members: Iterable[str], virtual_nodes: int):
+        self.members = sorted(set(members))
+        points = sorted((_hash(f"{member}#{i}"), member) for member in self.members for i in range(virtual_nodes))
+        self._keys = [key for key, _ in points]
+        self._owners = [member for _, member in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._owners[index]
+
+
+class PadShardCoordinator:
+    """按云机把编排工作分到多个 worker
+
+    每个 worker 定期写心跳，按存活 worker 构建一致性哈希环，负责环上归属自己的云机的
+    流水线、轮询和超时。接管云机前先取得该云机的 Postgres advisory lock（64 位键），
+    原负责 worker 释放后才会接管，同一台云机不会同时被两个 worker 编排；worker 退出或
+    数据库连接断开时锁自动释放。
+    回调和设备上报落到其他 worker 时，通过 NOTIFY 转交给当前持有该云机锁的 worker
+    （交接期间锁还在原负责 worker 手里，哈希环上的新归属尚未接管）。
+
+    分片建立在主节点选举之上：未启用分片时全部云机由主节点负责，主节点退出后由新主节点接管；
+    启用分片时主节点负责清理已退出 worker 的心跳记录。
+    """
+
+    def __init__(self):
+        sharding_config = config.SHARDING
+        self.enabled = sharding_config.enabled
+        self.worker_id = sharding_config.worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._lock_namespace = sharding_config.lock_namespace
+        self._heartbeat_seconds = sharding_config.heartbeat_seconds
+        self._member_ttl = sharding_config.member_ttl_seconds
+        self._virtual_nodes = sharding_config.virtual_nodes
+        self._channel_prefix = sharding_config.channel
+        self._ring = HashRing([self.worker_id], self._virtual_nodes)
+        self._owned: Set[str] = set()
+        self._conn: Any = None
+        self._backend_pid: Optional[int] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._on_acquired: List[PadsCallback] = []
+        self._on_released: List[PadsCallback] = []
+        self._handlers: Dict[str, ForwardHandler] = {}
+        self._rebalances = 0
+        self._acquired = 0
+        self._released = 0
+        self._lock_waits = 0
+        self._forwarded = 0
+        self._received = 0
+        self._undeliverable = 0
+
+    def on_acquired(self, callback: PadsCallback) -> None:
+        """接管云机后执行（从检查点恢复或一键新机）"""
+        self._on_acquired.append(callback)
+
+    def on_released(self, callback: PadsCallback) -> None:
+        """交出云机后执行（停止本进程中这些云机的任务）"""
+        self._on_released.append(callback)
+
+    def register_forward(self, kind: str, handler: ForwardHandler) -> None:
+        """注册处理转交消息的函数"""
+        self._handlers[kind] = handler
+        leader_elector.register_forward(kind, handler)
+
+    def channel_for(self, worker_id: str) -> str:
+        """worker 接收转交消息的 NOTIFY 通道（通道名最长 63 字节）"""
+        return f"{self._channel_prefix}_{hashlib.md5(worker_id.encode()).hexdigest()[:16]}"
+
+    def owns(self, pad_code: str) -> bool:
+        """本 worker 负责该云机：持有该云机的锁，或未分片时为主节点（不在管理列表中的云机任何 worker 都可处理）"""
+        if pad_code not in config.PAD_CODES:
+            return True
+        return pad_code in self._owned
+
+    @property
+    def owned(self) -> Set[str]:
+        return set(self._owned)
+
+    async def start(self) -> None:
+        """加入分片并等待首批云机的编排初始化完成"""
+        if not self.enabled:
+            # 不分片：主节点负责全部云机（未启用选举时本进程即主节点）
+            leader_elector.on_elected(self._acquire_all)
+            leader_elector.on_demoted(self._release_all)
+            await leader_elector.start()
+            return
+
+        await leader_elector.start()
+        await self._connect()
+        await self._rebalance(wait=True)
+        self._loop_task = create_detached_task(self._loop())
+
+    async def stop(self) -> None:
+        """退出分片，释放全部云机锁，其他 worker 在下一次心跳时接管"""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+        await leader_elector.stop()
+        if not self.enabled:
+            self._owned.clear()
+            return
+        try:
+            await remove_shard_member(self.worker_id)
+        except Exception as e:
+            logger.warning(f"注销 worker 失败: {e}")
+        self._owned.clear()
+        await self._disconnect()
+
+    async def forward(self, pad_code: str, kind: str, data: Dict[str, Any]) -> bool:
+        """把消息交给持有该云机锁的 worker 处理（未分片时交给主节点），返回是否已交出
+
+        交接间隙暂时没有 worker 持锁时等待新的负责 worker 取得锁（最多两个心跳周期），
+        不会在未持锁时于本地处理。
+        """
+        if not self.enabled:
+            await leader_elector.forward(kind, data)
+            return True
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + 2 * self._heartbeat_seconds
+        while True:
+            if pad_code in self._owned:
+                await self._handlers[kind](data)
+                return True
+            holder = await get_lock_holder(_lock_key(self._lock_namespace, pad_code), self._member_ttl)
+            if holder is not None and holder != self.worker_id:
+                await self._publish(self.channel_for(holder),
+                                    json.dumps({"kind": kind, "data": data}, ensure_ascii=False))
+                self._forwarded += 1
+                return True
+            if loop.time() >= give_up_at:
+                self._undeliverable += 1
+                logger.warning(f"{pad_code}: 没有 worker 持有该云机的锁，无法转交 {kind}")
+                return False
+            await asyncio.sleep(FORWARD_RETRY_SECONDS)
+
+    @staticmethod
+    async def _publish(channel: str, payload: str) -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": channel, "payload": payload})
+            await conn.commit()
+
+    async def _acquire_all(self) -> None:
+        """成为主节点：接管全部云机"""
+        self._owned = set(config.PAD_CODES)
+        self._acquired += len(self._owned)
+        await self._notify(self._on_acquired, sorted(self._owned), "接管")
+
+    async def _release_all(self) -> None:
+        """失去主节点身份：停止全部云机的编排"""
+        lost = sorted(self._owned)
+        self._owned.clear()
+        self._released += len(lost)
+        await self._notify(self._on_released, lost, "交出")
+
+    async def _connect(self) -> None:
+        conn = await engine.connect()
+        try:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.add_listener(self.channel_for(self.worker_id), self._on_notify)
+            self._backend_pid = (await conn.execute(text("SELECT pg_backend_pid()"))).scalar()
+        except Exception:
+            await self._discard(conn)
+            raise
+        self._conn = conn
+
+    async def _disconnect(self) -> None:
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._backend_pid = None
+            await self._discard(conn)
+
+    @staticmethod
+    async def _discard(conn) -> None:
+        """断开连接而不是归还连接池，确保会话级锁随之释放"""
+        try:
+            await conn.invalidate()
+            await conn.close()
+        except Exception as e:
+            logger.debug(f"关闭分片锁连接出错: {e}")
+
+    async def _try_lock(self, pad_code: str) -> bool:
+        result = await self._conn.execute(text("SELECT pg_try_advisory_lock(:key)"),
+                                          {"key": _lock_key(self._lock_namespace, pad_code)})
+        return bool(result.scalar())
+
+    async def _unlock(self, pad_code: str) -> None:
+        await self._conn.execute(text("SELECT pg_advisory_unlock(:key)"),
+                                 {"key": _lock_key(self._lock_namespace, pad_code)})
+
+    async def _rebalance(self, wait: bool = False) -> None:
+        await heartbeat_shard_member(self.worker_id, self._backend_pid)
+        if leader_elector.is_leader:
+            pruned = await prune_shard_members(self._member_ttl)
+            if pruned:
+                logger.info(f"清理 {pruned} 个已退出 worker 的心跳记录")
+        members = await get_live_shard_members(self._member_ttl)
+        ring = HashRing(members + [self.worker_id], self._virtual_nodes)
+        if ring.members != self._ring.members:
+            logger.info(f"分片成员变化: {len(self._ring.members)} -> {len(ring.members)} 个 worker")
+        self._ring = ring
+        self._rebalances += 1
+
+        desired = {pad_code for pad_code in config.PAD_CODES if ring.owner(pad_code) == self.worker_id}
+
+        lost = sorted(self._owned - desired)
+        if lost:
+            # 先停止本地任务再释放锁，新的负责 worker 拿到锁时这里已不再操作这些云机
+            self._owned.difference_update(lost)
+            self._released += len(lost)
+            await self._notify(self._on_released, lost, "交出")
+            for pad_code in lost:
+                await self._unlock(pad_code)
+            logger.info(f"交出 {len(lost)} 台云机")
+
+        acquired = []
+        for pad_code in sorted(desired - self._owned):
+            if await self._try_lock(pad_code):
+                acquired.append(pad_code)
+            else:
+                # 原负责 worker 尚未释放，下一轮再试
+                self._lock_waits += 1
+        if acquired:
+            self._owned.update(acquired)
+            self._acquired += len(acquired)
+            logger.info(f"接管 {len(acquired)} 台云机，共负责 {len(self._owned)} 台")
+            task = create_detached_task(self._notify(self._on_acquired, acquired, "接管"))
+            if wait:
+                await task
+
+    async def _drop_all(self) -> None:
+        """锁连接断开：锁已随连接释放，停止本地全部云机的编排"""
+        lost = sorted(self._owned)
+        self._owned.clear()
+        self._released += len(lost)
+        await self._disconnect()
+        if lost:
+            logger.error(f"分片锁连接断开，停止 {len(lost)} 台云机的编排")
+            await self._notify(self._on_released, lost, "交出")
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._heartbeat_seconds)
+            try:
+                if self._conn is None:
+                    await self._connect()
+                else:
+                    await self._conn.execute(text("SELECT 1"))
+            except Exception as e:
+                logger.warning(f"分片锁连接不可用: {e}")
+                await self._drop_all()
+                continue
+            try:
+                await self._rebalance()
+            except Exception as e:
+                logger.error(f"重新分片失败: {e}")
+
+    @staticmethod
+    async def _notify(callbacks: List[PadsCallback], pad_codes: List[str], action: str) -> None:
+        for callback in callbacks:
+            try:
+                await callback(pad_codes)
+            except Exception as e:
+                logger.error(f"{action}云机后处理出错: {e}")
+
+    def _on_notify(self, _conn, _pid, _channel, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            handler = self._handlers[message["kind"]]
+        except (ValueError, KeyError) as e:
+            logger.error(f"无法处理转交消息: {e!r}, 内容: {payload[:200]}")
+            return
+        self._received += 1
+        create_detached_task(self._handle_forwarded(message["kind"], handler, message["data"]))
+
+    @staticmethod
+    async def _handle_forwarded(kind: str, handler: ForwardHandler, data: Dict[str, Any]) -> None:
+        try:
+            await handler(data)
+        except Exception as e:
+            logger.error(f"处理转交消息 {kind} 出错: {e!r}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "worker_id": self.worker_id,
+            "is_leader": leader_elector.is_leader,
+            "members": self._ring.members,
+            "owned": len(self._owned),
+            "total_pads": len(config.PAD_CODES),
+            "rebalances": self._rebalances,
+            "acquired": self._acquired,
+            "released": self._released,
+            "lock_waits": self._lock_waits,
+            "forwarded": self._forwarded,
+            "received": self._received,
+            "undeliverable": self._undeliverable,
+            "pads": sorted(self._owned)
+        }
+
+
+# 全局云机分片
+pad_shards = PadShardCoordinator()
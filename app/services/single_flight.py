@@ -0,0 +1,57 @@
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.services.deadline import create_detached_task
+from app.services.logger import get_logger
+
+logger = get_logger("single_flight")
+
+
+def canonical_key(path: str, body: Dict[str, Any], *extra: Hashable) -> tuple:
+    """由接口路径和规范化请求体生成去重键"""
+    return (path, json.dumps(body, sort_keys=True, ensure_ascii=False), *extra)
+
+
+class SingleFlight:
+    """相同请求在途去重
+
+    同一个键同时只执行一次，并发的相同请求共享同一个HTTP调用和解析结果。
+    实际调用在独立任务中执行（不继承调用方的截止时间），某个等待方被取消不会影响其他等待方。
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._calls = 0
+        self._shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self._calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            task = create_detached_task(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._on_done(key, t))
+        else:
+            self._shared += 1
+        return await asyncio.shield(task)
+
+    def _on_done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # 所有等待方都已取消时异常无人读取，这里读取一次避免告警
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self._calls,
+            "shared_calls": self._shared,
+            "executed_calls": self._calls - self._shared,
+            "in_flight": len(self._in_flight),
+            "dedup_ratio": round(self._shared / self._calls, 3) if self._calls else 0
+        }
+
+
+# 全局在途去重实例
+vmos_single_flight = SingleFlight()
@@ -0,0 +1,191 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Integer, String, cast, column, func, update, values
+
+from app.config import config
+from app.services.database import SessionLocal, Status
+from app.services.logger import task_logger
+
+# 关闭时写入失败的重试次数
+SHUTDOWN_FLUSH_ATTEMPTS = 3
+
+# 按增量累加的计数字段
+COUNTER_FIELDS = ("number_of_run", "phone_number_counts", "secondary_email_num", "forward_num",
+                  "num_of_success", "num_of_error", "num_other_error")
+
+
+@dataclass
+class PendingStatus:
+    """一台云机尚未写入数据库的更新：状态取最后一次，计数累加"""
+    current_status: Optional[str] = None
+    temple_id: Optional[int] = None
+    counters: Dict[str, int] = field(default_factory=dict)
+
+    def merge(self, newer: 'PendingStatus') -> None:
+        if newer.current_status is not None:
+            self.current_status = newer.current_status
+        if newer.temple_id is not None:
+            self.temple_id = newer.temple_id
+        for name, value in newer.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+
+class StatusWriteBuffer:
+    """云机状态写缓冲（write-behind）
+
+    流水线中的进度状态和计数先在内存中按云机合并，每隔 flush_interval 秒或待写云机
+    达到 max_pads 台时，用一条多行 UPDATE ... FROM (VALUES ...) 批量写入，并只广播一次
+    WebSocket 状态更新。写入失败的更新合并回缓冲区下次重试；关闭时全部写入。
+    """
+
+    def __init__(self):
+        buffer_config = config.STATUS_BUFFER
+        self.enabled = buffer_config.enabled
+        self._interval = buffer_config.flush_interval
+        self._max_pads = buffer_config.max_pads
+        self._pending: Dict[str, PendingStatus] = {}
+        # 正在写入的批次中的云机，直接更新这些云机前需等批次写完
+        self._flushing: Dict[str, asyncio.Event] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._last_status: Dict[str, str] = {}
+        self._submitted = 0
+        self._flushes = 0
+        self._rows_written = 0
+        self._failures = 0
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止定时写入并把剩余更新全部写入数据库"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for attempt in range(SHUTDOWN_FLUSH_ATTEMPTS):
+            await self.flush()
+            if not self._pending:
+                return
+            await asyncio.sleep(attempt + 1)
+        if self._pending:
+            task_logger.error(f"关闭时仍有 {len(self._pending)} 台云机的状态更新未能写入")
+
+    def submit(self, pad_code: str, change: PendingStatus) -> None:
+        """登记一次更新，不等待写入"""
+        if change.current_status is not None and self._last_status.get(pad_code) != change.current_status:
+            task_logger.info(f"{pad_code}: 状态更新 -> {change.current_status}")
+            self._last_status[pad_code] = change.current_status
+        pending = self._pending.get(pad_code)
+        if pending is None:
+            self._pending[pad_code] = change
+        else:
+            pending.merge(change)
+        self._submitted += 1
+        if len(self._pending) >= self._max_pads:
+            self._wake.set()
+
+    async def take(self, pad_code: str) -> Optional[PendingStatus]:
+        """取出该云机待写的更新（由直接写入合并），并等待包含该云机的批次写完以保证顺序"""
+        flushing = self._flushing.get(pad_code)
+        if flushing is not None:
+            await flushing.wait()
+        return self._pending.pop(pad_code, None)
+
+    def restore(self, pad_code: str, pending: PendingStatus) -> None:
+        """直接写入失败时放回取出的更新（之后登记的状态更新优先）"""
+        newer = self._pending.get(pad_code)
+        if newer is not None:
+            pending.merge(newer)
+        self._pending[pad_code] = pending
+
+    def discard(self, pad_code: str) -> None:
+        """云机状态行已删除，丢弃待写更新"""
+        self._pending.pop(pad_code, None)
+        self._last_status.pop(pad_code, None)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """把当前缓冲的更新批量写入，返回写入的行数"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            done = asyncio.Event()
+            for pad_code in batch:
+                self._flushing[pad_code] = done
+            try:
+                written = await self._write(batch)
+            except Exception as e:
+                self._failures += 1
+                task_logger.error(f"批量写入 {len(batch)} 台云机状态失败，稍后重试: {e}")
+                for pad_code, pending in batch.items():
+                    self.restore(pad_code, pending)
+                return 0
+            finally:
+                for pad_code in batch:
+                    if self._flushing.get(pad_code) is done:
+                        del self._flushing[pad_code]
+                done.set()
+
+        self._flushes += 1
+        self._rows_written += len(written)
+        missing = set(batch) - written
+        if missing:
+            task_logger.debug(f"云机状态不存在，丢弃更新: {', '.join(sorted(missing))}")
+        if written:
+            # 延迟导入避免循环依赖
+            from app.services.websocket_manager import ws_manager
+            await ws_manager.send_status_update()
+        return len(written)
+
+    @staticmethod
+    async def _write(batch: Dict[str, PendingStatus]) -> set:
+        table = Status.__table__
+        rows = [(pad_code, pending.current_status, pending.temple_id,
+                 *(pending.counters.get(name, 0) for name in COUNTER_FIELDS))
+                for pad_code, pending in batch.items()]
+        pending_rows = values(column("pad_code", String), column("current_status", String),
+                              column("temple_id", Integer), *(column(name, Integer) for name in COUNTER_FIELDS),
+                              name="pending").data(rows)
+        stmt = (update(table)
+                .where(table.c.pad_code == pending_rows.c.pad_code)
+                .values({
+                    # 某列全为 NULL 时 VALUES 推断不出类型，显式转换
+                    "current_status": func.coalesce(cast(pending_rows.c.current_status, String),
+                                                    table.c.current_status),
+                    "temple_id": func.coalesce(cast(pending_rows.c.temple_id, Integer), table.c.temple_id),
+                    **{name: table.c[name] + pending_rows.c[name] for name in COUNTER_FIELDS}
+                })
+                .returning(table.c.pad_code))
+        async with SessionLocal() as db:
+            written = set((await db.execute(stmt)).scalars().all())
+            await db.commit()
+        return written
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "pending_pads": len(self._pending),
+            "submitted": self._submitted,
+            "flushes": self._flushes,
+            "rows_written": self._rows_written,
+            "failures": self._failures,
+            "coalesce_ratio": round(self._submitted / self._rows_written, 2) if self._rows_written else None
+        }
+
+
+# 全局云机状态写缓冲
+status_buffer = StatusWriteBuffer()
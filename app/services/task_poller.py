@@ -0,0 +1,280 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import config
+from app.dependencies.utils import get_cloud_file_task_info
+from app.services.deadline import create_detached_task
+from app.services.logger import get_logger
+from app.services.resilience import VmosApiError
+
+logger = get_logger("task_poller")
+
+TASK_DETAIL_PATH = "/vcpcloud/api/padApi/padTaskDetail"
+
+# 各状态的基础轮询间隔（秒）：执行中的任务更快结束，轮询更勤
+STATE_INTERVALS = {
+    1: 5.0,  # 待执行
+    2: 3.0,  # 执行中
+}
+# 任务越老，间隔越长（每 AGE_STEP_SECONDS 秒增加一倍基础间隔）
+AGE_STEP_SECONDS = 120.0
+# 未结束的任务状态
+ACTIVE_STATES = (1, 2)
+
+
+def task_outcome(detail: Dict[str, Any]) -> int:
+    """归类任务状态：-1 失败/取消/超时，0 未结束，1 完成"""
+    task_status = detail.get("taskStatus")
+    if task_status == 3:
+        return 1
+    if task_status in (-1, -2, -3, -4):
+        if detail.get("errorMsg"):
+            logger.warning(f"{task_status}: {detail.get('padCode')}：{detail['errorMsg']}")
+        return -1
+    return 0
+
+
+@dataclass
+class _TaskWatch:
+    # 内部字典键统一用字符串，查询时按调用方给出的原始类型发送
+    task_id: str
+    raw_id: Any
+    registered_at: float
+    next_poll_at: float
+    refs: int = 0
+    detail: Optional[Dict[str, Any]] = None
+    waiters: List[Tuple[asyncio.Future, Any]] = field(default_factory=list)
+
+    @property
+    def status(self) -> Any:
+        return self.detail.get("taskStatus") if self.detail else None
+
+
+class TaskStatusPoller:
+    """全局任务等待注册表与状态轮询器
+
+    流水线代码通过 watch/wait 等待任务ID的状态变化：/callback 收到任务回调时立即唤醒等待方，
+    后台任务按批调用 padTaskDetail（taskIds 列表）作为漏回调的兜底。
+    启用回调时首次查询之后按 safety_interval 慢速轮询，否则按任务状态和年龄自适应。
+    已结束的任务不再轮询，等待方直接拿到最后一次结果。
+    """
+
+    def __init__(self):
+        poller_config = config.TASK_POLLER
+        self._batch_size = poller_config.batch_size
+        self._min_interval = poller_config.min_interval
+        self._max_interval = poller_config.max_interval
+        self._callbacks_enabled = poller_config.callbacks_enabled
+        self._safety_interval = poller_config.safety_interval
+        self._watches: Dict[str, _TaskWatch] = {}
+        self._driver: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._polls = 0
+        self._polled_tasks = 0
+        self._poll_errors = 0
+        self._wakeups = 0
+        self._callback_updates = 0
+
+    def _interval(self, watch: _TaskWatch, now: float) -> Optional[float]:
+        """下次轮询间隔，已结束的任务返回 None"""
+        if watch.detail is None:
+            return self._min_interval
+        base = STATE_INTERVALS.get(watch.status)
+        if base is None:
+            return None
+        if self._callbacks_enabled:
+            return self._safety_interval
+        age = now - watch.registered_at
+        interval = base * (1 + age / AGE_STEP_SECONDS)
+        return min(self._max_interval, max(self._min_interval, interval))
+
+    def watch(self, task_id: Any) -> None:
+        """开始跟踪任务，可重复调用（引用计数）"""
+        key = str(task_id)
+        watch = self._watches.get(key)
+        if watch is None:
+            now = asyncio.get_running_loop().time()
+            watch = _TaskWatch(task_id=key, raw_id=task_id, registered_at=now,
+                               next_poll_at=now + self._min_interval)
+            self._watches[key] = watch
+            self._ensure_driver()
+        watch.refs += 1
+
+    def unwatch(self, task_id: Any) -> None:
+        key = str(task_id)
+        watch = self._watches.get(key)
+        if watch is None:
+            return
+        watch.refs -= 1
+        if watch.refs <= 0:
+            del self._watches[key]
+            for future, _ in watch.waiters:
+                if not future.done():
+                    future.cancel()
+
+    async def wait(self, task_id: Any, known_status: Any = None, max_wait: float = 10) -> Dict[str, Any]:
+        """等待任务状态变为与 known_status 不同，最多等待 max_wait 秒后返回最近一次结果
+
+        返回 padTaskDetail 中该任务的条目（taskId、padCode、taskStatus、errorMsg）。
+        调用方需先 watch(task_id)。
+        """
+        watch = self._watches.get(str(task_id))
+        if watch is None:
+            raise VmosApiError(TASK_DETAIL_PATH, f"任务 {task_id} 未被跟踪")
+        if watch.detail is not None and watch.status != known_status:
+            return watch.detail
+
+        future = asyncio.get_running_loop().create_future()
+        watch.waiters.append((future, known_status))
+        try:
+            return await asyncio.wait_for(future, max_wait)
+        except asyncio.TimeoutError:
+            if watch.detail is None:
+                raise VmosApiError(TASK_DETAIL_PATH, f"任务 {task_id} 状态尚未获取")
+            return watch.detail
+        finally:
+            if (future, known_status) in watch.waiters:
+                watch.waiters.remove((future, known_status))
+
+    async def wait_outcome(self, task_id: Any, timeout: float) -> Dict[str, Any]:
+        """等待任务结束（或超时），返回最后一次结果
+
+        启用回调时兜底轮询间隔（safety_interval）可能比等待窗口长，窗口结束时任务仍未结束
+        （回调可能丢失）则在返回前主动查询一次，不依赖轮询恰好落在窗口内。
+        """
+        self.watch(task_id)
+        try:
+            loop = asyncio.get_running_loop()
+            end_time = loop.time() + timeout
+            status = None
+            detail: Dict[str, Any] = {}
+            while loop.time() < end_time:
+                try:
+                    detail = await self.wait(task_id, known_status=status, max_wait=end_time - loop.time())
+                except VmosApiError:
+                    break
+                status = detail.get("taskStatus")
+                if status not in ACTIVE_STATES:
+                    break
+            if detail.get("taskStatus") in ACTIVE_STATES or not detail:
+                detail = await self._poll_now(task_id) or detail
+            return detail
+        finally:
+            self.unwatch(task_id)
+
+    async def _poll_now(self, task_id: Any) -> Optional[Dict[str, Any]]:
+        """立即查询单个任务的状态，返回最新结果"""
+        watch = self._watches.get(str(task_id))
+        if watch is None:
+            return None
+        await self._poll_batch([watch])
+        return watch.detail
+
+    def resolve_from_callback(self, data: Dict[str, Any]) -> bool:
+        """用 /callback 推送的任务状态唤醒等待方，返回该任务是否有人等待"""
+        task_id = data.get("taskId")
+        task_status = data.get("taskStatus")
+        if task_id is None or task_status is None:
+            return False
+        watch = self._watches.get(str(task_id))
+        if watch is None:
+            return False
+        apps = data.get("apps") if isinstance(data.get("apps"), dict) else {}
+        self._callback_updates += 1
+        self._observe(watch.task_id, {
+            "taskId": task_id,
+            "padCode": data.get("padCode") or apps.get("padCode"),
+            "taskStatus": task_status,
+            "errorMsg": data.get("errorMsg", "")
+        })
+        # 收到回调后推迟兜底轮询（正在查询的批次结束后会自行重新安排）
+        if watch.next_poll_at != float("inf"):
+            now = asyncio.get_running_loop().time()
+            interval = self._interval(watch, now)
+            watch.next_poll_at = float("inf") if interval is None else now + interval
+        return True
+
+    def _observe(self, task_id: str, detail: Dict[str, Any]) -> None:
+        """记录任务最新状态并唤醒等待状态变化的协程"""
+        watch = self._watches.get(task_id)
+        if watch is None:
+            return
+        # 回调与轮询结果可能乱序到达，已结束的任务不回退到未结束状态
+        if watch.detail is not None and watch.status not in ACTIVE_STATES \
+                and detail.get("taskStatus") in ACTIVE_STATES:
+            return
+        watch.detail = detail
+        for future, known_status in list(watch.waiters):
+            if not future.done() and detail.get("taskStatus") != known_status:
+                future.set_result(detail)
+                self._wakeups += 1
+
+    def _ensure_driver(self) -> None:
+        self._wakeup.set()
+        if self._driver is None or self._driver.done():
+            # 轮询由所有设备共享，不继承单个流水线的截止时间
+            self._driver = create_detached_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._watches:
+            now = loop.time()
+            due = [watch for watch in self._watches.values() if watch.next_poll_at <= now]
+            if not due:
+                next_at = min(watch.next_poll_at for watch in self._watches.values())
+                self._wakeup.clear()
+                timeout = None if next_at == float("inf") else next_at - now
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # 批次进行中不重复轮询
+            for watch in due:
+                watch.next_poll_at = float("inf")
+            batches = [due[i:i + self._batch_size] for i in range(0, len(due), self._batch_size)]
+            await asyncio.gather(*(self._poll_batch(batch) for batch in batches))
+
+    async def _poll_batch(self, batch: List[_TaskWatch]) -> None:
+        self._polls += 1
+        self._polled_tasks += len(batch)
+        try:
+            result: Any = await get_cloud_file_task_info([watch.raw_id for watch in batch])
+            for item in result.get("data") or []:
+                self._observe(str(item.get("taskId")), item)
+        except (VmosApiError, AttributeError, TypeError) as e:
+            self._poll_errors += 1
+            logger.warning(f"批量查询任务状态失败（{len(batch)} 个任务）: {e}")
+        except Exception as e:
+            self._poll_errors += 1
+            logger.error(f"批量查询任务状态异常: {e}")
+
+        now = asyncio.get_running_loop().time()
+        for watch in batch:
+            interval = self._interval(watch, now)
+            watch.next_poll_at = float("inf") if interval is None else now + interval
+
+    def get_stats(self) -> Dict[str, Any]:
+        status_counts: Dict[str, int] = {}
+        for watch in self._watches.values():
+            key = str(watch.status)
+            status_counts[key] = status_counts.get(key, 0) + 1
+        return {
+            "watched_tasks": len(self._watches),
+            "waiters": sum(len(watch.waiters) for watch in self._watches.values()),
+            "status_counts": status_counts,
+            "polls": self._polls,
+            "polled_tasks": self._polled_tasks,
+            "avg_batch_size": round(self._polled_tasks / self._polls, 1) if self._polls else 0,
+            "poll_errors": self._poll_errors,
+            "wakeups": self._wakeups,
+            "callback_updates": self._callback_updates,
+            "callbacks_enabled": self._callbacks_enabled,
+            "batch_size": self._batch_size
+        }
+
+
+# 全局任务状态轮询器实例
+task_status_poller = TaskStatusPoller()
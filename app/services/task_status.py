@@ -1,14 +1,16 @@
 import asyncio
-import random
 from enum import IntEnum
 from typing import Any
 
 from app.config import config
-from app.curd.status import update_cloud_status, set_proxy_status
-from app.dependencies.countries import manager
-from app.dependencies.utils import get_cloud_file_task_info, replace_pad
+from app.curd.status import queue_cloud_status
+from app.dependencies.utils import get_cloud_file_task_info
+from app.services.deadline import deadline_scope
 from app.services.every_task import start_app_state, install_app_task
+from app.services.installed_apps import installed_apps
 from app.services.logger import task_logger
+from app.services.pad_actor import pad_actors
+from app.services.recycle import recycle_pad
 
 
 class TaskStatus(IntEnum):
@@ -71,6 +73,7 @@ def app_install_task_status(data):
     task_status = data.get("taskStatus")
     pad_code = data["apps"]["padCode"]
     app_name = data["apps"].get("appName", "未知应用")
+    installed_apps.record_callback(data, config.get_app_manifest())
 
     try:
         match TaskStatus(task_status):
@@ -130,6 +133,15 @@ def app_uninstall_task_status(data):
         task_logger.error(f"{pad_code}: 应用 {app_name} 卸载无效状态值 - {task_status}")
 
 
+async def _start_after_reboot(package_name, pad_code, task_manager):
+    try:
+        await asyncio.sleep(15)
+        with deadline_scope(config.get_timeout("global") * 60):
+            await start_app_state(package_name, pad_code, task_manager)
+    except Exception as e:
+        task_logger.error(f"{pad_code}: 重启后启动应用出错: {e}")
+
+
 async def reboot_task_status(data, package_name, task_manager):
     """重启任务状态处理"""
     task_status = data.get("taskStatus")
@@ -141,29 +153,29 @@ async def reboot_task_status(data, package_name, task_manager):
         match TaskStatus(task_status):
             case TaskStatus.ALL_FAILED:
                 task_logger.error(f"{pad_code}: 重启任务全失败")
-                await update_cloud_status(pad_code=pad_code, current_status="重启任务全失败")
+                await queue_cloud_status(pad_code=pad_code, current_status="重启任务全失败")
 
             case TaskStatus.CANCELLED:
                 task_logger.warning(f"{pad_code}: 重启任务取消")
-                await update_cloud_status(pad_code=pad_code, current_status="重启任务取消")
+                await queue_cloud_status(pad_code=pad_code, current_status="重启任务取消")
 
             case TaskStatus.TIMEOUT:
                 task_logger.warning(f"{pad_code}: 重启任务超时")
-                await update_cloud_status(pad_code=pad_code, current_status="重启任务超时")
+                await queue_cloud_status(pad_code=pad_code, current_status="重启任务超时")
 
             case TaskStatus.PENDING:
                 task_logger.info(f"{pad_code}: 重启任务待执行")
-                await update_cloud_status(pad_code=pad_code, current_status="重启任务待执行")
+                await queue_cloud_status(pad_code=pad_code, current_status="重启任务待执行")
 
             case TaskStatus.RUNNING:
                 task_logger.info(f"{pad_code}: 重启任务执行中")
-                await update_cloud_status(pad_code=pad_code, current_status="重启任务执行中")
+                await queue_cloud_status(pad_code=pad_code, current_status="重启任务执行中")
 
             case TaskStatus.COMPLETED:
                 task_logger.success(f"{pad_code}: 重启成功，等待15秒后启动应用")
-                await update_cloud_status(pad_code=pad_code, current_status="重启成功，准备启动应用")
-                await asyncio.sleep(15)
-                await start_app_state(package_name, pad_code, task_manager)
+                await queue_cloud_status(pad_code=pad_code, current_status="重启成功，准备启动应用")
+                # 启动应用耗时较长，派生为独立任务，不阻塞该云机后续事件
+                pad_actors.spawn(pad_code, _start_after_reboot(package_name, pad_code, task_manager))
 
             case _:
                 task_logger.error(f"{pad_code}: 重启未知任务状态: {task_status}")
@@ -216,7 +228,7 @@ async def replace_pad_stak_status(data, task_manager):
         match TaskStatus(task_status):
             case TaskStatus.COMPLETED:
                 task_logger.success(f"{pad_code}: 一键新机完成，开始安装应用")
-                await update_cloud_status(pad_code=pad_code, current_status="一键新机完成，正在安装app")
+                await queue_cloud_status(pad_code=pad_code, current_status="一键新机完成，正在安装app")
                 try:
                     await install_app_task(pad_code_str=pad_code, task_manager=task_manager)
                 except Exception as e:
@@ -224,31 +236,26 @@ async def replace_pad_stak_status(data, task_manager):
 
             case TaskStatus.RUNNING:
                 task_logger.info(f"{pad_code}: 一键新机执行中")
-                await update_cloud_status(pad_code=pad_code, current_status="一键新机执行中")
+                await queue_cloud_status(pad_code=pad_code, current_status="一键新机执行中")
 
             case TaskStatus.PENDING:
                 task_logger.info(f"{pad_code}: 一键新机等待中")
-                await update_cloud_status(pad_code=pad_code, current_status="一键新机等待中")
+                await queue_cloud_status(pad_code=pad_code, current_status="一键新机等待中")
 
             case TaskStatus.CANCELLED:
                 task_logger.warning(f"{pad_code}: 一键新机任务取消")
-                await update_cloud_status(pad_code=pad_code, current_status="一键新机任务取消")
+                await queue_cloud_status(pad_code=pad_code, current_status="一键新机任务取消")
 
             case TaskStatus.TIMEOUT:
                 task_logger.warning(f"{pad_code}: 一键新机任务超时")
-                await update_cloud_status(pad_code=pad_code, current_status="一键新机任务超时")
+                await queue_cloud_status(pad_code=pad_code, current_status="一键新机任务超时")
 
             case TaskStatus.ALL_FAILED:
                 task_logger.error(f"{pad_code}: 一键新机任务失败，准备重新一键新机")
-                await update_cloud_status(pad_code=pad_code, current_status="一键新机任务失败，准备重试")
+                await queue_cloud_status(pad_code=pad_code, current_status="一键新机任务失败，准备重试")
 
-                # 一键新机失败时的处理逻辑
-                template_id = random.choice(config.TEMPLE_IDS)
-                default_proxy: Any = manager.get_proxy_countries()
-                await set_proxy_status(pad_code, random.choice(default_proxy), number_of_run=1)
-                await update_cloud_status(pad_code, temple_id=template_id,
-                                          current_status="一键新机失败后重试中")
-                await replace_pad([pad_code], template_id=template_id)
+                # 一键新机失败时换代理重试
+                await recycle_pad(pad_code, "一键新机失败后重试中", new_proxy=True)
 
             case _:
                 task_logger.warning(f"{pad_code}: 一键新机未知状态 - {task_status}")
@@ -270,27 +277,27 @@ async def adb_call_task_status(data):
         match TaskStatus(task_status):
             case TaskStatus.COMPLETED:
                 task_logger.success(f"{pad_code}: 获取root权限成功")
-                await update_cloud_status(pad_code=pad_code, current_status="获取root权限成功")
+                await queue_cloud_status(pad_code=pad_code, current_status="获取root权限成功")
 
             case TaskStatus.RUNNING:
                 task_logger.info(f"{pad_code}: 调用adb中")
-                await update_cloud_status(pad_code=pad_code, current_status="调用adb中")
+                await queue_cloud_status(pad_code=pad_code, current_status="调用adb中")
 
             case TaskStatus.PENDING:
                 task_logger.info(f"{pad_code}: 准备调用adb")
-                await update_cloud_status(pad_code=pad_code, current_status="准备调用adb")
+                await queue_cloud_status(pad_code=pad_code, current_status="准备调用adb")
 
             case TaskStatus.CANCELLED:
                 task_logger.warning(f"{pad_code}: adb调用任务取消")
-                await update_cloud_status(pad_code=pad_code, current_status="adb调用任务取消")
+                await queue_cloud_status(pad_code=pad_code, current_status="adb调用任务取消")
 
             case TaskStatus.TIMEOUT:
                 task_logger.warning(f"{pad_code}: adb调用超时")
-                await update_cloud_status(pad_code=pad_code, current_status="adb调用超时")
+                await queue_cloud_status(pad_code=pad_code, current_status="adb调用超时")
 
             case TaskStatus.ALL_FAILED:
                 task_logger.error(f"{pad_code}: adb调用失败")
-                await update_cloud_status(pad_code=pad_code, current_status="adb调用失败")
+                await queue_cloud_status(pad_code=pad_code, current_status="adb调用失败")
 
             case _:
                 task_logger.warning(f"{pad_code}: ADB调用未知状态 - {task_status}")
@@ -0,0 +1,213 @@
+import asyncio
+import math
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.services.deadline import create_detached_task
+from app.services.logger import get_logger
+
+logger = get_logger("timer_wheel")
+
+TimerCallback = Callable[[], Optional[Awaitable[Any]]]
+
+
+class _Timer:
+    __slots__ = ("key", "expires_at", "expire_tick", "callback", "level", "slot")
+
+    def __init__(self, key: str, expires_at: float, expire_tick: int, callback: TimerCallback):
+        self.key = key
+        self.expires_at = expires_at
+        self.expire_tick = expire_tick
+        self.callback = callback
+        self.level = 0
+        self.slot = 0
+
+
+class HierarchicalTimerWheel:
+    """分层时间轮，集中管理大量按云机的超时
+
+    第 L 层每格代表 slots^L 个 tick，插入、取消、重新安排都是 O(1)；
+    高层的格子在低层转完一圈时下放（cascade）。只有一个驱动任务，跳过空的 tick，
+    睡眠到最近一个有定时器的格子或下放边界；插入新定时器时唤醒驱动任务重新计算。
+    没有定时器时驱动任务退出，插入时再启动。到期回调返回协程时在独立任务中执行。
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 4):
+        self._tick = tick
+        self._slots = slots
+        self._levels = levels
+        self._wheels: List[List[Dict[str, _Timer]]] = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._timers: Dict[str, _Timer] = {}
+        self._origin: Optional[float] = None
+        self._current_tick = 0
+        self._driver: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._fired = 0
+        self._cancelled = 0
+        self._rescheduled = 0
+        self._cascaded = 0
+        self._wakeups = 0
+
+    def _now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def _tick_of(self, when: float) -> int:
+        return math.ceil((when - self._origin) / self._tick)
+
+    def _place(self, timer: _Timer) -> None:
+        delta = timer.expire_tick - self._current_tick
+        for level in range(self._levels):
+            if delta < self._slots ** (level + 1) or level == self._levels - 1:
+                span = self._slots ** level
+                if delta >= self._slots ** (level + 1):
+                    # 超出时间轮范围，放在最高层最远的格子，下放时重新计算
+                    slot = (self._current_tick // span - 1) % self._slots
+                else:
+                    slot = (timer.expire_tick // span) % self._slots
+                timer.level = level
+                timer.slot = slot
+                self._wheels[level][slot][timer.key] = timer
+                return
+
+    def _unlink(self, timer: _Timer) -> None:
+        self._wheels[timer.level][timer.slot].pop(timer.key, None)
+
+    def schedule(self, key: str, delay: float, callback: TimerCallback) -> None:
+        """安排 delay 秒后执行 callback；同一个 key 已存在时重新安排"""
+        now = self._now()
+        if self._origin is None or not self._timers:
+            # 空轮时把当前 tick 对齐到现在，避免驱动任务追赶空闲期间的 tick
+            if self._origin is None:
+                self._origin = now
+            self._current_tick = math.floor((now - self._origin) / self._tick)
+
+        existing = self._timers.pop(key, None)
+        if existing is not None:
+            self._unlink(existing)
+            self._rescheduled += 1
+
+        expires_at = now + max(delay, 0)
+        timer = _Timer(key, expires_at, max(self._tick_of(expires_at), self._current_tick + 1), callback)
+        self._timers[key] = timer
+        self._place(timer)
+        self._ensure_driver()
+
+    def cancel(self, key: str) -> bool:
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        self._unlink(timer)
+        self._cancelled += 1
+        return True
+
+    def reschedule(self, key: str, delay: float) -> bool:
+        """保留回调，只修改到期时间"""
+        timer = self._timers.get(key)
+        if timer is None:
+            return False
+        self.schedule(key, delay, timer.callback)
+        return True
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._timers
+
+    def expires_in(self, key: str) -> Optional[float]:
+        timer = self._timers.get(key)
+        return None if timer is None else timer.expires_at - self._now()
+
+    def _ensure_driver(self) -> None:
+        self._wakeup.set()
+        if self._driver is None or self._driver.done():
+            self._driver = create_detached_task(self._run())
+
+    def _next_due_tick(self) -> int:
+        """最近一个需要处理的 tick：底层下一个非空格子，最晚到下一次下放"""
+        boundary = (self._current_tick // self._slots + 1) * self._slots
+        wheel = self._wheels[0]
+        for tick in range(self._current_tick + 1, boundary):
+            if wheel[tick % self._slots]:
+                return tick
+        return boundary
+
+    async def _run(self) -> None:
+        while self._timers:
+            self._wakeup.clear()
+            next_tick_at = self._origin + self._next_due_tick() * self._tick
+            delay = next_tick_at - self._now()
+            if delay > 0:
+                try:
+                    # 插入更早到期的定时器时提前醒来
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeups += 1
+            # 事件循环卡顿时补齐错过的 tick
+            target_tick = math.floor((self._now() - self._origin) / self._tick)
+            while self._current_tick < target_tick and self._timers:
+                self._advance()
+
+    def _advance(self) -> None:
+        self._current_tick += 1
+        tick = self._current_tick
+        # 从高到低依次下放当前对齐到边界的格子
+        for level in range(self._levels - 1, 0, -1):
+            span = self._slots ** level
+            if tick % span == 0:
+                slot = self._wheels[level][(tick // span) % self._slots]
+                timers = list(slot.values())
+                slot.clear()
+                self._cascaded += len(timers)
+                for timer in timers:
+                    self._place(timer)
+
+        due = self._wheels[0][tick % self._slots]
+        expired = [timer for timer in due.values() if timer.expire_tick <= tick]
+        for timer in expired:
+            del due[timer.key]
+            del self._timers[timer.key]
+            self._fire(timer)
+
+    def _fire(self, timer: _Timer) -> None:
+        self._fired += 1
+        try:
+            result = timer.callback()
+            if asyncio.iscoroutine(result):
+                create_detached_task(self._run_callback(timer.key, result))
+        except Exception as e:
+            logger.error(f"定时器回调异常 {timer.key}: {e}")
+
+    @staticmethod
+    async def _run_callback(key: str, coro: Awaitable[Any]) -> None:
+        try:
+            await coro
+        except Exception as e:
+            logger.error(f"定时器回调异常 {key}: {e}")
+
+    def upcoming(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """按到期时间列出即将到期的定时器"""
+        now = self._now()
+        timers = sorted(self._timers.values(), key=lambda t: t.expires_at)[:limit]
+        return [{
+            "key": timer.key,
+            "expires_in": round(timer.expires_at - now, 1),
+            "level": timer.level
+        } for timer in timers]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "timers": len(self._timers),
+            "tick_seconds": self._tick,
+            "slots": self._slots,
+            "levels": self._levels,
+            "range_seconds": self._tick * self._slots ** self._levels,
+            "fired": self._fired,
+            "cancelled": self._cancelled,
+            "rescheduled": self._rescheduled,
+            "cascaded": self._cascaded,
+            "wakeups": self._wakeups,
+            "levels_occupancy": [sum(len(slot) for slot in wheel) for wheel in self._wheels]
+        }
+
+
+# 全局云机定时器（全局超时等）
+device_timers = HierarchicalTimerWheel()
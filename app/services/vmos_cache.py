@@ -0,0 +1,166 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import config
+from app.services.logger import get_logger
+
+logger = get_logger("vmos_cache")
+
+CacheKey = Tuple[str, str]
+
+
+class TTLCache:
+    """带过期时间的LRU缓存，条目过期或被淘汰时调用 on_remove"""
+
+    def __init__(self, max_entries: int, on_remove: Optional[Callable[[CacheKey], None]] = None):
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._on_remove = on_remove
+        self.evictions = 0
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            if self._on_remove is not None:
+                self._on_remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: CacheKey, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            if self._on_remove is not None:
+                self._on_remove(evicted)
+
+    def delete(self, key: CacheKey) -> bool:
+        return self._entries.pop(key, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class VmosReadCache:
+    """只读VMOS查询的读穿缓存
+
+    成功响应按接口配置的TTL缓存，一键新机后按云机失效相关条目。
+    每台云机有失效代数，失效前发出、失效后才返回的查询结果不写入缓存。
+    返回的是共享对象，调用方不应修改。
+    """
+
+    def __init__(self):
+        cache_config = config.CACHE
+        self._cache = TTLCache(cache_config.max_entries, on_remove=self._forget)
+        self._pad_keys: Dict[str, Set[CacheKey]] = {}
+        # 反向索引：缓存条目涉及的云机，条目移除时据此清理 _pad_keys
+        self._key_pads: Dict[CacheKey, Set[str]] = {}
+        self._global_keys: Set[CacheKey] = set()
+        # 失效代数：每次失效加一，全量列表等不区分云机的条目用 _global_generation
+        self._generations: Dict[str, int] = {}
+        self._global_generation = 0
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+        self._invalidations = 0
+        self._stale = 0
+
+    @staticmethod
+    def make_key(path: str, body: Dict[str, Any]) -> CacheKey:
+        return path, json.dumps(body, sort_keys=True, ensure_ascii=False)
+
+    async def read_through(self, path: str, body: Dict[str, Any], ttl: float,
+                           fetch: Callable[[], Awaitable[Any]],
+                           pad_codes: Optional[Iterable[str]] = None) -> Any:
+        """命中缓存直接返回，否则调用 fetch 并缓存成功响应
+
+        pad_codes 为空表示结果涉及全部云机（如 userPadList），任意云机一键新机都会使其失效。
+        """
+        key = self.make_key(path, body)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._hits[path] = self._hits.get(path, 0) + 1
+            return cached
+
+        self._misses[path] = self._misses.get(path, 0) + 1
+        pad_codes = list(pad_codes or ())
+        generation = self._generation(pad_codes)
+        result = await fetch()
+        if generation != self._generation(pad_codes):
+            # 查询期间云机被一键新机，结果可能是新机前的数据
+            self._stale += 1
+            return result
+        if ttl > 0 and isinstance(result, dict) and result.get("code") == 200:
+            # 先登记索引再写入，写入时被淘汰的条目也能从索引中清理
+            if pad_codes:
+                for pad_code in pad_codes:
+                    self._pad_keys.setdefault(pad_code, set()).add(key)
+                    self._key_pads.setdefault(key, set()).add(pad_code)
+            else:
+                self._global_keys.add(key)
+            self._cache.set(key, result, ttl)
+        return result
+
+    def _generation(self, pad_codes: List[str]) -> Tuple[int, ...]:
+        if not pad_codes:
+            return (self._global_generation,)
+        return tuple(self._generations.get(pad_code, 0) for pad_code in pad_codes)
+
+    def invalidate_pads(self, pad_codes: Iterable[str]) -> None:
+        """云机模板变化（一键新机）后失效该云机的缓存以及全量列表缓存"""
+        keys = set(self._global_keys)
+        self._global_generation += 1
+        for pad_code in pad_codes:
+            self._generations[pad_code] = self._generations.get(pad_code, 0) + 1
+            keys.update(self._pad_keys.get(pad_code, ()))
+        removed = 0
+        for key in keys:
+            removed += self._cache.delete(key)
+            self._forget(key)
+        if removed:
+            self._invalidations += removed
+            logger.debug(f"缓存失效 {removed} 条")
+
+    def _forget(self, key: CacheKey) -> None:
+        """缓存条目已移除（失效、过期或被淘汰），从索引中删除"""
+        self._global_keys.discard(key)
+        for pad_code in self._key_pads.pop(key, ()):
+            keys = self._pad_keys.get(pad_code)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._pad_keys[pad_code]
+
+    def get_stats(self) -> Dict[str, Any]:
+        endpoints = {}
+        for path in set(self._hits) | set(self._misses):
+            hits = self._hits.get(path, 0)
+            misses = self._misses.get(path, 0)
+            endpoints[path] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else 0
+            }
+        total_hits = sum(self._hits.values())
+        total_misses = sum(self._misses.values())
+        return {
+            "entries": len(self._cache),
+            "indexed_pads": len(self._pad_keys),
+            "max_entries": config.CACHE.max_entries,
+            "evictions": self._cache.evictions,
+            "invalidations": self._invalidations,
+            "stale_discarded": self._stale,
+            "hit_ratio": round(total_hits / (total_hits + total_misses), 3) if total_hits + total_misses else 0,
+            "endpoints": endpoints
+        }
+
+
+# 全局只读查询缓存实例
+vmos_cache = VmosReadCache()
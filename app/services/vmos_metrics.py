@@ -0,0 +1,177 @@
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+# 当前流水线阶段（install / start / recycle ...），随 asyncio 任务上下文传递
+_current_stage: ContextVar[str] = ContextVar("vmos_pipeline_stage", default="other")
+
+# 延迟直方图桶上界（毫秒）
+LATENCY_BUCKETS_MS: List[float] = [25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf")]
+
+
+@contextmanager
+def pipeline_stage(stage: str):
+    """在此上下文（及其中创建的任务）内发出的VMOS调用归属到指定阶段"""
+    token = _current_stage.set(stage)
+    try:
+        yield
+    finally:
+        _current_stage.reset(token)
+
+
+def set_pipeline_stage(stage: str) -> None:
+    """设置当前任务的流水线阶段（只影响当前任务及其后创建的子任务）"""
+    _current_stage.set(stage)
+
+
+def current_stage() -> str:
+    return _current_stage.get()
+
+
+class LatencyHistogram:
+    """固定桶延迟直方图"""
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS_MS)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, latency_ms: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        self.total += 1
+        self.sum_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """按桶估算分位数（桶内线性插值）"""
+        if self.total == 0:
+            return None
+        target = q * self.total
+        cumulative = 0
+        lower = 0.0
+        for upper, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            if count and cumulative + count >= target:
+                upper = min(upper, self.max_ms)
+                return lower + (upper - lower) * (target - cumulative) / count
+            cumulative += count
+            lower = upper
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        p50, p95, p99 = self.quantile(0.5), self.quantile(0.95), self.quantile(0.99)
+        return {
+            "count": self.total,
+            "avg_ms": round(self.sum_ms / self.total, 1) if self.total else None,
+            "p50_ms": round(p50, 1) if p50 is not None else None,
+            "p95_ms": round(p95, 1) if p95 is not None else None,
+            "p99_ms": round(p99, 1) if p99 is not None else None,
+            "max_ms": round(self.max_ms, 1),
+            "buckets": {("+Inf" if upper == float("inf") else f"le_{int(upper)}"): count
+                        for upper, count in zip(LATENCY_BUCKETS_MS, self.counts)}
+        }
+
+
+class _EndpointMetrics:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.response_codes: Dict[str, int] = {}
+
+
+class VmosMetrics:
+    """VMOS客户端调用统计：按接口的延迟直方图、错误数、响应码，按云机和阶段归属调用次数"""
+
+    def __init__(self):
+        self._started_at = time.time()
+        self._endpoints: Dict[str, _EndpointMetrics] = {}
+        self._stages: Dict[str, Dict[str, int]] = {}
+        self._pads: Dict[str, float] = {}
+        self._total_calls = 0
+        self._successful_accounts = 0
+        self._pad_accounts: Dict[str, int] = {}
+        # 每台云机一轮安装提交（全部 uploadFileV3 返回）的耗时
+        self._install_submit = LatencyHistogram()
+        self._pad_install_submit: Dict[str, float] = {}
+
+    def record_call(self, path: str, latency: float, code: Any, pad_codes: List[str], error: bool) -> None:
+        """记录一次实际发出的HTTP调用"""
+        endpoint = self._endpoints.get(path)
+        if endpoint is None:
+            endpoint = self._endpoints[path] = _EndpointMetrics()
+        endpoint.latency.observe(latency * 1000)
+        code_key = str(code)
+        endpoint.response_codes[code_key] = endpoint.response_codes.get(code_key, 0) + 1
+        if error:
+            endpoint.errors += 1
+
+        stage = current_stage()
+        stage_counts = self._stages.setdefault(stage, {})
+        stage_counts[path] = stage_counts.get(path, 0) + 1
+
+        # 批量请求按云机数量平摊
+        if pad_codes:
+            share = 1 / len(pad_codes)
+            for pad_code in pad_codes:
+                self._pads[pad_code] = self._pads.get(pad_code, 0) + share
+
+        self._total_calls += 1
+
+    def record_account_success(self, pad_code: Optional[str]) -> None:
+        """记录一个成功产出的账号"""
+        self._successful_accounts += 1
+        if pad_code:
+            self._pad_accounts[pad_code] = self._pad_accounts.get(pad_code, 0) + 1
+
+    def record_install_submit(self, pad_code: str, seconds: float) -> None:
+        """记录一台云机提交一轮安装任务的耗时"""
+        self._install_submit.observe(seconds * 1000)
+        self._pad_install_submit[pad_code] = seconds * 1000
+
+    def get_endpoint_quantile(self, path: str, q: float, min_samples: int = 20) -> Optional[float]:
+        """获取接口延迟分位数（秒），样本不足时返回 None"""
+        endpoint = self._endpoints.get(path)
+        if endpoint is None or endpoint.latency.total < min_samples:
+            return None
+        value = endpoint.latency.quantile(q)
+        return value / 1000 if value is not None else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        pads = {}
+        for pad_code, calls in self._pads.items():
+            accounts = self._pad_accounts.get(pad_code, 0)
+            install_submit_ms = self._pad_install_submit.get(pad_code)
+            pads[pad_code] = {
+                "api_calls": round(calls, 1),
+                "accounts": accounts,
+                "api_calls_per_account": round(calls / accounts, 1) if accounts else None,
+                "last_install_submit_ms": round(install_submit_ms, 1) if install_submit_ms is not None else None
+            }
+
+        return {
+            "since": self._started_at,
+            "summary": {
+                "total_api_calls": self._total_calls,
+                "successful_accounts": self._successful_accounts,
+                "api_calls_per_successful_account": (
+                    round(self._total_calls / self._successful_accounts, 1) if self._successful_accounts else None
+                )
+            },
+            "endpoints": {
+                path: {
+                    "latency": endpoint.latency.to_dict(),
+                    "errors": endpoint.errors,
+                    "response_codes": endpoint.response_codes
+                }
+                for path, endpoint in self._endpoints.items()
+            },
+            "stages": self._stages,
+            "install_submit": self._install_submit.to_dict(),
+            "pads": pads
+        }
+
+
+# 全局VMOS调用统计实例
+vmos_metrics = VmosMetrics()
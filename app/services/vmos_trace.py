@@ -0,0 +1,211 @@
+import asyncio
+import gzip
+import json
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from app.services.logger import get_logger
+from app.services.resilience import VmosApiError
+from app.services.single_flight import canonical_key
+
+logger = get_logger("vmos_trace")
+
+# 需要脱敏的字段（不区分大小写）
+REDACTED_KEYS = {"ak", "sk", "authorization", "password", "for_password", "token", "secret"}
+
+
+def _pad_codes(body: Any) -> frozenset:
+    """请求体中的云机编号（padCodes 或 padCode）"""
+    if not isinstance(body, dict):
+        return frozenset()
+    pad_codes = body.get("padCodes")
+    if isinstance(pad_codes, list):
+        return frozenset(str(pad_code) for pad_code in pad_codes)
+    pad_code = body.get("padCode")
+    return frozenset([str(pad_code)]) if pad_code is not None else frozenset()
+
+
+def _redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: ("***" if k.lower() in REDACTED_KEYS else _redact(v)) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_redact(item) for item in value]
+    return value
+
+
+class VmosTraceRecorder:
+    """把 VmosUtil.send() 的请求/响应序列和 /callback 回调记录为 gzip JSONL 轨迹
+
+    每行一条事件，时间为相对录制开始的秒数：
+    {"t": 1.23, "k": "call", "p": 路径, "b": 请求体, "r": 响应, "l": 耗时, "e": 错误}
+    {"t": 4.56, "k": "callback", "d": 回调数据}
+    请求头（含签名凭据）不记录，请求体和响应中的敏感字段脱敏。
+    """
+
+    def __init__(self):
+        self._file = None
+        self._path: Optional[str] = None
+        self._started_at = 0.0
+        self._events = 0
+
+    @property
+    def active(self) -> bool:
+        return self._file is not None
+
+    def start(self, path: str) -> None:
+        if self.active:
+            self.stop()
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._path = path
+        self._started_at = time.monotonic()
+        self._events = 0
+        logger.info(f"开始录制VMOS轨迹: {path}")
+
+    def stop(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            logger.info(f"VMOS轨迹录制结束: {self._path}, 共 {self._events} 条")
+        self._file = None
+
+    def _write(self, event: Dict[str, Any]) -> None:
+        if self._file is None:
+            return
+        self._file.write(json.dumps(event, ensure_ascii=False, separators=(',', ':')) + "\n")
+        self._events += 1
+
+    def record_call(self, path: str, body: Dict[str, Any], started_at: float,
+                    response: Any = None, error: Optional[BaseException] = None) -> None:
+        event = {
+            "t": round(started_at - self._started_at, 3),
+            "k": "call",
+            "p": path,
+            "b": _redact(body),
+            "l": round(time.monotonic() - started_at, 3)
+        }
+        if error is not None:
+            event["e"] = f"{type(error).__name__}: {error}"
+        else:
+            event["r"] = _redact(response)
+        self._write(event)
+
+    def record_callback(self, data: Dict[str, Any]) -> None:
+        self._write({"t": round(time.monotonic() - self._started_at, 3), "k": "callback", "d": _redact(data)})
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"active": self.active, "file": self._path, "events": self._events}
+
+
+def load_trace(path: str) -> List[Dict[str, Any]]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class VmosTraceReplayer:
+    """按轨迹回放VMOS响应与回调，不访问网络
+
+    请求按 (路径, 规范化请求体) 依次匹配录制的响应，匹配不到时退回到同路径、同一组云机的下一条记录
+    （如任务编号、时间戳不同的请求），仍匹配不到时抛出 VmosApiError；
+    响应耗时与回调时间按 speed 倍速压缩。
+    """
+
+    def __init__(self):
+        self._speed = 1.0
+        self._by_request: Dict[tuple, Deque[Dict[str, Any]]] = {}
+        self._by_pads: Dict[tuple, Deque[Dict[str, Any]]] = {}
+        self._callbacks: List[Dict[str, Any]] = []
+        self._driver: Optional[asyncio.Task] = None
+        self._path: Optional[str] = None
+        self._matched = 0
+        self._fallback = 0
+        self._missed = 0
+        self._callbacks_sent = 0
+
+    @property
+    def active(self) -> bool:
+        return self._path is not None
+
+    def load(self, path: str, speed: float = 1.0) -> None:
+        self._speed = max(speed, 0.001)
+        self._by_request.clear()
+        self._by_pads.clear()
+        self._callbacks = []
+        for event in load_trace(path):
+            if event["k"] == "call":
+                self._by_request.setdefault(canonical_key(event["p"], event["b"]), deque()).append(event)
+                self._by_pads.setdefault((event["p"], _pad_codes(event["b"])), deque()).append(event)
+            elif event["k"] == "callback":
+                self._callbacks.append(event)
+        self._path = path
+        logger.info(f"已加载VMOS轨迹: {path}, 回放速度 {self._speed}x, 回调 {len(self._callbacks)} 条")
+
+    def _take(self, path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        pad_codes = _pad_codes(body)
+        exact = self._by_request.get(canonical_key(path, body))
+        if exact:
+            event = exact.popleft()
+            self._by_pads[(path, pad_codes)].remove(event)
+            self._matched += 1
+            return event
+        same_pads = self._by_pads.get((path, pad_codes))
+        if same_pads:
+            event = same_pads.popleft()
+            self._by_request[canonical_key(path, event["b"])].remove(event)
+            self._fallback += 1
+            return event
+        self._missed += 1
+        logger.error(f"回放轨迹中没有匹配的响应: {path} {sorted(pad_codes)}")
+        raise VmosApiError(path, f"回放轨迹中没有云机 {'、'.join(sorted(pad_codes)) or '-'} 可用的响应")
+
+    async def respond(self, path: str, body: Dict[str, Any]) -> Any:
+        """返回录制的响应（按倍速模拟原始耗时）"""
+        event = self._take(path, body)
+        await asyncio.sleep(event.get("l", 0) / self._speed)
+        if "e" in event:
+            raise VmosApiError(path, f"回放录制的错误: {event['e']}")
+        return event["r"]
+
+    def start_callbacks(self, dispatch: Callable[[Dict[str, Any]], Awaitable[Any]]) -> None:
+        """按录制时间把回调重新投递给流水线"""
+        self._driver = asyncio.create_task(self._drive_callbacks(dispatch))
+
+    async def _drive_callbacks(self, dispatch: Callable[[Dict[str, Any]], Awaitable[Any]]) -> None:
+        started_at = time.monotonic()
+        for event in self._callbacks:
+            delay = event["t"] / self._speed - (time.monotonic() - started_at)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                await dispatch(event["d"])
+                self._callbacks_sent += 1
+            except Exception as e:
+                logger.error(f"回放回调失败: {e}")
+        logger.info(f"VMOS轨迹回调回放完成: {self._callbacks_sent} 条")
+
+    async def stop(self) -> None:
+        if self._driver is not None and not self._driver.done():
+            self._driver.cancel()
+            try:
+                await self._driver
+            except asyncio.CancelledError:
+                pass
+        self._driver = None
+        self._path = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "file": self._path,
+            "speed": self._speed,
+            "matched": self._matched,
+            "fallback": self._fallback,
+            "missed": self._missed,
+            "remaining_calls": sum(len(events) for events in self._by_pads.values()),
+            "callbacks_sent": self._callbacks_sent,
+            "callbacks_total": len(self._callbacks)
+        }
+
+
+# 全局轨迹录制/回放实例
+vmos_recorder = VmosTraceRecorder()
+vmos_replayer = VmosTraceReplayer()
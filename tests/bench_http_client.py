@@ -0,0 +1,75 @@
+"""VMOS HTTP客户端基准测试：每次新建会话 vs 共享连接池
+
+运行: python -m tests.bench_http_client
+"""
+import asyncio
+import json
+import time
+
+import aiohttp
+from aiohttp import web
+
+from app.services.http_client import VmosHttpClient
+
+HOST = "127.0.0.1"
+PORT = 18080
+TOTAL_CALLS = 2000
+CONCURRENCY = 50
+
+
+async def _fake_pad_task_detail(request: web.Request) -> web.Response:
+    """本地替身接口，模拟 padTaskDetail 的响应"""
+    body = await request.json()
+    data = [{"taskId": task_id, "taskStatus": 2, "padCode": "BENCH", "errorMsg": ""}
+            for task_id in body.get("taskIds", [])]
+    return web.json_response({"code": 200, "msg": "success", "data": data})
+
+
+async def _run(call, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            await call(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+async def main():
+    app = web.Application()
+    app.router.add_post("/vcpcloud/api/padApi/padTaskDetail", _fake_pad_task_detail)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, PORT).start()
+
+    url = f"http://{HOST}:{PORT}/vcpcloud/api/padApi/padTaskDetail"
+    headers = {"content-type": "application/json;charset=UTF-8"}
+
+    # 旧行为：每次调用新建 ClientSession
+    async def per_call_session(i: int):
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, headers=headers, data=json.dumps({"taskIds": [i]})) as response:
+                await response.json()
+
+    # 新行为：共享连接池
+    client = VmosHttpClient()
+    await client.start()
+
+    async def shared_session(i: int):
+        await client.post_json(url, headers=headers, data=json.dumps({"taskIds": [i]}))
+
+    try:
+        old_rate = await _run(per_call_session, TOTAL_CALLS, CONCURRENCY)
+        new_rate = await _run(shared_session, TOTAL_CALLS, CONCURRENCY)
+        print(f"每次新建会话: {old_rate:,.0f} calls/s")
+        print(f"共享连接池:   {new_rate:,.0f} calls/s  ({new_rate / old_rate:.1f}x)")
+        print(f"连接池统计: {client.get_pool_stats()}")
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
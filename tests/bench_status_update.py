@@ -0,0 +1,80 @@
+"""云机状态计数更新基准：SELECT → 修改 → COMMIT → refresh vs 单条 UPDATE ... RETURNING
+
+需要可连接的 Postgres（DATABASE_URL），基准前插入 BENCH- 开头的云机状态行，结束后删除。
+运行: python -m tests.bench_status_update
+"""
+import asyncio
+import time
+from typing import cast
+
+from sqlalchemy import ColumnElement, select, delete
+
+from app.curd.status import update_cloud_status
+from app.services.database import SessionLocal, Status, engine, Base
+
+PADS = 20
+TOTAL_UPDATES = 4000
+CONCURRENCY = 50
+
+
+async def legacy_update(pad_code: str, num_of_success: int) -> Status:
+    """旧实现：读出整行，在 Python 中累加后提交，再 refresh 一次"""
+    async with SessionLocal() as db:
+        result = await db.execute(select(Status).filter(cast(ColumnElement[bool], Status.pad_code == pad_code)))
+        db_status = result.scalars().first()
+        db_status.num_of_success += num_of_success
+        await db.commit()
+        await db.refresh(db_status)
+        return db_status
+
+
+async def _reset(pad_codes: list) -> None:
+    async with SessionLocal() as db:
+        await db.execute(delete(Status).filter(Status.pad_code.in_(pad_codes)))
+        db.add_all(Status(pad_code=pad_code, country="bench", current_status="bench", proxy="", code="",
+                          time_zone="", language="", latitude=0, longitude=0) for pad_code in pad_codes)
+        await db.commit()
+
+
+async def _total_success(pad_codes: list) -> int:
+    async with SessionLocal() as db:
+        result = await db.execute(select(Status.num_of_success).filter(Status.pad_code.in_(pad_codes)))
+        return sum(result.scalars().all())
+
+
+async def _run(update, pad_codes: list) -> tuple[float, int]:
+    await _reset(pad_codes)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(i: int):
+        async with semaphore:
+            await update(pad_codes[i % len(pad_codes)], 1)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(TOTAL_UPDATES)))
+    rate = TOTAL_UPDATES / (time.perf_counter() - start)
+    return rate, TOTAL_UPDATES - await _total_success(pad_codes)
+
+
+async def main():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    pad_codes = [f"BENCH-{i:03d}" for i in range(PADS)]
+    try:
+        legacy_rate, legacy_lost = await _run(legacy_update, pad_codes)
+        fast_rate, fast_lost = await _run(
+            lambda pad_code, n: update_cloud_status(pad_code, num_of_success=n), pad_codes)
+    finally:
+        async with SessionLocal() as db:
+            await db.execute(delete(Status).filter(Status.pad_code.in_(pad_codes)))
+            await db.commit()
+        await engine.dispose()
+
+    print(f"{TOTAL_UPDATES} 次更新，{PADS} 台云机，并发 {CONCURRENCY}")
+    print(f"旧实现: {legacy_rate:,.0f} updates/s，丢失增量 {legacy_lost}")
+    print(f"UPDATE ... RETURNING: {fast_rate:,.0f} updates/s，丢失增量 {fast_lost}")
+    print(f"提升: {fast_rate / legacy_rate:.2f}x")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+import asyncio
+
+from app.config import config
+from app.dependencies import utils
+from app.services import device_scheduler as scheduler_module
+from app.services import request_coalescer as coalescer_module
+from app.services.device_scheduler import DeviceOperationScheduler, operation_priority, PRIORITY_RECOVERY, \
+    PRIORITY_ROUTINE
+
+
+class _FakeVmosUtil:
+    """记录同时在途的请求数"""
+    in_flight = 0
+    peak = 0
+    calls = []
+    batch_sizes = []
+
+    def __init__(self, url, body):
+        self.url = url
+        self.body = body
+
+    async def send(self):
+        cls = _FakeVmosUtil
+        cls.in_flight += 1
+        cls.peak = max(cls.peak, cls.in_flight)
+        cls.calls.append(self.url)
+        cls.batch_sizes.append(len(self.body.get("padCodes", [])))
+        await asyncio.sleep(0.01)
+        cls.in_flight -= 1
+        return {"code": 200, "msg": "success",
+                "data": [{"taskId": i, "padCode": pad_code} for i, pad_code in enumerate(self.body["padCodes"])]}
+
+
+def _scheduler(monkeypatch, limits):
+    monkeypatch.setattr(config.DEVICE_SCHEDULER, "limits", limits)
+    return DeviceOperationScheduler()
+
+
+def test_install_app_is_capped_by_install_limit(monkeypatch):
+    scheduler = _scheduler(monkeypatch, {"install": 3})
+    monkeypatch.setattr(utils, "device_scheduler", scheduler)
+    monkeypatch.setattr(utils, "VmosUtil", _FakeVmosUtil)
+    _FakeVmosUtil.peak = _FakeVmosUtil.in_flight = 0
+
+    async def main():
+        await asyncio.gather(*(utils.install_app([f"PAD{i}"], "https://example.com/a.apk", "a")
+                               for i in range(12)))
+
+    asyncio.run(main())
+    assert _FakeVmosUtil.peak == 3
+    stats = scheduler.get_stats()["operations"]["install"]
+    assert stats["admitted"] == 12
+    assert stats["queued"] == 9
+    assert stats["in_flight"] == 0
+
+
+def test_start_app_and_click_go_through_scheduler(monkeypatch):
+    scheduler = _scheduler(monkeypatch, {"start": 1, "touch": 1})
+    monkeypatch.setattr(utils, "device_scheduler", scheduler)
+    monkeypatch.setattr(utils, "VmosUtil", _FakeVmosUtil)
+
+    async def main():
+        await asyncio.gather(utils.start_app(["PAD1"], "pkg"), utils.start_app(["PAD2"], "pkg"),
+                             utils.click(["PAD1"], []))
+
+    asyncio.run(main())
+    operations = scheduler.get_stats()["operations"]
+    assert operations["start"]["admitted"] == 2
+    assert operations["start"]["queued"] == 1
+    assert operations["touch"]["admitted"] == 1
+
+
+def test_recovery_runs_before_routine_when_queued(monkeypatch):
+    monkeypatch.setattr(config.DEVICE_SCHEDULER, "priority_step", 30)
+    scheduler = _scheduler(monkeypatch, {"replace": 1})
+    order = []
+
+    async def send(name):
+        order.append(name)
+        await asyncio.sleep(0.01)
+
+    async def run(name, priority):
+        with operation_priority(priority):
+            await scheduler.run("/vcpcloud/api/padApi/replacePad", lambda: send(name))
+
+    async def main():
+        first = asyncio.create_task(run("first", PRIORITY_ROUTINE))
+        await asyncio.sleep(0)
+        routine = asyncio.create_task(run("routine", PRIORITY_ROUTINE))
+        await asyncio.sleep(0)
+        recovery = asyncio.create_task(run("recovery", PRIORITY_RECOVERY))
+        await asyncio.gather(first, routine, recovery)
+
+    asyncio.run(main())
+    assert order == ["first", "recovery", "routine"]
+
+
+def test_scheduler_limits_coalesced_batches_not_pads(monkeypatch):
+    scheduler = _scheduler(monkeypatch, {"root": 2})
+    monkeypatch.setattr(coalescer_module, "device_scheduler", scheduler)
+    monkeypatch.setattr(coalescer_module, "VmosUtil", _FakeVmosUtil)
+    monkeypatch.setattr(utils, "pad_coalescer", coalescer_module.PadRequestCoalescer(window_ms=20, max_batch_size=50))
+    _FakeVmosUtil.peak = _FakeVmosUtil.in_flight = 0
+    _FakeVmosUtil.batch_sizes = []
+
+    async def main():
+        return await asyncio.gather(*(utils.open_root([f"PAD{i}"], "pkg") for i in range(200)))
+
+    results = asyncio.run(main())
+    # 每个批次占一个名额，批次大小不受在途上限限制
+    assert _FakeVmosUtil.batch_sizes == [50, 50, 50, 50]
+    assert _FakeVmosUtil.peak == 2
+    assert scheduler.get_stats()["operations"]["root"]["admitted"] == 4
+    assert [result["data"][0]["padCode"] for result in results] == [f"PAD{i}" for i in range(200)]
+
+
+def test_coalesced_batch_uses_highest_waiter_priority(monkeypatch):
+    scheduler = _scheduler(monkeypatch, {"replace": 1})
+    monkeypatch.setattr(coalescer_module, "device_scheduler", scheduler)
+    monkeypatch.setattr(coalescer_module, "VmosUtil", _FakeVmosUtil)
+    coalescer = coalescer_module.PadRequestCoalescer(window_ms=20, max_batch_size=50)
+    url = "/vcpcloud/api/padApi/replacePad"
+
+    async def submit(pad_code, priority):
+        with operation_priority(priority):
+            return await coalescer.submit(url, {"realPhoneTemplateId": 1}, pad_code)
+
+    async def main():
+        await asyncio.gather(submit("PAD1", PRIORITY_ROUTINE), submit("PAD2", PRIORITY_RECOVERY))
+
+    asyncio.run(main())
+    assert scheduler.get_stats()["operations"]["replace"]["by_priority"] == {PRIORITY_RECOVERY: 1}
+
+
+def test_read_only_paths_are_not_queued():
+    assert "/vcpcloud/api/padApi/padTaskDetail" not in scheduler_module.DEVICE_OPERATIONS
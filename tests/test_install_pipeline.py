@@ -0,0 +1,21 @@
+import asyncio
+
+from app.services import install_pipeline
+
+
+def test_unknown_install_status_keeps_waiting(monkeypatch):
+    details = iter([{"taskStatus": 1}, {"taskStatus": None}, {"taskStatus": 9}, {"taskStatus": 3}])
+    statuses = []
+
+    async def wait(task_id, known_status=None, max_wait=10):
+        return next(details)
+
+    async def queue_cloud_status(pad_code, current_status=None, **counters):
+        statuses.append(current_status)
+
+    monkeypatch.setattr(install_pipeline.task_status_poller, "wait", wait)
+    monkeypatch.setattr(install_pipeline, "queue_cloud_status", queue_cloud_status)
+
+    # 未知状态不抛出 ValueError（否则会取消同组中其他应用的等待），任务完成后返回成功
+    assert asyncio.run(install_pipeline._watch_install("PAD1", "gms", 42))
+    assert statuses[-1] == "安装成功: gms"
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from app.config import config
+from app.services.pad_actor import PadActorSystem
+
+
+def _system(monkeypatch, idle_seconds=0.05):
+    monkeypatch.setattr(config.PAD_ACTOR, "idle_seconds", idle_seconds)
+    return PadActorSystem()
+
+
+def test_events_for_one_pad_run_in_order_and_pads_run_concurrently(monkeypatch):
+    actors = _system(monkeypatch)
+    log = []
+    running = {"count": 0, "peak": 0}
+
+    def handler(pad_code, i):
+        async def handle():
+            running["count"] += 1
+            running["peak"] = max(running["peak"], running["count"])
+            await asyncio.sleep(0.01)
+            log.append((pad_code, i))
+            running["count"] -= 1
+        return handle
+
+    async def main():
+        for i in range(5):
+            for pad_code in ("PAD1", "PAD2", "PAD3"):
+                await actors.tell(pad_code, "callback", handler(pad_code, i))
+        # ask 排在同一云机之前的事件之后
+        await asyncio.gather(*(actors.ask(pad_code, "status", handler(pad_code, 5))
+                               for pad_code in ("PAD1", "PAD2", "PAD3")))
+
+    asyncio.run(main())
+    for pad_code in ("PAD1", "PAD2", "PAD3"):
+        assert [i for code, i in log if code == pad_code] == [0, 1, 2, 3, 4, 5]
+    assert running["peak"] == 3
+    assert actors.get_stats()["kinds"]["callback"]["processed"] == 15
+
+
+def test_ask_returns_result_and_handler_errors_do_not_stop_the_actor(monkeypatch):
+    actors = _system(monkeypatch)
+
+    async def broken():
+        raise ValueError("处理失败")
+
+    async def ok():
+        return "ok"
+
+    async def main():
+        with pytest.raises(ValueError):
+            await actors.ask("PAD1", "status", broken)
+        return await actors.ask("PAD1", "status", ok)
+
+    assert asyncio.run(main()) == "ok"
+    assert actors.get_stats()["kinds"]["status"]["errors"] == 1
+
+
+def test_idle_actor_retires_only_after_spawned_children_finish(monkeypatch):
+    actors = _system(monkeypatch)
+
+    async def main():
+        child = actors.spawn("PAD1", asyncio.sleep(0.2))
+        await asyncio.sleep(0.1)
+        # 子任务未结束，处理器不退出
+        assert actors.get_stats()["actors"] == 1
+        await child
+        await asyncio.sleep(0.15)
+        assert actors.get_stats()["actors"] == 0
+        # 退出后新的事件创建新的处理器
+        assert await actors.ask("PAD1", "status", lambda: asyncio.sleep(0, "again")) == "again"
+        stats = actors.get_stats()
+        assert stats["created"] == 2
+        assert stats["retired"] == 1
+
+    asyncio.run(main())
+
+
+def test_stop_cancels_children_and_drops_queued_events(monkeypatch):
+    actors = _system(monkeypatch)
+    ran = []
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    async def record():
+        ran.append("queued")
+
+    async def main():
+        child = actors.spawn("PAD1", asyncio.sleep(10))
+        current = asyncio.ensure_future(actors.ask("PAD1", "status", slow))
+        queued = asyncio.ensure_future(actors.ask("PAD1", "status", record))
+        await asyncio.sleep(0.05)
+
+        # 云机交给其他 worker：正在处理的、排队中的事件和派生任务都不再继续
+        assert await actors.stop("PAD1") == 1
+        assert child.cancelled() and current.cancelled() and queued.cancelled()
+        stats = actors.get_stats()
+        assert stats["actors"] == 0 and stats["retired"] == 1
+
+    asyncio.run(main())
+    assert ran == []
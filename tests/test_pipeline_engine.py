@@ -0,0 +1,69 @@
+import asyncio
+
+from app.services.pipeline_engine import PipelineEngine, PipelineRun, StateSpec
+
+
+def _run(engine: PipelineEngine) -> tuple:
+    run = PipelineRun(pad_code="PAD1", task_manager=None)
+    visited = []
+    engine.add_hook(lambda event, _run, state, _elapsed: visited.append((event, state)))
+    last = asyncio.run(engine.run(run))
+    return last, run, visited
+
+
+async def _done(run):
+    return None
+
+
+def test_state_timeout_moves_to_on_timeout():
+    async def slow(run):
+        await asyncio.sleep(5)
+        return "done"
+
+    engine = PipelineEngine("test", {
+        "wait": StateSpec(slow, timeout=0.05, on_timeout="recycle", max_attempts=3),
+        "recycle": StateSpec(_done),
+        "done": StateSpec(_done),
+    }, initial="wait")
+
+    last, run, visited = _run(engine)
+    assert last == "recycle"
+    assert ("timeout", "wait") in visited
+    assert run.attempts["wait"] == 1
+    assert engine.get_stats()["states"]["wait"]["timeouts"] == 1
+
+
+def test_handler_timeout_without_state_timeout_is_retried_then_exhausted():
+    async def flaky(run):
+        raise TimeoutError("云端调用超时")
+
+    engine = PipelineEngine("test", {
+        "submit": StateSpec(flaky, max_attempts=3, on_timeout="done", on_exhausted="recycle"),
+        "recycle": StateSpec(_done),
+        "done": StateSpec(_done),
+    }, initial="submit")
+
+    last, run, visited = _run(engine)
+    assert last == "recycle"
+    assert run.attempts["submit"] == 3
+    assert visited.count(("error", "submit")) == 3
+    assert ("exhausted", "submit") in visited
+    assert ("timeout", "submit") not in visited
+
+
+def test_handler_timeout_inside_timed_state_is_an_error_not_a_state_timeout():
+    async def flaky(run):
+        if run.attempts["submit"] == 1:
+            raise TimeoutError("单次调用超时")
+        return "done"
+
+    engine = PipelineEngine("test", {
+        "submit": StateSpec(flaky, timeout=5, max_attempts=2, on_timeout="recycle", on_exhausted="recycle"),
+        "recycle": StateSpec(_done),
+        "done": StateSpec(_done),
+    }, initial="submit")
+
+    last, run, visited = _run(engine)
+    assert last == "done"
+    assert visited.count(("error", "submit")) == 1
+    assert engine.get_stats()["states"]["submit"]["timeouts"] == 0
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from app.services import request_coalescer as coalescer_module
+from app.services.request_coalescer import PadRequestCoalescer
+
+TIMEZONE_URL = "/vcpcloud/api/padApi/updateTimeZone"
+
+
+class _FakeVmosUtil:
+    """记录每次批量请求的 padCodes，按云机返回各自的结果"""
+    batches = []
+    fail = False
+
+    def __init__(self, url, body):
+        self.url = url
+        self.body = body
+
+    async def send(self):
+        _FakeVmosUtil.batches.append((self.url, self.body))
+        if _FakeVmosUtil.fail:
+            raise ConnectionError("云端不可用")
+        return {"code": 200, "msg": "success",
+                "data": [{"padCode": pad_code, "taskId": i} for i, pad_code in enumerate(self.body["padCodes"])]}
+
+
+@pytest.fixture(autouse=True)
+def fake_vmos(monkeypatch):
+    _FakeVmosUtil.batches = []
+    _FakeVmosUtil.fail = False
+    monkeypatch.setattr(coalescer_module, "VmosUtil", _FakeVmosUtil)
+
+
+def test_requests_are_split_into_batches_of_max_size():
+    coalescer = PadRequestCoalescer(window_ms=20, max_batch_size=8)
+    params = {"timeZone": "Asia/Tokyo"}
+
+    async def main():
+        return await asyncio.gather(*(coalescer.submit(TIMEZONE_URL, params, f"PAD{i}") for i in range(20)))
+
+    results = asyncio.run(main())
+    assert [len(body["padCodes"]) for _, body in _FakeVmosUtil.batches] == [8, 8, 4]
+    # 每台云机只拿到自己的结果
+    for i, result in enumerate(results):
+        assert [item["padCode"] for item in result["data"]] == [f"PAD{i}"]
+    assert coalescer.get_stats()["coalesce_ratio"] == round(20 / 3, 2)
+
+
+def test_different_params_are_not_merged():
+    coalescer = PadRequestCoalescer(window_ms=20, max_batch_size=8)
+
+    async def main():
+        await asyncio.gather(coalescer.submit(TIMEZONE_URL, {"timeZone": "Asia/Tokyo"}, "PAD1"),
+                             coalescer.submit(TIMEZONE_URL, {"timeZone": "Europe/Paris"}, "PAD2"),
+                             coalescer.submit(TIMEZONE_URL, {"timeZone": "Asia/Tokyo"}, "PAD3"))
+
+    asyncio.run(main())
+    assert sorted(body["padCodes"] for _, body in _FakeVmosUtil.batches) == [["PAD1", "PAD3"], ["PAD2"]]
+
+
+def test_batch_failure_is_raised_to_every_waiter():
+    _FakeVmosUtil.fail = True
+    coalescer = PadRequestCoalescer(window_ms=20, max_batch_size=8)
+
+    async def main():
+        return await asyncio.gather(*(coalescer.submit(TIMEZONE_URL, {}, f"PAD{i}") for i in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert coalescer.get_stats()["failed_batches"] == 1
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from app.config import config
+from app.services.resilience import VmosResilience, VmosResponseError, VmosApiError
+
+READ_PATH = "/vcpcloud/api/padApi/padTaskDetail"
+MUTATION_PATH = "/vcpcloud/api/padApi/startApp"
+
+
+def _resilience(monkeypatch):
+    monkeypatch.setattr(config.RESILIENCE, "max_attempts", 3)
+    monkeypatch.setattr(config.RESILIENCE, "base_delay", 0)
+    monkeypatch.setattr(config.RESILIENCE, "failure_threshold", 100)
+    monkeypatch.setattr(config.RESILIENCE, "call_budget", 0)
+    return VmosResilience()
+
+
+def _sender(responses):
+    calls = []
+
+    async def send_once():
+        calls.append(1)
+        return responses[min(len(calls) - 1, len(responses) - 1)]
+
+    return send_once, calls
+
+
+def test_server_error_raises_after_last_retry(monkeypatch):
+    resilience = _resilience(monkeypatch)
+    send_once, calls = _sender([{"code": 500, "msg": "busy"}])
+
+    with pytest.raises(VmosResponseError) as excinfo:
+        asyncio.run(resilience.execute(READ_PATH, send_once))
+    assert len(calls) == resilience.get_policy(READ_PATH).max_attempts
+    assert excinfo.value.result == {"code": 500, "msg": "busy"}
+    assert isinstance(excinfo.value, VmosApiError)
+    assert resilience.get_stats()["exhausted"] == {READ_PATH: 1}
+
+
+def test_malformed_mutation_response_raises_without_retry(monkeypatch):
+    resilience = _resilience(monkeypatch)
+    send_once, calls = _sender(["<html>bad gateway</html>"])
+
+    with pytest.raises(VmosResponseError):
+        asyncio.run(resilience.execute(MUTATION_PATH, send_once))
+    assert len(calls) == 1
+
+
+def test_retry_recovers_from_transient_server_error(monkeypatch):
+    resilience = _resilience(monkeypatch)
+    send_once, calls = _sender([{"code": 503}, {"code": 200, "data": []}])
+
+    assert asyncio.run(resilience.execute(READ_PATH, send_once)) == {"code": 200, "data": []}
+    assert len(calls) == 2
@@ -0,0 +1,151 @@
+import asyncio
+
+from app.config import config
+from app.services import sharding as sharding_module
+from app.services.sharding import HashRing, PadShardCoordinator
+
+PADS = [f"PAD{i:04d}" for i in range(2000)]
+
+
+def test_ring_spreads_pads_and_moves_only_the_new_members_share():
+    before = HashRing(["w1", "w2", "w3"], 64)
+    after = HashRing(["w1", "w2", "w3", "w4"], 64)
+
+    counts = {}
+    for pad_code in PADS:
+        counts[before.owner(pad_code)] = counts.get(before.owner(pad_code), 0) + 1
+    assert all(count > len(PADS) / 3 * 0.7 for count in counts.values())
+
+    moved = [pad_code for pad_code in PADS if before.owner(pad_code) != after.owner(pad_code)]
+    # 只有划给新 worker 的云机换了归属
+    assert all(after.owner(pad_code) == "w4" for pad_code in moved)
+    assert len(PADS) * 0.15 < len(moved) < len(PADS) * 0.35
+
+
+def test_empty_ring_has_no_owner():
+    assert HashRing([], 16).owner("PAD1") is None
+
+
+def _coordinator(monkeypatch, holder):
+    monkeypatch.setattr(config.SHARDING, "enabled", True)
+    monkeypatch.setattr(config.SHARDING, "worker_id", "w1")
+    monkeypatch.setattr(config, "PAD_CODES", ["PAD1", "PAD2"])
+    coordinator = PadShardCoordinator()
+    coordinator._ring = HashRing(["w1", "w2"], 64)
+    published = []
+    handled = []
+
+    async def lock_holder(key, ttl_seconds):
+        return holder() if callable(holder) else holder
+
+    async def publish(channel, payload):
+        published.append(channel)
+
+    async def handler(data):
+        handled.append(data)
+
+    monkeypatch.setattr(sharding_module, "get_lock_holder", lock_holder)
+    monkeypatch.setattr(coordinator, "_publish", publish)
+    coordinator.register_forward("callback", handler)
+    return coordinator, published, handled
+
+
+def test_owns_only_pads_whose_lock_is_held(monkeypatch):
+    coordinator, _, _ = _coordinator(monkeypatch, None)
+    ring_owned = next(pad_code for pad_code in ("PAD1", "PAD2") if coordinator._ring.owner(pad_code) == "w1")
+    # 哈希环已划给本 worker，但原负责 worker 尚未释放锁
+    assert not coordinator.owns(ring_owned)
+    coordinator._owned.add(ring_owned)
+    assert coordinator.owns(ring_owned)
+    # 不在管理列表中的云机任何 worker 都可处理
+    assert coordinator.owns("OTHER")
+
+
+def test_forward_goes_to_lock_holder_not_ring_owner(monkeypatch):
+    coordinator, published, handled = _coordinator(monkeypatch, "w3")
+
+    asyncio.run(coordinator.forward("PAD1", "callback", {"padCode": "PAD1"}))
+    assert published == [coordinator.channel_for("w3")]
+    assert handled == []
+
+
+def test_forward_waits_for_new_holder_during_handover(monkeypatch):
+    holders = iter([None, None, "w2"])
+    coordinator, published, handled = _coordinator(monkeypatch, lambda: next(holders))
+    monkeypatch.setattr(sharding_module, "FORWARD_RETRY_SECONDS", 0.01)
+
+    assert asyncio.run(coordinator.forward("PAD1", "callback", {"padCode": "PAD1"}))
+    assert published == [coordinator.channel_for("w2")]
+    assert handled == []
+
+
+def test_forward_without_holder_is_not_handled_locally(monkeypatch):
+    coordinator, published, handled = _coordinator(monkeypatch, None)
+    coordinator._heartbeat_seconds = 0.05
+    monkeypatch.setattr(sharding_module, "FORWARD_RETRY_SECONDS", 0.01)
+    pad_code = next(pad_code for pad_code in PADS if coordinator._ring.owner(pad_code) == "w1")
+
+    # 哈希环划给本 worker 但尚未取得锁，超时后放弃而不是在本地处理
+    assert not asyncio.run(coordinator.forward(pad_code, "callback", {"padCode": pad_code}))
+    assert published == [] and handled == []
+    assert coordinator.get_stats()["undeliverable"] == 1
+
+
+def test_forward_to_self_is_handled_locally(monkeypatch):
+    coordinator, published, handled = _coordinator(monkeypatch, "w1")
+    coordinator._owned.add("PAD1")
+
+    assert asyncio.run(coordinator.forward("PAD1", "callback", {"padCode": "PAD1"}))
+    assert published == []
+    assert handled == [{"padCode": "PAD1"}]
+
+
+def test_lock_keys_are_64_bit():
+    keys = {sharding_module._lock_key("ns", pad_code) for pad_code in PADS}
+    assert len(keys) == len(PADS)
+    assert all(-2 ** 63 <= key < 2 ** 63 for key in keys)
+    assert any(abs(key) >= 2 ** 32 for key in keys)
+
+
+def _leader_mode(monkeypatch):
+    from app.services.leader import LeaderElector
+
+    monkeypatch.setattr(config.SHARDING, "enabled", False)
+    monkeypatch.setattr(config.LEADER_ELECTION, "enabled", False)
+    monkeypatch.setattr(config, "PAD_CODES", ["PAD1", "PAD2"])
+    leader = LeaderElector()
+    monkeypatch.setattr(sharding_module, "leader_elector", leader)
+    return PadShardCoordinator(), leader
+
+
+def test_without_sharding_the_leader_owns_every_pad(monkeypatch):
+    coordinator, leader = _leader_mode(monkeypatch)
+    acquired, released, handled = [], [], []
+
+    async def on_acquired(pad_codes):
+        acquired.extend(pad_codes)
+
+    async def on_released(pad_codes):
+        released.extend(pad_codes)
+
+    async def handler(data):
+        handled.append(data)
+
+    coordinator.on_acquired(on_acquired)
+    coordinator.on_released(on_released)
+    coordinator.register_forward("status", handler)
+
+    async def main():
+        await coordinator.start()
+        assert leader.is_leader
+        assert coordinator.owns("PAD1") and coordinator.owns("PAD2")
+        # 主节点直接处理转交的消息
+        await coordinator.forward("PAD1", "status", {"pad_code": "PAD1"})
+        # 主节点锁连接断开后停止全部云机的编排
+        await leader._demote()
+        assert not coordinator.owns("PAD1")
+
+    asyncio.run(main())
+    assert acquired == ["PAD1", "PAD2"]
+    assert released == ["PAD1", "PAD2"]
+    assert handled == [{"pad_code": "PAD1"}]
@@ -0,0 +1,159 @@
+import asyncio
+
+from sqlalchemy.dialects import postgresql
+
+from app.services import status_buffer as buffer_module
+from app.services.status_buffer import PendingStatus, StatusWriteBuffer
+from app.services.websocket_manager import ws_manager
+
+
+class _FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self._rows
+
+
+class _FakeSession:
+    """记录执行的语句，返回给定的 RETURNING 结果"""
+
+    def __init__(self, statements, rows):
+        self._statements = statements
+        self._rows = rows
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, stmt):
+        self._statements.append(stmt)
+        return _FakeResult(self._rows)
+
+    async def commit(self):
+        pass
+
+
+def _buffer(monkeypatch, write=None):
+    async def send_status_update():
+        pass
+
+    monkeypatch.setattr(ws_manager, "send_status_update", send_status_update)
+    buffer = StatusWriteBuffer()
+    batches = []
+
+    async def record(batch):
+        batches.append(batch)
+        return set(batch)
+
+    buffer._write = write or record
+    return buffer, batches
+
+
+def test_updates_for_one_pad_are_coalesced_into_one_row(monkeypatch):
+    buffer, batches = _buffer(monkeypatch)
+    buffer.submit("PAD1", PendingStatus(current_status="安装中", counters={"num_of_error": 1}))
+    buffer.submit("PAD1", PendingStatus(temple_id=7, counters={"num_of_error": 2, "number_of_run": 1}))
+    buffer.submit("PAD1", PendingStatus(current_status="安装成功"))
+    buffer.submit("PAD2", PendingStatus(counters={"num_of_success": 1}))
+
+    assert asyncio.run(buffer.flush()) == 2
+    assert len(batches) == 1
+    pad1 = batches[0]["PAD1"]
+    assert pad1.current_status == "安装成功"
+    assert pad1.temple_id == 7
+    assert pad1.counters == {"num_of_error": 3, "number_of_run": 1}
+    stats = buffer.get_stats()
+    assert stats["submitted"] == 4
+    assert stats["rows_written"] == 2
+    assert stats["coalesce_ratio"] == 2.0
+
+
+def test_failed_write_is_merged_with_newer_updates_and_retried(monkeypatch):
+    attempts = []
+
+    async def flaky(batch):
+        attempts.append({pad_code: (pending.current_status, dict(pending.counters))
+                         for pad_code, pending in batch.items()})
+        if len(attempts) == 1:
+            raise ConnectionError("数据库不可用")
+        return set(batch)
+
+    buffer, _ = _buffer(monkeypatch, flaky)
+    buffer.submit("PAD1", PendingStatus(current_status="安装中", counters={"forward_num": 1}))
+
+    async def main():
+        assert await buffer.flush() == 0
+        buffer.submit("PAD1", PendingStatus(current_status="安装成功", counters={"forward_num": 2}))
+        assert await buffer.flush() == 1
+
+    asyncio.run(main())
+    assert attempts[1] == {"PAD1": ("安装成功", {"forward_num": 3})}
+    assert buffer.get_stats()["failures"] == 1
+    assert buffer.get_stats()["pending_pads"] == 0
+
+
+def test_take_waits_for_the_batch_being_written(monkeypatch):
+    gate = asyncio.Event()
+    order = []
+
+    async def slow(batch):
+        order.append("write-start")
+        await gate.wait()
+        order.append("write-done")
+        return set(batch)
+
+    buffer, _ = _buffer(monkeypatch, slow)
+
+    async def main():
+        buffer.submit("PAD1", PendingStatus(counters={"num_of_success": 1}))
+        flushing = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0)
+        # 批次写入中登记的更新不属于该批次
+        buffer.submit("PAD1", PendingStatus(counters={"num_of_success": 5}))
+        taking = asyncio.create_task(buffer.take("PAD1"))
+        await asyncio.sleep(0.01)
+        assert not taking.done()
+        gate.set()
+        await flushing
+        pending = await taking
+        order.append("taken")
+        return pending
+
+    pending = asyncio.run(main())
+    assert order == ["write-start", "write-done", "taken"]
+    assert pending.counters == {"num_of_success": 5}
+
+
+def test_reaching_max_pads_wakes_the_flusher(monkeypatch):
+    buffer, _ = _buffer(monkeypatch)
+    buffer._max_pads = 3
+    for i in range(2):
+        buffer.submit(f"PAD{i}", PendingStatus(current_status="运行中"))
+    assert not buffer._wake.is_set()
+    buffer.submit("PAD2", PendingStatus(current_status="运行中"))
+    assert buffer._wake.is_set()
+
+
+def test_write_is_one_update_from_values_with_counter_increments(monkeypatch):
+    statements = []
+    monkeypatch.setattr(buffer_module, "SessionLocal", lambda: _FakeSession(statements, ["PAD1"]))
+
+    written = asyncio.run(StatusWriteBuffer._write({
+        "PAD1": PendingStatus(current_status="安装成功", counters={"num_of_success": 2}),
+        "PAD2": PendingStatus(counters={"num_of_error": 1}),
+    }))
+
+    assert written == {"PAD1"}
+    assert len(statements) == 1
+    sql = str(statements[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("UPDATE cloud_status SET")
+    assert "FROM (VALUES" in sql
+    assert "num_of_success=(cloud_status.num_of_success + pending.num_of_success)" in sql
+    assert "coalesce(CAST(pending.current_status AS VARCHAR), cloud_status.current_status)" in sql
+    assert "RETURNING cloud_status.pad_code" in sql
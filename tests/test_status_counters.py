@@ -0,0 +1,120 @@
+import asyncio
+import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from app.curd import status as status_module
+from app.services.status_buffer import PendingStatus, StatusWriteBuffer
+from app.services.websocket_manager import ws_manager
+
+
+class _FakeResult:
+    def __init__(self, row):
+        self._row = row
+
+    def mappings(self):
+        return self
+
+    def first(self):
+        return self._row
+
+
+class _FakeSession:
+    def __init__(self, statements, row, fail=False):
+        self._statements = statements
+        self._row = row
+        self._fail = fail
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, stmt):
+        self._statements.append(stmt)
+        if self._fail:
+            raise ConnectionError("数据库不可用")
+        return _FakeResult(self._row)
+
+    async def commit(self):
+        pass
+
+
+def _row(**values):
+    now = datetime.datetime.now()
+    row = {"old_status": "安装中", "id": 1, "pad_code": "PAD1", "current_status": "安装中", "number_of_run": 0,
+           "temple_id": None, "phone_number_counts": 0, "country": "US", "updated_at": now, "created_at": now,
+           "num_of_success": 0}
+    row.update(values)
+    return row
+
+
+def _setup(monkeypatch, row, fail=False):
+    statements = []
+    notified = []
+
+    async def notify_status_change(pad_code, current_status):
+        notified.append((pad_code, current_status))
+
+    async def send_status_update():
+        notified.append("all")
+
+    monkeypatch.setattr(ws_manager, "notify_status_change", notify_status_change)
+    monkeypatch.setattr(ws_manager, "send_status_update", send_status_update)
+    monkeypatch.setattr(status_module, "SessionLocal", lambda: _FakeSession(statements, row, fail))
+    buffer = StatusWriteBuffer()
+    monkeypatch.setattr(status_module, "status_buffer", buffer)
+    return statements, notified, buffer
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_counters_and_status_are_applied_in_one_atomic_update(monkeypatch):
+    statements, notified, _ = _setup(monkeypatch, _row(current_status="安装成功", num_of_success=4))
+
+    result = asyncio.run(status_module.update_cloud_status("PAD1", current_status="安装成功", num_of_success=1))
+
+    assert len(statements) == 1
+    sql = _sql(statements[0])
+    assert sql.startswith("UPDATE cloud_status SET")
+    assert "num_of_success=(cloud_status.num_of_success + 1)" in sql
+    assert "current_status='安装成功'" in sql
+    assert "FOR UPDATE" in sql
+    assert "RETURNING" in sql
+    assert result.num_of_success == 4
+    assert notified == [("PAD1", "安装成功")]
+
+
+def test_buffered_increments_are_folded_into_the_direct_update(monkeypatch):
+    statements, _, buffer = _setup(monkeypatch, _row())
+    buffer.submit("PAD1", PendingStatus(current_status="安装中", counters={"num_of_success": 2, "number_of_run": 1}))
+
+    asyncio.run(status_module.update_cloud_status("PAD1", num_of_success=1))
+
+    sql = _sql(statements[0])
+    assert "num_of_success=(cloud_status.num_of_success + 3)" in sql
+    assert "number_of_run=(cloud_status.number_of_run + 1)" in sql
+    assert buffer.get_stats()["pending_pads"] == 0
+
+
+def test_failed_update_returns_taken_increments_to_the_buffer(monkeypatch):
+    _, _, buffer = _setup(monkeypatch, None, fail=True)
+    buffer.submit("PAD1", PendingStatus(counters={"forward_num": 2}))
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(status_module.update_cloud_status("PAD1", forward_num=1))
+
+    assert asyncio.run(buffer.take("PAD1")).counters == {"forward_num": 2}
+
+
+def test_missing_pad_is_a_404(monkeypatch):
+    _setup(monkeypatch, None)
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(status_module.update_cloud_status("PAD1", num_of_error=1))
+    assert excinfo.value.status_code == 404
@@ -0,0 +1,60 @@
+"""update_cloud_status 并发累加计数（需要可连接的 Postgres，未配置 DATABASE_URL 或无法连接时跳过）
+
+使用 BENCH- 开头的云机状态行，结束后删除。
+"""
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.curd.status import update_cloud_status
+from app.services.database import SessionLocal, Status, engine, Base
+from tests.bench_status_update import _reset
+
+pytestmark = pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="未配置 DATABASE_URL")
+
+PADS = [f"BENCH-PG-{i:02d}" for i in range(5)]
+UPDATES_PER_PAD = 100
+CONCURRENCY = 10
+
+
+async def _create_tables() -> None:
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    except (OSError, SQLAlchemyError) as e:
+        await engine.dispose()
+        pytest.skip(f"数据库不可用: {e}")
+
+
+async def _cleanup() -> None:
+    async with SessionLocal() as db:
+        await db.execute(delete(Status).filter(Status.pad_code.in_(PADS)))
+        await db.commit()
+    await engine.dispose()
+
+
+def test_concurrent_increments_are_not_lost():
+    async def main():
+        await _create_tables()
+        try:
+            await _reset(PADS)
+            semaphore = asyncio.Semaphore(CONCURRENCY)
+
+            async def one(i: int):
+                async with semaphore:
+                    # 每台云机交替带上错误计数：100 次成功、50 次错误
+                    await update_cloud_status(PADS[i % len(PADS)], num_of_success=1,
+                                              num_of_error=1 if i // len(PADS) % 2 else None)
+
+            await asyncio.gather(*(one(i) for i in range(len(PADS) * UPDATES_PER_PAD)))
+            for pad_code in PADS:
+                row = await update_cloud_status(pad_code)
+                assert row.num_of_success == UPDATES_PER_PAD
+                assert row.num_of_error == UPDATES_PER_PAD // 2
+        finally:
+            await _cleanup()
+
+    asyncio.run(main())
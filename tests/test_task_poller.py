@@ -0,0 +1,65 @@
+import asyncio
+
+from app.services import task_poller as poller_module
+from app.services.task_poller import TaskStatusPoller
+
+
+def _poller(monkeypatch, statuses, safety_interval=30.0):
+    """每次查询依次返回 statuses 中的任务状态，不发送回调"""
+    calls = []
+
+    async def fake_task_info(task_ids):
+        calls.append(list(task_ids))
+        status = statuses[min(len(calls) - 1, len(statuses) - 1)]
+        return {"code": 200, "data": [{"taskId": task_id, "padCode": "PAD1", "taskStatus": status, "errorMsg": ""}
+                                      for task_id in task_ids]}
+
+    monkeypatch.setattr(poller_module, "get_cloud_file_task_info", fake_task_info)
+    poller = TaskStatusPoller()
+    poller._min_interval = 0.01
+    poller._callbacks_enabled = True
+    poller._safety_interval = safety_interval
+    return poller, calls
+
+
+def test_wait_outcome_polls_before_giving_up_on_lost_callback(monkeypatch):
+    # 首次查询为执行中，下一次兜底轮询在 30 秒后，窗口只有 0.2 秒
+    poller, calls = _poller(monkeypatch, [2, 3])
+
+    detail = asyncio.run(poller.wait_outcome(1001, 0.2))
+    assert detail["taskStatus"] == 3
+    assert len(calls) == 2
+    assert poller.get_stats()["watched_tasks"] == 0
+
+
+def test_wait_outcome_returns_on_callback_without_extra_poll(monkeypatch):
+    poller, calls = _poller(monkeypatch, [2])
+
+    async def main():
+        waiting = asyncio.create_task(poller.wait_outcome(1002, 5))
+        await asyncio.sleep(0.1)
+        assert poller.resolve_from_callback({"taskId": 1002, "taskStatus": 3, "padCode": "PAD1"})
+        return await waiting
+
+    detail = asyncio.run(main())
+    assert detail["taskStatus"] == 3
+    assert len(calls) == 1
+
+
+def test_due_tasks_are_polled_in_batches(monkeypatch):
+    poller, calls = _poller(monkeypatch, [3])
+    poller._batch_size = 8
+
+    async def main():
+        return await asyncio.gather(*(poller.wait_outcome(task_id, 1) for task_id in range(20)))
+
+    details = asyncio.run(main())
+    assert all(detail["taskStatus"] == 3 for detail in details)
+    assert sorted(len(batch) for batch in calls) == [4, 8, 8]
+
+
+def test_poll_sends_original_task_id_type(monkeypatch):
+    poller, calls = _poller(monkeypatch, [3])
+
+    asyncio.run(poller.wait_outcome(1003, 1))
+    assert calls[0] == [1003]
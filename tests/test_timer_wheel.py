@@ -0,0 +1,99 @@
+import asyncio
+
+from app.services.timer_wheel import HierarchicalTimerWheel
+
+
+def _wheel() -> HierarchicalTimerWheel:
+    # 4 格 × 3 层，0.01 秒一个 tick：4 个 tick 以上进入第 1 层，16 个以上进入第 2 层
+    return HierarchicalTimerWheel(tick=0.01, slots=4, levels=3)
+
+
+def test_timers_on_higher_levels_cascade_and_fire_in_order():
+    wheel = _wheel()
+    fired = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        expected = {}
+        for key, delay in (("l0", 0.02), ("l1", 0.1), ("l2", 0.3), ("beyond", 0.9)):
+            expected[key] = loop.time() + delay
+            wheel.schedule(key, delay, lambda key=key: fired.append((key, loop.time())))
+        assert wheel.get_stats()["levels_occupancy"] == [1, 1, 2]
+        await asyncio.sleep(1.1)
+        return expected
+
+    expected = asyncio.run(main())
+    assert [key for key, _ in fired] == ["l0", "l1", "l2", "beyond"]
+    for key, fired_at in fired:
+        # 不会提前到期，误差不超过几个 tick
+        assert expected[key] <= fired_at < expected[key] + 0.1
+    stats = wheel.get_stats()
+    assert stats["fired"] == 4
+    assert stats["cascaded"] > 0
+    assert stats["timers"] == 0
+
+
+def test_cancel_and_reschedule():
+    wheel = _wheel()
+    fired = []
+
+    async def main():
+        wheel.schedule("cancelled", 0.1, lambda: fired.append("cancelled"))
+        wheel.schedule("moved", 0.05, lambda: fired.append("moved"))
+        wheel.schedule("kept", 0.15, lambda: fired.append("kept"))
+        assert wheel.cancel("cancelled")
+        assert not wheel.cancel("cancelled")
+        assert "cancelled" not in wheel
+        assert wheel.reschedule("moved", 0.25)
+        await asyncio.sleep(0.2)
+        assert fired == ["kept"]
+        await asyncio.sleep(0.15)
+
+    asyncio.run(main())
+    assert fired == ["kept", "moved"]
+    stats = wheel.get_stats()
+    assert stats["cancelled"] == 1
+    assert stats["rescheduled"] == 1
+
+
+def test_coroutine_callbacks_run_and_errors_do_not_stop_the_wheel():
+    wheel = _wheel()
+    fired = []
+
+    async def on_timeout():
+        fired.append("async")
+
+    def broken():
+        raise RuntimeError("回调出错")
+
+    async def main():
+        wheel.schedule("broken", 0.02, broken)
+        wheel.schedule("async", 0.04, on_timeout)
+        await asyncio.sleep(0.15)
+
+    asyncio.run(main())
+    assert fired == ["async"]
+
+
+def test_driver_skips_empty_ticks_and_wakes_for_earlier_timers():
+    # 64 格，0.01 秒一个 tick：空闲时驱动任务最多每 0.64 秒醒来一次
+    wheel = HierarchicalTimerWheel(tick=0.01, slots=64, levels=3)
+    fired = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        wheel.schedule("late", 5, lambda: fired.append("late"))
+        await asyncio.sleep(0.3)
+        assert wheel.get_stats()["wakeups"] == 0
+
+        # 驱动任务正在睡眠，插入更早的定时器后提前醒来
+        expected = loop.time() + 0.05
+        wheel.schedule("early", 0.05, lambda: fired.append(loop.time()))
+        await asyncio.sleep(0.15)
+        wheel.cancel("late")
+        return expected
+
+    expected = asyncio.run(main())
+    assert len(fired) == 1
+    assert expected <= fired[0] < expected + 0.05
+    assert wheel.get_stats()["wakeups"] <= 2
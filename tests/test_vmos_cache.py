@@ -0,0 +1,96 @@
+import asyncio
+
+from app.config import config
+from app.services import vmos_cache as cache_module
+from app.services.vmos_cache import VmosReadCache
+
+PAD_INFO = "/vcpcloud/api/padApi/padInfo"
+PAD_LIST = "/vcpcloud/api/padApi/userPadList"
+
+
+def _cache(monkeypatch, max_entries):
+    monkeypatch.setattr(config.CACHE, "max_entries", max_entries)
+    return VmosReadCache()
+
+
+async def _ok():
+    return {"code": 200, "data": {}}
+
+
+def _read(cache, pad_code, ttl=60):
+    return cache.read_through(PAD_INFO, {"padCode": pad_code}, ttl=ttl, fetch=_ok, pad_codes=[pad_code])
+
+
+def test_lru_eviction_prunes_pad_index(monkeypatch):
+    cache = _cache(monkeypatch, 3)
+
+    async def main():
+        for i in range(10):
+            await _read(cache, f"PAD{i}")
+
+    asyncio.run(main())
+    assert len(cache._cache) == 3
+    assert set(cache._pad_keys) == {"PAD7", "PAD8", "PAD9"}
+    assert len(cache._key_pads) == 3
+
+
+def test_expiry_prunes_pad_and_global_index(monkeypatch):
+    cache = _cache(monkeypatch, 10)
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+
+    async def main():
+        await _read(cache, "PAD1", ttl=5)
+        await cache.read_through(PAD_LIST, {}, ttl=5, fetch=_ok)
+        now[0] += 10
+        await _read(cache, "PAD2", ttl=5)
+        # 过期条目在下次读取时移除
+        assert cache._cache.get(cache.make_key(PAD_INFO, {"padCode": "PAD1"})) is None
+        assert cache._cache.get(cache.make_key(PAD_LIST, {})) is None
+
+    asyncio.run(main())
+    assert set(cache._pad_keys) == {"PAD2"}
+    assert cache._global_keys == set()
+
+
+def test_invalidate_pads_removes_entries_and_index(monkeypatch):
+    cache = _cache(monkeypatch, 10)
+
+    async def main():
+        await _read(cache, "PAD1")
+        await _read(cache, "PAD2")
+        await cache.read_through(PAD_LIST, {}, ttl=60, fetch=_ok)
+        cache.invalidate_pads(["PAD1"])
+
+    asyncio.run(main())
+    assert set(cache._pad_keys) == {"PAD2"}
+    assert cache._global_keys == set()
+    assert len(cache._cache) == 1
+
+
+def test_fetch_started_before_invalidation_is_not_cached(monkeypatch):
+    cache = _cache(monkeypatch, 10)
+
+    async def main():
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def slow():
+            started.set()
+            await release.wait()
+            return {"code": 200, "data": {"template": "old"}}
+
+        stale_pad = asyncio.create_task(
+            cache.read_through(PAD_INFO, {"padCode": "PAD1"}, ttl=60, fetch=slow, pad_codes=["PAD1"]))
+        stale_list = asyncio.create_task(cache.read_through(PAD_LIST, {}, ttl=60, fetch=slow))
+        await started.wait()
+        # 查询进行中时云机被一键新机
+        cache.invalidate_pads(["PAD1"])
+        release.set()
+        assert (await stale_pad)["data"] == {"template": "old"}
+        await stale_list
+        await _read(cache, "PAD2")
+
+    asyncio.run(main())
+    assert set(cache._pad_keys) == {"PAD2"}
+    assert cache._global_keys == set()
+    assert cache.get_stats()["stale_discarded"] == 2
@@ -0,0 +1,42 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from app.services.resilience import VmosApiError
+from app.services.vmos_trace import VmosTraceReplayer
+
+PATH = "/vcpcloud/api/padApi/padTaskDetail"
+
+
+def _replayer(tmp_path, events):
+    trace = tmp_path / "trace.jsonl.gz"
+    with gzip.open(trace, "wt", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+    replayer = VmosTraceReplayer()
+    replayer.load(str(trace), speed=1000)
+    return replayer
+
+
+def _call(body, response):
+    return {"t": 0, "k": "call", "p": PATH, "b": body, "r": response, "l": 0}
+
+
+def test_fallback_only_returns_responses_recorded_for_the_same_pads(tmp_path):
+    replayer = _replayer(tmp_path, [
+        _call({"padCodes": ["PAD1"], "taskIds": [1]}, "PAD1"),
+        _call({"padCodes": ["PAD2"], "taskIds": [2]}, "PAD2"),
+    ])
+
+    async def main():
+        # 任务编号不同，退回到同一云机的记录，而不是同路径的第一条
+        assert await replayer.respond(PATH, {"padCodes": ["PAD2"], "taskIds": [9]}) == "PAD2"
+        with pytest.raises(VmosApiError):
+            await replayer.respond(PATH, {"padCodes": ["PAD3"], "taskIds": [1]})
+        assert await replayer.respond(PATH, {"padCodes": ["PAD1"], "taskIds": [1]}) == "PAD1"
+
+    asyncio.run(main())
+    stats = replayer.get_stats()
+    assert (stats["matched"], stats["fallback"], stats["missed"]) == (1, 1, 1)
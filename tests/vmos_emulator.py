@@ -0,0 +1,337 @@
+"""本地VMOS云端替身服务，用于离线压测
+
+模拟 app/dependencies/utils.py 用到的接口，任务状态按时间推进（待执行 -> 执行中 -> 完成/失败），
+并向服务的 /callback 发送对应回调（1124 一键新机、1003 应用安装、1000 重启、1007 应用启动）。
+
+运行:
+    python -m tests.vmos_emulator --pads 1000 --callback-url http://127.0.0.1:4000/callback
+然后在 .env 中设置 VMOS_BASE_URL=http://127.0.0.1:18000 启动服务。
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+API_PREFIX = "/vcpcloud/api/padApi"
+
+
+@dataclass
+class Scenario:
+    """可脚本化的模拟参数（时间单位：秒）"""
+    latency_mean: float = 0.08
+    latency_jitter: float = 0.04
+    pending_seconds: float = 2.0
+    replace_seconds: float = 60.0
+    install_seconds: float = 30.0
+    reboot_seconds: float = 20.0
+    start_app_seconds: float = 3.0
+    default_task_seconds: float = 2.0
+    failure_rate: float = 0.0
+    callback_delay: float = 0.05
+    android_version: str = "13"
+
+    def update(self, data: Dict[str, Any]) -> None:
+        for key, value in data.items():
+            if hasattr(self, key):
+                setattr(self, key, type(getattr(self, key))(value))
+
+
+@dataclass
+class EmulatedTask:
+    task_id: int
+    pad_code: str
+    business_type: int
+    created_at: float
+    pending_seconds: float
+    running_seconds: float
+    will_fail: bool
+    app_name: Optional[str] = None
+    app_md5: Optional[str] = None
+    package_name: Optional[str] = None
+
+    def status(self, now: float) -> int:
+        elapsed = now - self.created_at
+        if elapsed < self.pending_seconds:
+            return 1
+        if elapsed < self.pending_seconds + self.running_seconds:
+            return 2
+        return -1 if self.will_fail else 3
+
+
+@dataclass
+class EmulatedPad:
+    pad_code: str
+    apps: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+
+class VmosEmulator:
+    def __init__(self, pad_count: int, callback_url: Optional[str], scenario: Scenario):
+        self.scenario = scenario
+        self.callback_url = callback_url
+        self.pads: Dict[str, EmulatedPad] = {}
+        self.tasks: Dict[int, EmulatedTask] = {}
+        self._task_ids = itertools.count(100000)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._background: set = set()
+        self.request_counts: Dict[str, int] = {}
+        self.callbacks_sent = 0
+        self.callbacks_failed = 0
+        for i in range(pad_count):
+            pad_code = f"EMU{i:06d}"
+            self.pads[pad_code] = EmulatedPad(pad_code)
+
+    def _pad(self, pad_code: str) -> EmulatedPad:
+        if pad_code not in self.pads:
+            self.pads[pad_code] = EmulatedPad(pad_code)
+        return self.pads[pad_code]
+
+    @staticmethod
+    def ok(data: Any) -> web.Response:
+        return web.json_response({"code": 200, "msg": "success", "ts": int(time.time() * 1000), "data": data})
+
+    async def _latency(self) -> None:
+        delay = random.gauss(self.scenario.latency_mean, self.scenario.latency_jitter)
+        await asyncio.sleep(max(0.0, delay))
+
+    def _create_task(self, pad_code: str, business_type: int, running_seconds: float, **extra) -> EmulatedTask:
+        task = EmulatedTask(
+            task_id=next(self._task_ids),
+            pad_code=pad_code,
+            business_type=business_type,
+            created_at=time.monotonic(),
+            pending_seconds=self.scenario.pending_seconds,
+            running_seconds=running_seconds,
+            will_fail=random.random() < self.scenario.failure_rate,
+            **extra
+        )
+        self.tasks[task.task_id] = task
+        self._spawn(self._drive_task(task))
+        return task
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _drive_task(self, task: EmulatedTask) -> None:
+        """按时间推进任务状态并发送回调，与 padTaskDetail 的状态保持一致"""
+        running_at = task.created_at + task.pending_seconds
+        finished_at = running_at + task.running_seconds
+
+        await asyncio.sleep(max(0.0, running_at - time.monotonic()))
+        self._on_task_running(task)
+        await self._send_callback(task, 2)
+
+        await asyncio.sleep(max(0.0, finished_at - time.monotonic()))
+        final_status = -1 if task.will_fail else 3
+        self._on_task_finished(task, final_status)
+        await self._send_callback(task, final_status)
+
+    def _on_task_running(self, task: EmulatedTask) -> None:
+        if task.business_type == 1003 and task.app_md5:
+            self._pad(task.pad_code).apps[task.app_md5] = {
+                "appName": task.app_name,
+                "packageName": task.package_name,
+                "appState": 1
+            }
+
+    def _on_task_finished(self, task: EmulatedTask, final_status: int) -> None:
+        pad = self._pad(task.pad_code)
+        if task.business_type == 1124 and final_status == 3:
+            pad.apps.clear()
+        elif task.business_type == 1003 and task.app_md5:
+            if final_status == 3:
+                pad.apps[task.app_md5]["appState"] = 0
+            else:
+                pad.apps.pop(task.app_md5, None)
+
+    async def _send_callback(self, task: EmulatedTask, task_status: int) -> None:
+        if not self.callback_url or self._session is None:
+            return
+        payload: Dict[str, Any] = {
+            "taskBusinessType": task.business_type,
+            "padCode": task.pad_code,
+            "taskId": task.task_id,
+            "taskStatus": task_status
+        }
+        if task.business_type == 1003:
+            payload["apps"] = {"padCode": task.pad_code, "appName": task.app_name}
+        await asyncio.sleep(self.scenario.callback_delay)
+        try:
+            async with self._session.post(self.callback_url, json=payload) as response:
+                await response.read()
+            self.callbacks_sent += 1
+        except aiohttp.ClientError:
+            self.callbacks_failed += 1
+
+    def _task_results(self, pad_codes: List[str], business_type: int, running_seconds: float,
+                      **extra) -> List[Dict[str, Any]]:
+        results = []
+        for pad_code in pad_codes:
+            task = self._create_task(pad_code, business_type, running_seconds, **extra)
+            results.append({"padCode": pad_code, "taskId": task.task_id, "vmStatus": 1})
+        return results
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler):
+        self.request_counts[request.path] = self.request_counts.get(request.path, 0) + 1
+        if request.path.startswith(API_PREFIX):
+            await self._latency()
+        return await handler(request)
+
+    # ---- 云端接口 ----
+
+    async def replace_pad(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        return self.ok(self._task_results(body.get("padCodes", []), 1124, self.scenario.replace_seconds))
+
+    async def upload_file(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        url = body.get("url", "")
+        app_name = url.rsplit("/", 1)[-1].replace(".apk", "") or "app"
+        return self.ok(self._task_results(
+            body.get("padCodes", []), 1003, self.scenario.install_seconds,
+            app_name=app_name, app_md5=body.get("md5") or app_name, package_name=f"emu.{app_name[:8]}"
+        ))
+
+    async def restart(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        return self.ok(self._task_results(body.get("padCodes", []), 1000, self.scenario.reboot_seconds))
+
+    async def start_app(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        return self.ok(self._task_results(body.get("padCodes", []), 1007, self.scenario.start_app_seconds))
+
+    async def generic_task(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        pad_codes = body.get("padCodes") or ([body["padCode"]] if body.get("padCode") else [])
+        return self.ok(self._task_results(pad_codes, 0, self.scenario.default_task_seconds))
+
+    async def pad_task_detail(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        now = time.monotonic()
+        data = []
+        for task_id in body.get("taskIds", []):
+            task = self.tasks.get(int(task_id))
+            if task is None:
+                continue
+            status = task.status(now)
+            data.append({
+                "taskId": task.task_id,
+                "padCode": task.pad_code,
+                "taskStatus": status,
+                "errorMsg": "模拟失败" if status == -1 else ""
+            })
+        return self.ok(data)
+
+    async def list_installed_app(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        data = [{"padCode": pad_code, "apps": list(self._pad(pad_code).apps.values())}
+                for pad_code in body.get("padCodes", [])]
+        return self.ok(data)
+
+    async def pad_info(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        return self.ok({"padCode": body.get("padCode"), "androidVersion": self.scenario.android_version})
+
+    async def user_pad_list(self, _: web.Request) -> web.Response:
+        expiration = int((time.time() + 30 * 86400) * 1000)
+        data = [{
+            "padCode": pad.pad_code,
+            "deviceIp": "10.0.0.1",
+            "padIp": "10.0.1.1",
+            "cvmStatus": 100,
+            "padName": pad.pad_code,
+            "androidVersion": self.scenario.android_version,
+            "goodName": "emulator",
+            "signExpirationTime": expiration,
+            "status": 10,
+            "bootTime": 0
+        } for pad in self.pads.values()]
+        return self.ok(data)
+
+    # ---- 控制接口 ----
+
+    async def get_stats(self, _: web.Request) -> web.Response:
+        now = time.monotonic()
+        status_counts: Dict[int, int] = {}
+        for task in self.tasks.values():
+            status = task.status(now)
+            status_counts[status] = status_counts.get(status, 0) + 1
+        return web.json_response({
+            "pads": len(self.pads),
+            "tasks": len(self.tasks),
+            "task_status": status_counts,
+            "requests": self.request_counts,
+            "callbacks_sent": self.callbacks_sent,
+            "callbacks_failed": self.callbacks_failed,
+            "scenario": asdict(self.scenario)
+        })
+
+    async def set_scenario(self, request: web.Request) -> web.Response:
+        self.scenario.update(await request.json())
+        return web.json_response(asdict(self.scenario))
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.middleware])
+        routes = {
+            "replacePad": self.replace_pad,
+            "uploadFileV3": self.upload_file,
+            "restart": self.restart,
+            "startApp": self.start_app,
+            "simulateTouch": self.generic_task,
+            "updateLanguage": self.generic_task,
+            "updateTimeZone": self.generic_task,
+            "gpsInjectInfo": self.generic_task,
+            "switchRoot": self.generic_task,
+            "replacement": self.generic_task,
+            "padTaskDetail": self.pad_task_detail,
+            "listInstalledApp": self.list_installed_app,
+            "padInfo": self.pad_info,
+            "userPadList": self.user_pad_list,
+        }
+        for name, handler in routes.items():
+            app.router.add_post(f"{API_PREFIX}/{name}", handler)
+        app.router.add_get("/emulator/stats", self.get_stats)
+        app.router.add_post("/emulator/scenario", self.set_scenario)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    async def _on_startup(self, _: web.Application) -> None:
+        self._session = aiohttp.ClientSession()
+
+    async def _on_cleanup(self, _: web.Application) -> None:
+        for task in list(self._background):
+            task.cancel()
+        if self._session is not None:
+            await self._session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地VMOS云端替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18000)
+    parser.add_argument("--pads", type=int, default=100, help="userPadList 返回的模拟云机数量")
+    parser.add_argument("--callback-url", default="http://127.0.0.1:4000/callback")
+    parser.add_argument("--scenario", help="JSON场景文件，字段同 Scenario")
+    args = parser.parse_args()
+
+    scenario = Scenario()
+    if args.scenario:
+        with open(args.scenario, "r", encoding="utf-8") as f:
+            scenario.update(json.load(f))
+
+    emulator = VmosEmulator(args.pads, args.callback_url or None, scenario)
+    web.run_app(emulator.build_app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == '__main__':
+    main()